@@ -701,6 +701,37 @@ def _(mo):
     return
 
 
+@app.cell(hide_code=True)
+def _(mo):
+    mo.md(
+        r"""
+    The same kind of query works across many memory dumps. With the plugin output of every host added to a `fleet/` directory, partitioned as `fleet/host=.../plugin=.../` (see the README), one `read_parquet` call reads the files of all hosts and DuckDB adds a `host` column from the directory names. Stacking the DLLs by the number of hosts that load them puts the rarest first, which is where injected or sideloaded DLLs tend to show up:
+    """
+    )
+    return
+
+
+@app.cell
+def _(k, mo):
+    import os
+
+    mo.stop(not os.path.isdir("fleet"), mo.md("No hosts have been added to `fleet/` yet."))
+
+    rare_dlls = mo.sql(
+        f"""
+        SELECT
+            lower(name) AS dll,
+            COUNT(DISTINCT host) AS hosts,
+            COUNT(DISTINCT (host, pid)) AS procs
+        FROM read_parquet('fleet/host=*/plugin=dlllist/*.parquet', hive_partitioning = true, hive_types = {{'host': VARCHAR}})
+        GROUP BY dll
+        ORDER BY hosts, procs
+        LIMIT {k.value}
+        """
+    )
+    return (rare_dlls,)
+
+
 @app.cell(hide_code=True)
 def _(mo):
     mo.md(r"""Later in the course we’ll look at building custom visualizations.  For now, let’s move on to the AI features.""")
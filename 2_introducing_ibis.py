@@ -1770,6 +1770,51 @@ def _(disasm, malfind):
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    The same disassembler as a `@ibis.udf.scalar.pyarrow` UDF lives in `memtools.disasm`. DuckDB passes it whole chunks of `Hexdump` values as Arrow arrays, and it creates one Capstone engine per mode instead of one per call. It also fixes a shortcut we took above: 32-bit processes running under WOW64 contain x86 code, not x64, so we join the `Wow64` flag from `pslist` and let the UDF pick the mode per row.
+    """
+    )
+    return
+
+
+@app.cell
+def _(malfind, processes):
+    from memtools.disasm import disasm as disasm_batched, with_wow64
+
+    _malfind = with_wow64(malfind, processes)
+    _malfind.select(
+        _.PID,
+        _.Wow64,
+        _.Disasm,
+        disasm=disasm_batched(_.Hexdump, _["Start VPN"], _.Wow64),
+    )
+    return (with_wow64,)
+
+
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    Text is fine to read, but not to query. `instruction_table` gives one row per instruction instead, with its address, size, mnemonic and operands as columns, so finding every region that contains a `syscall` or a `jmp` to a register is an ordinary filter.
+    """
+    )
+    return
+
+
+@app.cell
+def _(malfind, processes, with_wow64):
+    from memtools.disasm import instruction_table
+
+    malfind_instructions = instruction_table(with_wow64(malfind, processes))
+    malfind_instructions.filter(_.mnemonic.isin(["syscall", "jmp", "call"])).select(
+        _.PID, _.Process, _["Start VPN"], _.address, _.mnemonic, _.op_str
+    )
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -17,9 +17,19 @@ with app.setup(hide_code=True):
     import ibis.selectors as s
 
     from ibis import _
+    from memtools.case import attach_case
+    from memtools.disasm import cached_disasm, with_wow64
+    from memtools.fleet import attach_fleet, fleet_hosts
+    from memtools.stacking import STACK_ATTRIBUTES, rare_values
+    from memtools.tables import StyleRule, paged_table
+    from memtools.triage import correlate, triage_summary
+    from memtools.watch import watch_case
 
     ibis.options.interactive = True
 
+    # the plugin output lives in a DuckDB case database, attached read-only as `case`
+    con = attach_case(ibis.duckdb.connect())
+
 
 @app.cell(hide_code=True)
 def _():
@@ -286,9 +296,11 @@ def _():
 def _():
     mo.md(
         r"""
-    ### Malfind
+    ### Keeping the case up to date
+
+    While you work through the dashboard, you may well run more Volatility plugins, or re-run some with other options. With the switch below turned on, `memtools.watch` watches `volatility_plugin_output/` and loads new or rewritten plugin output into the case database as soon as it appears, leaving the other tables alone. The cells that read the case tables depend on `case_updates`, a `mo.state` holding how often each table was updated, so they re-run after every update.
 
-    Let's start by loading the data from the malfind plugin and rename the columns to use the snake_case naming convention, since we are in Python after all.
+    To load the output, the case is briefly reattached writable, and DuckDB only allows that while no other process has `case.duckdb` open. With another notebook, like the strings notebook, running in a second kernel, the update fails with a lock error, shown below the switch, and is retried every few seconds until that kernel is shut down. Cells that query the case during the swap fail as well, and re-run once the update is recorded.
     """
     )
     return
@@ -296,7 +308,71 @@ def _():
 
 @app.cell
 def _():
-    malfind = ibis.read_parquet("volatility_plugin_output/windows.malware.malfind.Malfind.parquet").rename("snake_case")
+    case_updates, set_case_updates = mo.state({})
+    watch_error, set_watch_error = mo.state(None)
+    watch_switch = mo.ui.switch(label="Load new plugin output automatically")
+    watch_switch
+    return case_updates, set_case_updates, set_watch_error, watch_error, watch_switch
+
+
+@app.cell
+def _(set_case_updates, set_watch_error, watch_switch):
+    mo.stop(not watch_switch.value)
+
+
+    def _record(tables):
+        set_case_updates(lambda updates: {**updates, **{table: updates.get(table, 0) + 1 for table in tables}})
+
+
+    def _report(error):
+        # None once an update succeeds again
+        set_watch_error(None if error is None else str(error))
+
+
+    # state updates only reach the notebook from a mo.Thread, which is told to stop when this cell re-runs
+    mo.Thread(
+        target=watch_case,
+        args=(con, _record),
+        kwargs={"stop": lambda: mo.current_thread().should_exit, "on_error": _report},
+        daemon=True,
+    ).start()
+    return
+
+
+@app.cell(hide_code=True)
+def _(watch_error):
+    mo.stop(watch_error() is None)
+
+    mo.callout(
+        mo.vstack(
+            [
+                mo.md("**Loading new plugin output into the case failed**, retrying every few seconds:"),
+                mo.plain_text(watch_error()),
+                mo.md("If another notebook kernel has `case.duckdb` open, shut it down to let the update through."),
+            ]
+        ),
+        kind="danger",
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Malfind
+
+    Let's start by loading the data from the malfind plugin. All the plugin output has been ingested into a DuckDB case database (`case.duckdb`), where the columns already use the snake_case naming convention, since we are in Python after all.
+    """
+    )
+    return
+
+
+@app.cell
+def _(case_updates):
+    # re-run when new plugin output has been loaded into the case
+    case_updates()
+    malfind = con.table("malfind", database="case")
 
     malfind
     return (malfind,)
@@ -379,78 +455,57 @@ def _():
         r"""
     This is already a significant improvement. However, we are not done yet. Let's continue by making the important parts more visible through the use of colors. Based on how malfind works, the most important fields to highlight are memory permissions and allocation tags.
 
-    We can write a function that formats cells depending on the column and value. For example, in the `tag` column we’ll highlight `VadS` values. We’ll also color cells that show read-write and executable permissions.
+    We can describe which cells to format, depending on the column and value. For example, in the `tag` column we’ll highlight `VadS` values. We’ll also color cells that show read-write and executable permissions.
 
-    This is done by passing a function to the `style_cell` argument, which returns a dictionary of CSS properties.
+    `mo.ui.table` has a `style_cell` argument for this, a function called for every single cell that returns a dictionary of CSS properties. Instead, we write the highlighting down as a list of `StyleRule(column, predicate, style)` from `memtools.tables`. The predicate is an Ibis expression, so it is evaluated by DuckDB for the whole page in one go, and the style is the same dictionary of CSS properties. When several rules match a cell, the first one wins.
     """
     )
     return
 
 
 @app.function
-def highlight_malware_indicators(row_id, column_name, value):
+def malware_indicators():
     """
-    Color cells and apply monospace formatting for suspicious malware indicators.
+    Style rules that color suspicious malware indicators and use a monospace font for addresses.
     """
 
-    colors = {
-        "VadS": {"backgroundColor": "#ff9aa2", "color": "black"},
-        "EXECUTE_READWRITE": {"backgroundColor": "#ffb7b2", "color": "black"},
-        "EXECUTE": {"backgroundColor": "#ffdac1", "color": "black"},
-        "1": {"backgroundColor": "#ff9999", "color": "black"},
+    monospace = {
+        "fontFamily": "ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
+        "whiteSpace": "nowrap",
     }
 
-    # Highlight suspicious tag
-    if column_name == "tag" and value == "VadS":
-        return colors["VadS"]
-
-    # Highlight suspicious protections
-    if column_name == "protection":
-        val = str(value)
-        for exec_type in ("EXECUTE_READWRITE", "EXECUTE"):
-            if exec_type in val:
-                return colors[exec_type]
-
-    # Highlight regions that aren't backed by a file on disk
-    if column_name == "private_memory" and value == 1:
-        return colors["1"]
-
-    # Force monospace for VAD addresses
-    if column_name in ("start_vpn", "end_vpn"):
-        return {
-            "fontFamily": "ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
-            "whiteSpace": "nowrap",
-        }
-
-    # Force monospace for disassembly too
-    if column_name == "disasm":
-        return {
-            "fontFamily": "ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
-            "whiteSpace": "nowrap",
-        }
-
-    return {}
+    return [
+        # Highlight suspicious tag
+        StyleRule("tag", _.tag == "VadS", {"backgroundColor": "#ff9aa2", "color": "black"}),
+        # Highlight suspicious protections
+        StyleRule(
+            "protection",
+            _.protection.contains("EXECUTE_READWRITE"),
+            {"backgroundColor": "#ffb7b2", "color": "black"},
+        ),
+        StyleRule("protection", _.protection.contains("EXECUTE"), {"backgroundColor": "#ffdac1", "color": "black"}),
+        # Highlight regions that aren't backed by a file on disk
+        StyleRule("private_memory", _.private_memory == 1, {"backgroundColor": "#ff9999", "color": "black"}),
+        # Force monospace for VAD addresses and the disassembly
+        StyleRule("start_vpn", None, monospace),
+        StyleRule("end_vpn", None, monospace),
+        StyleRule("disasm", None, monospace),
+    ]
 
 
 @app.cell(hide_code=True)
 def _():
     mo.md(
         r"""
-    If you try to use a custom cell-highlighting function directly on an Ibis table, you’ll run into this error:
+    A `style_cell` function needs the actual values, so it only works once the Ibis table has been converted into an in-memory dataframe (`t.to_polars()`, `t.to_pyarrow()` or `t.execute()`). Passed an Ibis table directly, you’ll run into this error:
 
     ```plain
     NotImplementedError: Cell selection not supported
     ```
 
-    This happens because `mo.ui.table` expects a concrete dataframe type that supports row and column access. An Ibis table expression is still just a lazy query plan, so that won't work. 
-
-    The fix is to convert the Ibis table into an in-memory dataframe. You can choose the backend you like:
+    Converting pulls every row into the notebook, even though only one page is on screen. That is fine for `malfind`, but on a large `handles` table it takes seconds and a lot of memory, and the function is then called for every cell on the page.
 
-    - `t.to_pyarrow()` → PyArrow table  
-    - `t.execute()` → pandas dataframe  
-    - `t.to_polars()` → Polars dataframe  
-
-    All of these will enable cell-highlighting. If you go with Polars, you’ll also gain more options for filtering and manipulation.
+    `memtools.tables.paged_table` takes the Ibis expression itself and asks DuckDB for one page at a time, with sorting, searching and column filters added to the query. It accepts the same arguments as `mo.ui.table` plus `style_rules`: the predicates are added to the page query, and only the cells they match are styled. The triage tabs further down use it too.
     """
     )
     return
@@ -458,14 +513,14 @@ def _():
 
 @app.cell(hide_code=True)
 def _():
-    mo.md(r"""After converting to a Polars dataframe, the table looks like this:""")
+    mo.md(r"""With the style rules, the table looks like this:""")
     return
 
 
 @app.cell
 def _(malfind):
-    mo.ui.table(
-        malfind.select(~s.cols("hexdump", "disasm", "file_output", "notes")).to_polars(),
+    paged_table(
+        malfind.select(~s.cols("hexdump", "disasm", "file_output", "notes")),
         format_mapping={
             "start_vpn": format_hex_addr,
             "end_vpn": format_hex_addr,
@@ -475,7 +530,7 @@ def _(malfind):
         show_column_summaries=False,
         show_data_types=False,
         show_download=False,
-        style_cell=highlight_malware_indicators,
+        style_rules=malware_indicators(),
         page_size=20,
     )
     return
@@ -515,8 +570,8 @@ def _(malfind):
         "disasm",
     )
 
-    formatted_malfind = mo.ui.table(
-        _view.to_polars(),
+    formatted_malfind = paged_table(
+        _view,
         format_mapping={
             "start_vpn": format_hex_addr,
             "end_vpn": format_hex_addr,
@@ -531,7 +586,7 @@ def _(malfind):
         show_column_summaries=False,
         show_data_types=False,
         show_download=False,
-        style_cell=highlight_malware_indicators,
+        style_rules=malware_indicators(),
         page_size=20,
     )
 
@@ -539,6 +594,37 @@ def _(malfind):
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    The `disasm` column Volatility writes only covers the first bytes of each hit. `memtools.disasm.cached_disasm` disassembles the whole `hexdump` with Capstone, as x86 for processes running under WOW64 and x64 otherwise, and keeps the result in a `disasm_cache` table of the case database. The same shellcode stub in several processes, or on the next run of this cell, is filled in by a join with that table instead of going through Capstone again.
+
+    Writing the cache needs the case attached writable: `cached_disasm` swaps the read-only attachment for a writable one with `memtools.case.writable_case` and back. That only works while no other notebook kernel, or the `memtools.watch` command, has `case.duckdb` open; otherwise every row is disassembled again, without the cache.
+    """
+    )
+    return
+
+
+@app.cell
+def _(malfind):
+    _pslist = con.table("pslist", database="case")
+    _disassembled = cached_disasm(con, with_wow64(malfind, _pslist, pid="pid"))
+
+    paged_table(
+        _disassembled.select("pid", "process", "start_vpn", "wow64", "disassembly"),
+        format_mapping={"start_vpn": format_hex_addr},
+        selection=None,
+        show_column_summaries=False,
+        show_data_types=False,
+        style_rules=[
+            StyleRule("disassembly", None, {"fontFamily": "ui-monospace, Menlo, Consolas, monospace", "whiteSpace": "pre"})
+        ],
+        page_size=5,
+    )
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(r"""What an improvement! Let's look at a few other UI elements we can use.""")
@@ -600,6 +686,25 @@ def _():
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    Every component of the dashboard runs its query again whenever the notebook re-runs. Counts like these don't change once the plugins have run, so the case database also holds a `triage_summary` table, computed when the case is built: one row per process (`pid`, `process`) with the number of malfind hits, RWX VADs, suspicious threads, network connections, handles to other processes and unlinked DLLs. The components below are lookups in that table.
+    """
+    )
+    return
+
+
+@app.cell
+def _(case_updates):
+    case_updates()
+    triage = triage_summary(con)
+
+    triage.filter((_.malfind_hits > 0) | (_.suspicious_threads > 0) | (_.unlinked_dlls > 0))
+    return (triage,)
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -633,8 +738,8 @@ def _():
 
 
 @app.cell(hide_code=True)
-def _(malfind):
-    _processes_with_malfind_alerts = malfind.distinct(on=["pid", "process"]).select("pid", "process").execute()
+def _(triage):
+    _processes_with_malfind_alerts = triage.filter(_.malfind_hits > 0).select("pid", "process").execute()
 
     mo.ui.tabs(
         {
@@ -664,12 +769,12 @@ def _():
 
 
 @app.cell(hide_code=True)
-def _(malfind):
-    _malfind_notes = malfind.filter(_.notes.notnull()).select("pid", "process", "start_vpn", "notes").execute()
+def _(malfind, triage):
+    _malfind_notes = malfind.filter(_.notes.notnull()).select("pid", "process", "start_vpn", "notes")
     mo.ui.tabs(
         {
             "Annotated malfind hits": mo.stat(
-                len(_malfind_notes),
+                triage.malfind_notes.sum().execute() or 0,
                 label="Malfind hits where notes are present",
                 caption="Regions with MZ headers, PE headers, or function prologues at the beginning",
             ),
@@ -694,10 +799,9 @@ def _():
 
 
 @app.cell
-def _():
-    suspicious_threads = ibis.read_parquet("volatility_plugin_output/windows.malware.suspicious_threads.SuspiciousThreads.parquet").rename(
-        "snake_case"
-    )
+def _(case_updates):
+    case_updates()
+    suspicious_threads = con.table("suspicious_threads", database="case")
 
     suspicious_threads
     return (suspicious_threads,)
@@ -719,8 +823,8 @@ def _():
 
 
 @app.cell(hide_code=True)
-def _(suspicious_threads):
-    _suspicious_threads_tab = suspicious_threads.distinct(on=["pid", "process"]).select("pid", "process").execute()
+def _(triage):
+    _suspicious_threads_tab = triage.filter(_.suspicious_threads > 0).select("pid", "process").execute()
 
     mo.ui.tabs(
         {
@@ -767,8 +871,9 @@ def _():
 
 
 @app.cell
-def _():
-    psscan = ibis.read_parquet("volatility_plugin_output/windows.psscan.PsScan.parquet").rename("snake_case").rename(process="image_file_name")
+def _(case_updates):
+    case_updates()
+    psscan = con.table("psscan", database="case").rename(process="image_file_name")
 
     _pids = psscan.select(_.pid).filter(_.pid.notnull()).distinct().order_by(_.pid).to_pyarrow().to_pylist()
 
@@ -804,19 +909,20 @@ def _():
         r"""
     We now prepare the data for our dashboard by using the selected PID from the dropdown menu to filter out events that are not related to this process in the other tables.  
 
-    First, we’ll load the tables into memory and rename some columns for consistency. For example, in the `netscan` output the process name is stored in the column `owner`.
+    First, we’ll load the tables from the case database. Some columns still need renaming for consistency. For example, in the `netscan` output the process name is stored in the column `owner`.
     """
     )
     return
 
 
 @app.cell
-def _():
-    vadinfo = ibis.read_parquet("volatility_plugin_output/windows.vadinfo.VadInfo.parquet").rename("snake_case")
-    handles = ibis.read_parquet("volatility_plugin_output/windows.handles.Handles.parquet").rename("snake_case")
-    netscan = ibis.read_parquet("volatility_plugin_output/windows.netscan.NetScan.parquet").rename("snake_case")
-    ldrmodules = ibis.read_parquet("volatility_plugin_output/windows.ldrmodules.LdrModules.parquet").rename("snake_case")
-    dlllist = ibis.read_parquet("volatility_plugin_output/windows.dlllist.DllList.parquet").rename("snake_case")
+def _(case_updates):
+    case_updates()
+    vadinfo = con.table("vadinfo", database="case")
+    handles = con.table("handles", database="case")
+    netscan = con.table("netscan", database="case")
+    ldrmodules = con.table("ldrmodules", database="case")
+    dlllist = con.table("dlllist", database="case")
     return dlllist, handles, ldrmodules, netscan, vadinfo
 
 
@@ -833,7 +939,10 @@ def _():
 
 
 @app.function
-def filter_by_pid(df, pid_value):
+def filter_by_pid(df, pid_value, host=None):
+    # fleet tables hold many hosts, where the same PID can be a different process on each
+    if host is not None:
+        df = df.filter(_.host == host)
     if pid_value == "All":
         return df
     else:
@@ -909,7 +1018,7 @@ def _():
 def _():
     mo.md(
         r"""
-    Below we’ve defined a highlighting function for handles too. It marks handles of type Process, as well as those pointing to an object owned by another process.
+    Below we’ve defined style rules for handles too. It marks handles of type Process, as well as those pointing to an object owned by another process.
 
     Another angle would be to use the granted_access field. Process hollowing, for example, requires at least `PROCESS_VM_WRITE` and `PROCESS_VM_OPERATION` (mask 0x28) to call WriteProcessMemory. But these permissions are so common that they don’t stand out as a useful highlight.
 
@@ -921,40 +1030,30 @@ def _():
 
 @app.cell
 def _(pidproc_dropdown):
-    def highlight_handle_indicators(row_id, column_name, value):
-        """
-        Color certain cells and format hex values in the handles plugin output
-        """
-
-        colors = {
-            "Process": {"backgroundColor": "#ff9999", "color": "black"},
-            "Other_process": {"backgroundColor": "#ffff99", "color": "black"},
-        }
+    # Color certain cells and format hex values in the handles plugin output
+    _monospace = {
+        "fontFamily": "ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
+        "whiteSpace": "nowrap",
+    }
 
+    handle_indicators = [
         # Highlight handles to processes
-        if column_name == "type" and value == "Process":
-            return colors["Process"]
-
-        selected_pid = pidproc_dropdown.value
-
-        if (
-            column_name == "name"
-            and selected_pid != "All"
-            and value
-            and "Pid " in value
-            and not value.endswith(f"Pid {selected_pid}")
-        ):
-            return colors["Other_process"]
-
+        StyleRule("type", _.type == "Process", {"backgroundColor": "#ff9999", "color": "black"}),
         # Force monospace for columns with hex values
-        if column_name in ("granted_access", "offset"):
-            return {
-                "fontFamily": "ui-monospace, SFMono-Regular, Menlo, Consolas, monospace",
-                "whiteSpace": "nowrap",
-            }
-
-        return {}
-    return (highlight_handle_indicators,)
+        StyleRule("granted_access", None, _monospace),
+        StyleRule("offset", None, _monospace),
+    ]
+
+    # Highlight handles to objects owned by a process other than the selected one
+    if pidproc_dropdown.value != "All":
+        handle_indicators.append(
+            StyleRule(
+                "name",
+                _.name.contains("Pid ") & ~_.name.endswith(f"Pid {pidproc_dropdown.value}"),
+                {"backgroundColor": "#ffff99", "color": "black"},
+            )
+        )
+    return (handle_indicators,)
 
 
 @app.cell(hide_code=True)
@@ -999,7 +1098,7 @@ def _(
     filtered_netscan,
     filtered_suspicious_threads,
     filtered_vadinfo,
-    highlight_handle_indicators,
+    handle_indicators,
     pidproc_dropdown,
     psscan,
 ):
@@ -1016,12 +1115,10 @@ def _(
             "malfind": mo.lazy(mo.vstack(
                 [
                     pidproc_dropdown,
-                    mo.ui.table(
-                        filtered_malfind.drop(["hexdump", "disasm", "file_output"]).to_polars(),
+                    paged_table(
+                        filtered_malfind.drop(["hexdump", "disasm", "file_output"]),
                         format_mapping={"start_vpn": format_hex_addr, "end_vpn": format_hex_addr},
-                        selection=None,
-                        show_column_summaries=False,
-                        style_cell=highlight_malware_indicators,
+                        style_rules=malware_indicators(),
                     ),
                 ]
             )),
@@ -1096,15 +1193,13 @@ def _(
             "handles": mo.lazy(mo.vstack(
                 [
                     pidproc_dropdown,
-                    mo.ui.table(
-                        filtered_handles.to_polars(),
+                    paged_table(
+                        filtered_handles,
                         format_mapping={
                             "offset": format_hex_addr,
                             "granted_access": format_hex_addr,
                         },
-                        selection=None,
-                        show_column_summaries=False,
-                        style_cell=highlight_handle_indicators,
+                        style_rules=handle_indicators,
                     ),
                 ]
             )),
@@ -1126,8 +1221,9 @@ def _():
 
 
 @app.cell
-def _():
-    info = ibis.read_parquet("volatility_plugin_output/windows.info.Info.parquet")
+def _(case_updates):
+    case_updates()
+    info = con.table("info", database="case")
     return (info,)
 
 
@@ -1167,7 +1263,7 @@ def _():
 
 @app.cell
 def _(info):
-    _info = info.filter(~_.Variable.contains("layer"), ~_.Variable.contains("Symbol"))
+    _info = info.filter(~_.variable.contains("layer"), ~_.variable.contains("Symbol"))
 
     _view = mo.ui.table(
         _info.to_polars(),
@@ -1176,7 +1272,7 @@ def _(info):
         show_data_types=False,
         show_download=False,
         page_size=50,
-        text_justify_columns={"Variable": "left", "Value": "left"},
+        text_justify_columns={"variable": "left", "value": "left"},
     )
 
     mo.Html(
@@ -1214,18 +1310,10 @@ def _():
 
 
 @app.function(hide_code=True)
-def find_overlap(output_plugin1, output_plugin2):
-    return (
-        output_plugin2.join(
-            output_plugin1,
-            predicates=[
-                output_plugin1["process"] == output_plugin2["process"],
-                output_plugin1["pid"] == output_plugin2["pid"],
-            ],
-        )
-        .select("process", "pid")
-        .distinct(on=["pid", "process"])
-    )
+def find_overlap(*plugin_outputs):
+    # correlate counts the rows each output has per (pid, process) in one pass over all of them
+    flagged = correlate({f"plugin_{i}": output for i, output in enumerate(plugin_outputs)})
+    return flagged.filter(_.plugins == len(plugin_outputs)).select("process", "pid")
 
 
 @app.cell(hide_code=True)
@@ -1262,7 +1350,7 @@ def _():
 
     Remember, we already prepared the `mo.ui.tabs` component with all these outputs and a PID filter. Notice how much easier this is compared to scrolling through raw Volatility text in the terminal.  
 
-    It can also be helpful to look for overlaps. For example, check which of the processes flagged by `malfind` also have network connections.
+    It can also be helpful to look for overlaps. For example, check which of the processes flagged by `malfind` also have network connections. Our `find_overlap` takes any number of plugin outputs, and `netscan` calling its process column `owner` is taken care of.
     """
     )
     return
@@ -1270,11 +1358,36 @@ def _():
 
 @app.cell
 def _(malfind, netscan):
-    overlap_netscan_malfind = find_overlap(netscan.rename(process="owner"), malfind)
+    overlap_netscan_malfind = find_overlap(netscan, malfind)
     overlap_netscan_malfind
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    Rather than chaining overlaps pair by pair, `correlate` from `memtools.triage` takes all the outputs at once and returns a matrix: one row per process, the number of rows each output has for it, and in `plugins` how many of them flag it. The outputs can be filtered first, here `ldrmodules` is narrowed down to modules missing from one of the loader lists.
+    """
+    )
+    return
+
+
+@app.cell
+def _(ldrmodules, malfind, netscan, suspicious_threads):
+    _unlinked = ldrmodules.filter(~_.in_load | ~_.in_mem | (~_.in_init & ~_.mapped_path.lower().endswith(".exe")))
+
+    correlate(
+        {
+            "malfind": malfind,
+            "suspicious_threads": suspicious_threads,
+            "netscan": netscan,
+            "unlinked_dlls": _unlinked,
+        }
+    ).filter(_.plugins > 1).order_by(_.plugins.desc(), _.pid)
+    return
+
+
 @app.cell
 def _(netscan):
     netscan.rename(process="owner").filter(_.process == "OneDrive.exe")
@@ -1293,6 +1406,104 @@ def _():
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Many hosts
+
+    In a real incident there is rarely just one memory dump. With the plugin output of every host added to the `fleet/` directory (see the README), `attach_fleet` makes each plugin available as one table across all hosts, with a `host` column. The directory is partitioned by host, so filtering on a host only reads that host's files, and the same `filter_by_pid` and `correlate` work across the fleet, with the host as part of the key. A PID only means something on its own host, so the PIDs to filter on come from the selected host's process list.
+    """
+    )
+    return
+
+
+@app.cell
+def _():
+    mo.stop(not fleet_hosts(), mo.md("No hosts have been added to `fleet/` yet."))
+
+    attach_fleet(con)
+    # the fleet database holds a view per plugin any host has output for, in its `main` schema
+    fleet_views = con.list_tables(database=("fleet", "main"))
+    fleet = {
+        name: con.table(name, database="fleet")
+        for name in ("malfind", "suspicious_threads", "netscan")
+        if name in fleet_views
+    }
+    host_dropdown = mo.ui.dropdown(options=fleet_hosts(), label="Host")
+
+    # processes flagged by more than one plugin, on any host
+    (
+        correlate(fleet, keys=("host", "pid", "process")).filter(_.plugins > 1).order_by(_.plugins.desc(), _.host, _.pid)
+        if fleet
+        else mo.md("None of `malfind`, `suspicious_threads` and `netscan` has been added to the fleet yet.")
+    )
+    return fleet, fleet_views, host_dropdown
+
+
+@app.cell
+def _(fleet_views, host_dropdown):
+    # a PID only identifies a process on its own host, so the choices come from the selected host's process list
+    _process_list = next((name for name in ("psscan", "pslist") if name in fleet_views), None)
+    _pids = []
+    if _process_list is not None and host_dropdown.value is not None:
+        _processes = con.table(_process_list, database="fleet").filter(_.host == host_dropdown.value, _.pid.notnull())
+        _pids = _processes.select(_.pid).distinct().order_by(_.pid).to_pyarrow().column("pid").to_pylist()
+
+    fleet_pid_dropdown = mo.ui.dropdown(options=["All"] + _pids, value="All", label="Filter by PID")
+    return (fleet_pid_dropdown,)
+
+
+@app.cell
+def _(fleet, fleet_pid_dropdown, host_dropdown):
+    mo.stop("malfind" not in fleet, mo.md("No host in the fleet has `malfind` output."))
+
+    mo.vstack(
+        [
+            mo.hstack([host_dropdown, fleet_pid_dropdown], justify="start"),
+            paged_table(
+                filter_by_pid(fleet["malfind"], fleet_pid_dropdown.value, host=host_dropdown.value).drop(
+                    "hexdump", "disasm", "file_output"
+                ),
+                format_mapping={"start_vpn": format_hex_addr, "end_vpn": format_hex_addr},
+                style_rules=malware_indicators(),
+            ),
+        ]
+    )
+    return
+
+
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    What is on only a few hosts is worth a look: an injected DLL, a service nobody else runs, a one-off command line. `rare_values` answers "seen on fewer than *k* hosts" from the distinct values stored per host and attribute when the host was added, so the plugin output isn't read again. The counts are exact, so nothing rare is left out. Pick a host to compare it against the rest of the fleet.
+    """
+    )
+    return
+
+
+@app.cell
+def _():
+    stack_attribute = mo.ui.dropdown(options=list(STACK_ATTRIBUTES), value="dll_path", label="Attribute")
+    stack_k = mo.ui.slider(start=2, stop=max(2, len(fleet_hosts())), value=2, show_value=True, label="Seen on fewer than")
+    return stack_attribute, stack_k
+
+
+@app.cell
+def _(host_dropdown, stack_attribute, stack_k):
+    mo.vstack(
+        [
+            mo.hstack([stack_attribute, stack_k, host_dropdown], justify="start"),
+            paged_table(
+                rare_values(con, stack_attribute.value, stack_k.value, host=host_dropdown.value),
+                show_download=False,
+            ),
+        ]
+    )
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -9,6 +9,9 @@ with app.setup(hide_code=True):
     import marimo as mo
 
     from ibis import _
+    from memtools.case import attach_case
+    from memtools.tables import paged_table
+    from memtools.vad import resolve_vads
 
 
     def get_default_connection():
@@ -18,6 +21,7 @@ with app.setup(hide_code=True):
 
 
     con = get_default_connection()
+    attach_case(con)
     ibis.options.interactive = True
 
 
@@ -79,9 +83,7 @@ def format_hex_addr(addr):
 
 @app.cell
 def _():
-    suspicious_threads = con.read_parquet(
-        "volatility_plugin_output/windows.malware.suspicious_threads.SuspiciousThreads.parquet"
-    ).rename("snake_case")
+    suspicious_threads = con.table("suspicious_threads", database="case")
 
     mo.ui.table(
         suspicious_threads,
@@ -100,7 +102,7 @@ def _():
 
 @app.cell
 def _():
-    vads = con.read_parquet("volatility_plugin_output/windows.vadinfo.VadInfo.parquet").rename("snake_case")
+    vads = con.table("vadinfo", database="case")
 
     mo.ui.table(
         vads,
@@ -146,14 +148,8 @@ def _():
 
 @app.cell
 def _(suspicious_threads, vads):
-    suspicious_vads = suspicious_threads.join(
-        vads,
-        [
-            vads.start_vpn <= suspicious_threads.address,
-            suspicious_threads.address <= vads.end_vpn,
-            vads.pid == suspicious_threads.pid,
-        ],
-    )
+    # the VAD of the same process with start_vpn <= address <= end_vpn
+    suspicious_vads = resolve_vads(suspicious_threads, vads)
     return (suspicious_vads,)
 
 
@@ -170,7 +166,7 @@ def to_list(t):
 
 @app.cell
 def _(suspicious_vads):
-    suspicious_files = to_list(suspicious_vads.distinct(on=["file_output"]).file_output)
+    suspicious_files = to_list(suspicious_vads.distinct(on=["vad_file_output"]).vad_file_output)
 
     suspicious_files
     return (suspicious_files,)
@@ -185,7 +181,7 @@ def _():
     def extract_strings_from_vad(filename, string_type="ascii", min_length=3):
         file_path = f"output/{filename}"
         if not os.path.exists(file_path):
-            return ""
+            return []
 
         with open(file_path, "rb") as fh:
             data = fh.read()
@@ -195,7 +191,7 @@ def _():
         else:
             extracted = extract_unicode_strings(data, min_length)
 
-        return " ".join(item.string for item in extracted)
+        return [{"offset": item.offset, "string": item.string} for item in extracted]
     return (extract_strings_from_vad,)
 
 
@@ -209,7 +205,7 @@ def _(extract_strings_from_vad):
 def _():
     mo.md(
         r"""
-    This helper reads the memory dump for a given VAD and extracts strings from it. We can choose between ASCII or Unicode mode, and set a minimum length to avoid noise.
+    This helper reads the memory dump for a given VAD and extracts strings from it, together with the byte offset where each string starts. We can choose between ASCII or Unicode mode, and set a minimum length to avoid noise.
 
     With this function in place we can extract both ASCII and Unicode strings. Next we’ll run it across all the VAD files and load the results back into Ibis and DuckDB for analysis.
     """
@@ -218,22 +214,20 @@ def _():
 
 
 @app.cell
-def _(extract_strings_from_vad, suspicious_files):
-    import uuid
+def _(suspicious_files):
+    import functools
 
+    from memtools.strings import create_strings_table as _extract_strings_table
 
-    def create_strings_table(con, files, table_name="strings"):
-        rows = [
-            {
-                "id": str(uuid.uuid4()),
-                "filename": filename,
-                "ascii": extract_strings_from_vad(filename),
-                "unicode": extract_strings_from_vad(filename, string_type="unicode"),
-            }
-            for filename in files
-        ]
 
-        return con.create_table(table_name, rows, overwrite=True)
+    def create_strings_table(con, files, table_name="strings"):
+        # VAD files are processed in parallel and streamed into DuckDB as they finish
+        return _extract_strings_table(
+            con,
+            files,
+            table_name=table_name,
+            progress=functools.partial(mo.status.progress_bar, title="Extracting strings", remove_on_exit=True),
+        )
 
 
     strings_from_suspicious_vads = create_strings_table(con, suspicious_files)
@@ -242,7 +236,7 @@ def _(extract_strings_from_vad, suspicious_files):
 
 @app.cell(hide_code=True)
 def _():
-    mo.md(r"""We now build a strings table in DuckDB. Each row represents one VAD dump. We give it a unique ID, keep track of the filename, and store both ASCII and Unicode strings extracted with our helper.""")
+    mo.md(r"""We now build a strings table in DuckDB with one row per string: the VAD file it came from, the pid, the byte offset in the file, the encoding (`ascii` or `utf-16le`), the length and the string itself. `memtools.strings` does the same as our helper, but memory-maps the files, extracts both string types in worker processes and streams the results into DuckDB as they come in.""")
     return
 
 
@@ -256,14 +250,8 @@ def _(strings_from_suspicious_vads):
 def _():
     mo.md(
         r"""
-    For now we keep one text field per VAD. At a later point we can reshape it so that each string gets its own row.  
-
-    This can be done in two steps:
-
-    1. `split` the string column  
-    2. `unnest` the resulting array  
-
-    The example below does this for the ASCII column.
+    Because every string has its own row, narrowing things down is just a filter.
+    The example below keeps the distinct ASCII strings of at least 5 characters.
     """
     )
     return
@@ -272,10 +260,9 @@ def _():
 @app.cell
 def _(strings_from_suspicious_vads):
     (
-        strings_from_suspicious_vads.mutate(ascii=_.ascii.split(" ").unnest())
-        .filter(_.ascii.length() >= 5)
-        .distinct(on=["ascii"])
-        .drop(_.unicode)
+        strings_from_suspicious_vads.filter((_.encoding == "ascii") & (_.length >= 5))
+        .distinct(on=["string"])
+        .select(_.vad_file, _.offset, _.string)
     )
     return
 
@@ -410,64 +397,40 @@ def _():
 def _():
     mo.md(
         r"""
-    With these helpers defined we can enrich our strings table. For each VAD we add new columns for URLs, emails, IPs, file paths, and common file types. 
+    With these helpers defined we can enrich our strings table. For each string we add new columns for URLs, emails, IPs, file paths, and common file types. 
 
+    Calling every helper separately scans the strings once per pattern. The `IOCMatcher` from `memtools.iocs` holds the same patterns, compiled into a single YARA-X rule, and finds all of them in one scan over each batch of strings. It returns one row per match with the pattern name, the match and its byte offset in the VAD, which we turn back into one list column per pattern.
 
-    We then filter the table so that only rows with at least one match remain.  This leaves us with a smaller set of strings that are more likely to be relevant.
+    Only strings with at least one match remain, which leaves us with a smaller set of strings that are more likely to be relevant.
     """
     )
     return
 
 
 @app.cell
-def _(
-    archives,
-    doc_scripts,
-    emails,
-    exe_dlls,
-    file_exts,
-    ipv4s,
-    strings_from_suspicious_vads,
-    urls,
-    win_paths,
-):
-    def extract_patterns_from_strings(suspicious_strings_df, pattern_extractors):
-        # Initialize any_patterns_found condition
-        any_patterns_found = ibis.literal(False)
-
-        # Initialize columns for selection
-        columns = {
-            "filename": _.filename,
-            "ascii": _.ascii,
-        }
+def _(strings_from_suspicious_vads):
+    from memtools.iocs import IOCMatcher, extract_iocs
+
+    # The same patterns as the helpers, compiled into one YARA-X rule that finds all of them in a single scan
+    ioc_matcher = IOCMatcher()
+
 
-        # Build selection columns and OR condition
-        for name, fn in pattern_extractors.items():
-            columns[name] = fn(_.ascii)
-            any_patterns_found |= columns[name].length() > 0
+    def extract_patterns_from_strings(suspicious_strings_df, matcher):
+        # One row per match: vad_file, offset, pattern, match, match_offset, ...
+        iocs = extract_iocs(suspicious_strings_df, matcher=matcher)
 
-        # Select relevant columns, filter rows, and drop the ascii column
-        extracted_strings = suspicious_strings_df.select(**columns).filter(any_patterns_found).drop(_.ascii)
+        # Back to one row per string, with the matches of each pattern in their own column
+        extracted_strings = iocs.group_by("vad_file", "offset").aggregate(
+            **{name: _.match.collect(where=_.pattern == name) for name in matcher.patterns}
+        )
 
         # Final result
         return extracted_strings
 
 
-    # Extractor name → function
-    PATTERN_EXTRACTORS = {
-        "urls": urls,
-        "emails": emails,
-        "ipv4s": ipv4s,
-        "win_paths": win_paths,
-        "file_exts": file_exts,
-        "exe_dlls": exe_dlls,
-        "doc_scripts": doc_scripts,
-        "archives": archives,
-    }
-
     # Apply the function to `strings_from_suspicious_vads`
-    extracted_strings = extract_patterns_from_strings(strings_from_suspicious_vads, PATTERN_EXTRACTORS)
-    return PATTERN_EXTRACTORS, extract_patterns_from_strings, extracted_strings
+    extracted_strings = extract_patterns_from_strings(strings_from_suspicious_vads, ioc_matcher)
+    return extract_patterns_from_strings, extracted_strings, ioc_matcher
 
 
 @app.cell
@@ -483,8 +446,8 @@ def _():
 
 
 @app.cell
-def _(PATTERN_EXTRACTORS):
-    _options = list(PATTERN_EXTRACTORS.keys())
+def _(ioc_matcher):
+    _options = list(ioc_matcher.patterns)
     selection = mo.ui.dropdown(
         _options,
         allow_select_none=False,
@@ -502,17 +465,14 @@ def create_table(extracted_strings, selection, min_len):
     content = extracted_strings[selection.value].unnest()
 
     # build the table expression
-    _result_expr = extracted_strings.select(_.filename, content=content).filter(_.content.length() >= min_len.value)
-
-    # materialize as polars dataframe to speed up pagination
-    _df = _result_expr.to_polars()
+    _result_expr = extracted_strings.select(_.vad_file, _.offset, content=content).filter(
+        _.content.length() >= min_len.value
+    )
 
-    # table component
-    _table = mo.ui.table(
-        _df,
-        selection=None,
+    # table component, DuckDB is asked for one page at a time
+    _table = paged_table(
+        _result_expr,
         show_download=False,
-        show_column_summaries=False,
         page_size=10,
     )
 
@@ -581,16 +541,16 @@ def _():
 
 @app.cell
 def _(
-    PATTERN_EXTRACTORS,
     create_strings_table,
     extract_patterns_from_strings,
     files,
+    ioc_matcher,
     run_button,
 ):
     mo.stop(not run_button.value)
 
     strings_from_all_vads = create_strings_table(con, files, table_name="all_vad_strings")
-    all_extracted_strings = extract_patterns_from_strings(strings_from_all_vads, PATTERN_EXTRACTORS)
+    all_extracted_strings = extract_patterns_from_strings(strings_from_all_vads, ioc_matcher)
     return (all_extracted_strings,)
 
 
@@ -767,6 +727,50 @@ def _():
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    Searching the whole dump means looking at the strings of every VAD, not just the suspicious ones.
+    `memtools.search` extracts them once into `strings.duckdb` and builds a trigram index on top, so a search takes milliseconds instead of a full re-extraction.
+    Building the index takes a while the first time, so it sits behind a button.
+    """
+    )
+    return
+
+
+@app.cell
+def _():
+    index_button = mo.ui.run_button(kind="info", label="Build / open string index")
+    index_button
+    return (index_button,)
+
+
+@app.cell
+def _(index_button):
+    mo.stop(not index_button.value)
+
+    from memtools.search import attach_index, search
+
+    attach_index(con)
+    dump_search_input = mo.ui.text(placeholder="domain, path, ...", debounce=200)
+    dump_search_input
+    return dump_search_input, search
+
+
+@app.cell
+def _(dump_search_input, search):
+    mo.stop(len(dump_search_input.value.strip()) < 3)
+
+    mo.ui.table(
+        search(con, dump_search_input.value.strip()).to_polars(),
+        format_mapping={"offset": format_hex_addr, "hit_offset": format_hex_addr},
+        selection=None,
+        show_column_summaries=False,
+    )
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(r"""## Highlighting""")
@@ -865,7 +869,10 @@ def _():
 
 @app.cell
 def _(strings_from_suspicious_vads):
-    unicode_text = strings_from_suspicious_vads.unicode.first().execute()
+    # the Unicode strings of one VAD, in the order they appear in memory
+    _unicode = strings_from_suspicious_vads.filter(_.encoding == "utf-16le")
+    _vad = _unicode.filter(_.vad_file == _unicode.vad_file.min()).order_by(_.offset)
+    unicode_text = " ".join(to_list(_vad.string))
     return (unicode_text,)
 
 
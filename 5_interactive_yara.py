@@ -168,56 +168,28 @@ def _():
         r"""
     We’ll reuse the same idea as our search highlighter: YARA gives us start and end offsets for every match. With those positions we can grab a small window of bytes around the hit and mark the exact region that matched.
 
-    To keep things flexible, our helper takes a highlighter function. It receives the surrounding chunk, the match boundaries (start and end), and a mode ("hex" or "ascii"). From there it decides how to format the output - by default it highlights the match, but you can also swap in a simpler version that just slices the bytes.
+    A rule can easily match thousands of times, so our helper prepares the views for all matches at once with `memtools.render.match_context`: it cuts out the context of every match, and converts all of them to hex and printable ASCII in one go. Each view comes back split into three parts - the bytes before the match, the match itself and the bytes after it. Turning those parts into highlighted HTML is left for later, when a table actually shows the row.
     """
     )
     return
 
 
 @app.cell
-def _(yara_x):
-    def yara_scan_with_context(binary: bytes, rule_text: str, context: int = 8, render_highlight=None):
+def _():
+    from memtools.render import match_context, match_spans
+    from memtools.yara import compile_rules
+
+
+    def yara_scan_with_context(binary: bytes, rule_text: str, context: int = 8):
         """
         Scan a binary with YARA-X and return matches with surrounding context.
         """
-
-        # default "highligthing" - just extract the match as is
-        if render_highlight is None:
-
-            def render_highlight(chunk, hs, he, mode):
-                return chunk[hs:he]
-
-        rules = yara_x.compile(rule_text)
+        # compiled once per rule text, the editor re-runs this on every change
+        rules = compile_rules(rule_text)
         result = rules.scan(binary)
 
-        matches = []
-        n = len(binary)
-
-        for rule in result.matching_rules:
-            for pat in rule.patterns:
-                for m in pat.matches:
-                    off, length = m.offset, m.length
-
-                    pre = max(0, off - context)
-                    post = min(n, off + length + context)
-
-                    chunk = binary[pre:post]
-                    hs = off - pre
-                    he = off - pre + length
-
-                    matches.append(
-                        {
-                            "rule": rule.identifier,
-                            "pattern": pat.identifier,
-                            "offset": off,
-                            "length": length,
-                            "bytes": render_highlight(chunk, hs, he, "hex"),
-                            "ascii": render_highlight(chunk, hs, he, "ascii"),
-                        }
-                    )
-
-        return matches
-    return (yara_scan_with_context,)
+        return match_context(binary, match_spans(result), context=context)
+    return compile_rules, yara_scan_with_context
 
 
 @app.cell(hide_code=True)
@@ -235,45 +207,22 @@ def _(binary, yara_rule, yara_scan_with_context):
 
 @app.cell(hide_code=True)
 def _():
-    mo.md(r"""Below are utility functions that prepare and highlight the bytes matched by a YARA rule.""")
+    mo.md(r"""Below is the utility function that turns one of those views into highlighted HTML.""")
     return
 
 
 @app.cell
 def _():
-    def _to_ascii(b: bytes) -> str:
-        """Convert bytes to printable ASCII; non-printables become '.'."""
-        return "".join(chr(x) if 0x20 <= x <= 0x7E else "." for x in b)
+    import html
 
 
-    def _clamp_span(start: int, end: int, n: int) -> tuple[int, int]:
-        """Clamp [start, end) to [0, n] and ensure end >= start."""
-        start = max(0, min(start, n))
-        end = max(start, min(end, n))
-        return start, end
-
-
-    def render_match(chunk: bytes, start: int, end: int, mode: str = "ascii") -> mo.Html:
+    def render_match(parts: tuple[str, str, str]) -> mo.Html:
         """
-        Render a highlighted match from a byte chunk.
+        Render a highlighted match from its (before, match, after) view.
 
-        start/end are byte indexes into the chunk, half-open [start, end).
-        In hex view each byte renders as one token like "3f". In ascii view each byte renders
-        as one character or '.'.
+        The parts are escaped first, memory is full of "<" and "&".
         """
-        if mode == "hex":
-            tokens = [f"{x:02x}" for x in chunk]
-            start, end = _clamp_span(start, end, len(tokens))
-            pre = " ".join(tokens[:start])
-            hit = " ".join(tokens[start:end])
-            post = " ".join(tokens[end:])
-        elif mode == "ascii":
-            s = _to_ascii(chunk)
-            start, end = _clamp_span(start, end, len(s))
-            pre, hit, post = s[:start], s[start:end], s[end:]
-        else:
-            raise ValueError("mode must be 'hex' or 'ascii'")
-
+        pre, hit, post = (html.escape(part) for part in parts)
         return create_highlight_html(pre, hit, post)
     return (render_match,)
 
@@ -362,9 +311,9 @@ def _():
 
 @app.cell
 def _(binary, render_match, yara_rule, yara_scan_with_context):
-    matches = yara_scan_with_context(binary, yara_rule, render_highlight=render_match, context=8)
+    matches = yara_scan_with_context(binary, yara_rule, context=8)
 
-    matches[0]
+    render_match(matches[0]["ascii"])
     return (matches,)
 
 
@@ -375,9 +324,14 @@ def _():
 
 
 @app.cell
-def _(matches):
+def _(matches, render_match):
     def show_matches(matches):
-        """Render YARA matches in a marimo table."""
+        """
+        Render YARA matches in a marimo table.
+
+        The table only calls `format_mapping` for the rows on the current page, so only those
+        are turned into HTML.
+        """
 
         def format_hex_addr(addr: int | None) -> str | None:
             return f"0x{addr:x}" if addr is not None else None
@@ -385,7 +339,7 @@ def _(matches):
         return mo.ui.table(
             matches,
             wrapped_columns=["bytes", "ascii"],
-            format_mapping={"offset": format_hex_addr},
+            format_mapping={"offset": format_hex_addr, "bytes": render_match, "ascii": render_match},
             selection=None,
             show_column_summaries=False,
             show_data_types=False,
@@ -494,6 +448,45 @@ def _():
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Profiling rules
+
+    A rule that matches the sample quickly can still crawl over a large VAD. Patterns like `{ 00 ?? }` give YARA-X only very short atoms to look for, so nearly every position of the file has to be checked. `memtools.profile.profile_rules` scans all dumped VADs with each rule, and with each pattern on its own, and reports the scan time, the number of matches and the compiler's warnings per rule and pattern. Sort the table by `scan_ms` to find the culprits.
+    """
+    )
+    return
+
+
+@app.cell
+def _(yara_rule):
+    profile_editor = mo.ui.code_editor(value=yara_rule, min_height=300, label="Rules to profile")
+    profile_button = mo.ui.run_button(kind="info", label="Profile over all VADs")
+    return profile_button, profile_editor
+
+
+@app.cell
+def _(profile_button, profile_editor, yara_x):
+    import glob as _glob
+
+    from memtools.plugins import VAD_DUMP_DIR
+    from memtools.profile import profile_rules
+
+    _profile = mo.md("Press the button to scan every VAD with the rules.")
+    if profile_button.value:
+        try:
+            with mo.status.spinner(title="Profiling rules..."):
+                _rows = profile_rules(profile_editor.value, _glob.glob(f"{VAD_DUMP_DIR}/*.dmp"))
+            _profile = mo.ui.table(_rows, selection=None, show_download=False, page_size=20)
+        except yara_x.CompileError as _error:
+            _profile = mo.Html(f"<pre>{_error}</pre>")
+
+    mo.hstack([mo.vstack([profile_editor, profile_button]), _profile], widths=[1, 1])
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
@@ -695,8 +688,8 @@ def _():
 
 
 @app.cell
-def _(binary, yara_rule, yara_x):
-    rules = yara_x.compile(yara_rule)
+def _(binary, compile_rules, yara_rule):
+    rules = compile_rules(yara_rule)
     result = rules.scan(binary)
     return (rules,)
 
@@ -719,6 +712,89 @@ def _(pytest, rules, samples):
     return
 
 
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Running a whole corpus
+
+    The inline samples are scanned one by one inside the test process, which gets slow once the corpus grows to thousands of VAD dumps and clean DLLs. `memtools.corpus` keeps the samples on disk instead, in a directory with a `manifest.json`:
+
+    ```json
+    {"samples": [
+        {"path": "keylogger/pid.6616.vad.0x2480000-0x24adfff.dmp", "expected": ["keylogger_specialkey_a", "keylogger_specialkey_b"]},
+        {"path": "clean/kernel32.dll", "expected": []}
+    ]}
+    ```
+
+    `run_corpus` scans them in parallel with one compiled rule set and remembers the results, so when only a few samples change only those are scanned again. `corpus_report` summarises precision, recall and false positive rate per rule, and `check_sample` is the assertion for the per-sample tests.
+    """
+    )
+    return
+
+
+@app.cell
+def _(yara_rule):
+    import os as _os
+
+    from memtools.corpus import check_sample, corpus_report, run_corpus
+
+    corpus_results = run_corpus(yara_rule, "corpus") if _os.path.exists("corpus/manifest.json") else []
+
+    mo.ui.table(corpus_report(corpus_results, yara_rule), selection=None, show_download=False)
+    return check_sample, corpus_results
+
+
+@app.cell
+def _(check_sample, corpus_results, pytest):
+    @pytest.mark.parametrize("result", corpus_results, ids=[r["name"] for r in corpus_results])
+    def test_corpus(result):
+        check_sample(result)
+    return
+
+
+@app.cell(hide_code=True)
+def _():
+    mo.md(
+        r"""
+    ### Sweeping every VAD
+
+    So far we scanned a single VAD. For the wide sweep from the incident response notebook we run the rules over every dumped VAD in `output/` instead.
+    `memtools.yara.sweep` compiles the rules once, scans the files in parallel worker processes and stores the matches in DuckDB. We then join them to `vadinfo` to see which process and VAD every hit came from.
+    """
+    )
+    return
+
+
+@app.cell
+def _():
+    sweep_button = mo.ui.run_button(kind="info", label="Sweep all VADs")
+    sweep_button
+    return (sweep_button,)
+
+
+@app.cell
+def _(sweep_button, yara_rule):
+    mo.stop(not sweep_button.value)
+
+    import functools
+
+    import ibis
+    from memtools.case import attach_case
+    from memtools.yara import sweep, with_vadinfo
+
+    _con = attach_case(ibis.duckdb.connect())
+    _matches = sweep(
+        _con,
+        yara_rule,
+        progress=functools.partial(mo.status.progress_bar, title="Scanning VADs", remove_on_exit=True),
+    )
+    sweep_matches = with_vadinfo(_matches, _con.table("vadinfo", database="case"))
+
+    mo.ui.table(sweep_matches.to_polars(), selection=None, show_column_summaries=False)
+    return
+
+
 @app.cell(hide_code=True)
 def _():
     mo.md(
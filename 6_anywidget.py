@@ -20,9 +20,13 @@ with app.setup(hide_code=True):
 
     from process_tree_widget import ProcessTreeWidget
     from process_tree_widget.tree import Process, ProcessTree
+    from memtools.case import attach_case, snake_case
 
     ibis.options.interactive = True
 
+    # the plugin output lives in a DuckDB case database, attached read-only as `case`
+    con = attach_case(ibis.duckdb.connect())
+
 
 @app.cell(hide_code=True)
 def _():
@@ -236,7 +240,13 @@ def _():
 
 @app.cell
 def _():
-    pstree = ibis.read_parquet("volatility_plugin_output/windows.pstree.PsTree.parquet")
+    # the widget expects the column names Volatility writes, the case has them snake_cased
+    _pstree = con.table("pstree", database="case")
+    _volatility_names = (
+        "PID PPID ImageFileName Offset(V) Threads Handles SessionId Wow64 CreateTime ExitTime Audit Cmd Path"
+    )
+    _renames = {name: snake_case(name) for name in _volatility_names.split() if snake_case(name) in _pstree.columns}
+    pstree = _pstree.rename(_renames)
     return (pstree,)
 
 
@@ -261,13 +271,13 @@ def _():
 
 @app.cell
 def _():
-    dll = ibis.read_parquet("volatility_plugin_output/windows.dlllist.DllList.parquet")
+    dll = con.table("dlllist", database="case")
     return (dll,)
 
 
 @app.cell
 def _(dll, widget):
-    dll.filter(_.PID == widget.process_id)
+    dll.filter(_.pid == widget.process_id)
     return
 
 
@@ -302,7 +312,7 @@ def _():
       const dllId = (name, path) =>
         `d:${(name || "").toLowerCase()}|${(path || "").toLowerCase()}`;
 
-      for (const { PID, Process, Name, Path, Base } of rows) {
+      for (const { pid: PID, process: Process, name: Name, path: Path, base: Base } of rows) {
         const p = pidId(PID);
         if (!G.hasNode(p)) {
           G.addNode(p, {
@@ -381,7 +391,7 @@ def _(css, esm):
 
 @app.cell
 def _(DllGraph, dll, widget):
-    _dlls = dll.filter(_.PID == widget.process_id)
+    _dlls = dll.filter(_.pid == widget.process_id)
     _dll_count = _dlls.count().execute()
 
     # use tenary operator so the statement "returns" a value
@@ -0,0 +1,7 @@
+"""
+Helpers shared by the workshop notebooks.
+
+The notebooks stay the place where the analysis happens. This package holds the parts that
+need to live in an importable module: code that runs in worker processes, command line
+entry points, and plumbing that several notebooks reuse.
+"""
@@ -0,0 +1,128 @@
+"""
+Content-addressed cache for plugin output.
+
+Results are keyed by a fingerprint of the dump, the plugin and its arguments, the
+Volatility config the plugin ran with and the installed volatility3 version, so switching
+between dumps or re-opening a case reuses earlier runs and never picks up output produced
+from a different image.
+"""
+
+import hashlib
+import os
+import shutil
+from importlib import metadata
+
+from memtools._util import atomic_output
+
+CACHE_DIR = ".memtools_cache"
+MAX_CACHE_BYTES = 5 * 1024**3
+
+SAMPLE_SIZE = 1024 * 1024
+SAMPLE_COUNT = 16
+
+
+def fingerprint(path, sample_size=SAMPLE_SIZE, samples=SAMPLE_COUNT):
+    """
+    Fast fingerprint of a (possibly huge) dump.
+
+    Hashes the file size together with `samples` evenly spaced blocks plus the first and
+    last block, so a 64 GB image costs a few megabytes of reads instead of a full pass.
+    """
+    size = os.path.getsize(path)
+    h = hashlib.blake2b(str(size).encode(), digest_size=20)
+
+    offsets = {0, max(size - sample_size, 0)}
+    offsets.update(i * size // (samples + 1) for i in range(1, samples + 1))
+
+    with open(path, "rb") as fh:
+        for offset in sorted(offsets):
+            fh.seek(offset)
+            h.update(fh.read(sample_size))
+
+    return h.hexdigest()
+
+
+def volatility_version():
+    try:
+        return metadata.version("volatility3")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def config_digest(config):
+    """Hash of the Volatility `config` file, empty if there is none."""
+    if not config or not os.path.exists(config):
+        return ""
+    with open(config, "rb") as fh:
+        return hashlib.blake2b(fh.read(), digest_size=20).hexdigest()
+
+
+def cache_key(dump_fingerprint, plugin, args=(), version=None, config=""):
+    """The key of a plugin result; `config` is the `config_digest` of the config it ran with."""
+    version = version or volatility_version()
+    parts = [dump_fingerprint, plugin, *args, version, config]
+    return hashlib.blake2b("\0".join(parts).encode(), digest_size=20).hexdigest()
+
+
+class PluginCache:
+    """
+    Plugin results stored under `cache_dir`, evicted least recently used first once the
+    total size grows past `max_bytes`.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.parquet")
+
+    def get(self, key, destination):
+        """Copy the cached result for `key` to `destination`. Returns False on a miss."""
+        path = self.path(key)
+        if not os.path.exists(path):
+            return False
+
+        # Another worker may evict the entry at any point, which is just a miss
+        try:
+            # mtime doubles as the last-used time, atime is often disabled
+            os.utime(path)
+            with atomic_output(destination) as tmp_path:
+                shutil.copyfile(path, tmp_path)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def put(self, key, source):
+        with atomic_output(self.path(key)) as tmp_path:
+            shutil.copyfile(source, tmp_path)
+        self.evict()
+
+    def entries(self):
+        """Cached files as (last_used, size, path), oldest first."""
+        entries = []
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith(".parquet"):
+                    try:
+                        st = os.stat(os.path.join(root, name))
+                    except FileNotFoundError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, os.path.join(root, name)))
+        return sorted(entries)
+
+    def size(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self):
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,287 @@
+"""
+A persistent DuckDB case database built from the Volatility plugin output.
+
+`ingest` loads every Parquet file in `volatility_plugin_output/` into one `.duckdb` file,
+with stable table names (`pslist`, `vadinfo`, ...), snake_case columns and unsigned
+64-bit address columns. The notebooks then attach that file read-only instead of
+scanning a dozen Parquet files on startup:
+
+    con = ibis.duckdb.connect()
+    attach_case(con)
+    malfind = con.table("malfind", database="case")
+
+Build or rebuild it from the command line with:
+
+    uv run python -m memtools.case
+
+The size and modification time of every file that went into the case are kept in it,
+so `ingest_changed` can load just the plugin output that was added or re-run since,
+see `memtools.watch`.
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+import threading
+from contextlib import contextmanager
+
+from memtools._util import atomic_output
+from memtools.plugins import PLUGIN_OUTPUT_DIR
+
+CASE_DB = "case.duckdb"
+# Plugin output files loaded into the case, with the size and modification time they had
+INGESTED_TABLE = "ingested_files"
+
+# Volatility plugin -> table name in the case database
+PLUGIN_TABLES = {
+    "windows.info.Info": "info",
+    "windows.pslist.PsList": "pslist",
+    "windows.psscan.PsScan": "psscan",
+    "windows.pstree.PsTree": "pstree",
+    "windows.cmdline.CmdLine": "cmdline",
+    "windows.dlllist.DllList": "dlllist",
+    "windows.ldrmodules.LdrModules": "ldrmodules",
+    "windows.handles.Handles": "handles",
+    "windows.getsids.GetSIDs": "getsids",
+    "windows.privileges.Privs": "privs",
+    "windows.netscan.NetScan": "netscan",
+    "windows.netstat.NetStat": "netstat",
+    "windows.malware.malfind.Malfind": "malfind",
+    "windows.malware.suspicious_threads.SuspiciousThreads": "suspicious_threads",
+    "windows.vadinfo.VadInfo": "vadinfo",
+    "windows.svcscan.SvcScan": "svcscan",
+}
+
+# Columns (after snake_casing) that hold virtual or physical addresses
+ADDRESS_COLUMNS = {
+    "offset",
+    "offset(v)",
+    "offset(p)",
+    "start_vpn",
+    "end_vpn",
+    "parent",
+    "base",
+    "address",
+}
+
+# Address column a table is ordered by within each pid, in order of preference
+SORT_ADDRESS_COLUMNS = ["start_vpn", "base", "address", "offset(v)", "offset"]
+
+_INTEGER_TYPES = {"TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT"}
+_UNSIGNED_TYPES = {"UTINYINT", "USMALLINT", "UINTEGER", "UBIGINT"}
+
+
+def snake_case(name):
+    """The same renaming `Table.rename("snake_case")` applies in Ibis."""
+    name = name.strip()
+    if " " in name:
+        return "_".join(name.lower().split()).replace("-", "_")
+    name = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1_\2", name)
+    name = re.sub(r"([a-z\d])([A-Z])", r"\1_\2", name)
+    return name.replace("-", "_").lower()
+
+
+def table_name(path):
+    """Stable table name for a plugin output file, e.g. `windows.vadinfo.VadInfo.parquet` -> `vadinfo`."""
+    plugin = os.path.basename(path).removesuffix(".parquet")
+    return PLUGIN_TABLES.get(plugin, snake_case(plugin.split(".")[-1]))
+
+
+def _quote(identifier):
+    return '"' + identifier.replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _column_expr(column, column_type):
+    name = snake_case(column)
+    expr = _quote(column)
+
+    if name in ADDRESS_COLUMNS:
+        if column_type in _INTEGER_TYPES:
+            # Kernel addresses that were written as signed integers wrap around to negative values
+            expr = f"CAST(CASE WHEN {expr} < 0 THEN {expr}::HUGEINT + 18446744073709551616 ELSE {expr} END AS UBIGINT)"
+        elif column_type in _UNSIGNED_TYPES:
+            expr = f"CAST({expr} AS UBIGINT)"
+
+    return f"{expr} AS {_quote(name)}"
+
+
+def sort_columns(columns):
+    """
+    The columns to order a plugin table by: pid first, then its main address column.
+
+    `columns` are the original Volatility names, the result uses the same names.
+    """
+    by_name = {snake_case(column): column for column in columns}
+    keys = [by_name["pid"]] if "pid" in by_name else []
+    for name in SORT_ADDRESS_COLUMNS:
+        if name in by_name:
+            keys.append(by_name[name])
+            break
+    return keys
+
+
+def plugin_query(con, path):
+    """The query reading plugin output `path` with the case's column names and types, ordered by pid and address."""
+    source = f"read_parquet({_literal(path)})"
+
+    columns = con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()
+    select = ", ".join(_column_expr(column, column_type) for column, column_type, *_ in columns)
+
+    query = f"SELECT {select} FROM {source}"
+    if keys := sort_columns([column for column, *_ in columns]):
+        query += " ORDER BY " + ", ".join(_quote(key) for key in keys)
+    return query
+
+
+def _target(name, database=None):
+    return f"{_quote(database)}.{_quote(name)}" if database else _quote(name)
+
+
+def ingest_plugin(con, path, name=None, database=None):
+    """
+    Load one plugin output file into the DuckDB connection `con` as table `name`.
+
+    Rows are stored ordered by pid and address, so the min/max statistics DuckDB keeps for
+    every row group let a filter on a single pid skip most of the table. The table is
+    created in the attached `database` if one is given.
+    """
+    name = name or table_name(path)
+    con.execute(f"CREATE OR REPLACE TABLE {_target(name, database)} AS {plugin_query(con, path)}")
+    _record_ingested(con, path, name, database)
+    return name
+
+
+def _file_stat(path):
+    stat = os.stat(path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def _record_ingested(con, path, name, database=None):
+    ingested = _target(INGESTED_TABLE, database)
+    con.execute(
+        f"CREATE TABLE IF NOT EXISTS {ingested} "
+        "(table_name VARCHAR PRIMARY KEY, path VARCHAR, size BIGINT, mtime_ns BIGINT)"
+    )
+    con.execute(f"INSERT OR REPLACE INTO {ingested} VALUES (?, ?, ?, ?)", [name, path, *_file_stat(path)])
+
+
+def plugin_files(plugin_dir=PLUGIN_OUTPUT_DIR):
+    return sorted(glob.glob(os.path.join(plugin_dir, "*.parquet")))
+
+
+def changed_plugin_files(con, plugin_dir=PLUGIN_OUTPUT_DIR, database=None):
+    """The plugin output files in `plugin_dir` that are new or differ from what was loaded into the case."""
+    ingested = {}
+    exists = "SELECT 1 FROM duckdb_tables() WHERE table_name = ? AND database_name = coalesce(?, current_database())"
+    if con.execute(exists, [INGESTED_TABLE, database]).fetchone():
+        query = f"SELECT table_name, size, mtime_ns FROM {_target(INGESTED_TABLE, database)}"
+        ingested = {name: (size, mtime_ns) for name, size, mtime_ns in con.execute(query).fetchall()}
+    return [path for path in plugin_files(plugin_dir) if ingested.get(table_name(path)) != _file_stat(path)]
+
+
+def ingest_changed(con, plugin_dir=PLUGIN_OUTPUT_DIR, database=None):
+    """
+    Load only the new or changed plugin output in `plugin_dir` into the case open as `con`.
+
+    The triage summary is recomputed if anything changed. Returns the names of the tables
+    that were replaced, an empty list if the case was up to date.
+    """
+    from memtools.triage import build_summary
+
+    tables = [ingest_plugin(con, path, database=database) for path in changed_plugin_files(con, plugin_dir, database)]
+    if tables:
+        tables.append(build_summary(con, database=database))
+    return tables
+
+
+def ingest(plugin_dir=PLUGIN_OUTPUT_DIR, case_path=CASE_DB):
+    """
+    Build the case database from every plugin output in `plugin_dir`.
+
+    The per-process triage summary is computed from the plugin tables at the same time,
+    see `memtools.triage`. The database is written to a temporary file first, so an open
+    case is only ever replaced by a complete one. Returns the names of the tables that
+    were created.
+    """
+    import duckdb
+
+    from memtools.triage import build_summary
+
+    with atomic_output(case_path) as tmp_path:
+        # DuckDB refuses to open the empty placeholder file
+        os.remove(tmp_path)
+        con = duckdb.connect(tmp_path)
+        try:
+            tables = [ingest_plugin(con, path) for path in plugin_files(plugin_dir)]
+            tables.append(build_summary(con))
+        finally:
+            con.close()
+
+    return tables
+
+
+def attach_case(con, case_path=CASE_DB, plugin_dir=PLUGIN_OUTPUT_DIR, name="case"):
+    """
+    Attach the case database read-only to the Ibis DuckDB connection `con`.
+
+    The database is built from `plugin_dir` first if it doesn't exist yet.
+    """
+    if not os.path.exists(case_path):
+        ingest(plugin_dir, case_path)
+
+    # re-running a setup cell reuses the notebook's connection
+    attached = {row[0] for row in con.raw_sql("SELECT database_name FROM duckdb_databases()").fetchall()}
+    if name not in attached:
+        con.attach(case_path, name=name, read_only=True)
+    return con
+
+
+_writable_lock = threading.RLock()
+
+
+@contextmanager
+def writable_case(con, case_path=CASE_DB, name="case"):
+    """
+    Attach the case database read-write to `con` for the duration of the `with` block.
+
+    Tables derived from the plugin output, like the disassembly cache, are stored in the
+    case too. The read-only attachment is swapped for a writable one and back, which only
+    works while no other process has the case open: DuckDB lets several processes read a
+    database, but only one write to it, and then nobody else can read it. Another notebook
+    kernel with the case attached makes the writable attach fail with DuckDB's lock error.
+    The case is attached read-only again either way, but queries running during the swap
+    fail, as the case is briefly not attached at all.
+    """
+    # A cursor of its own, so this also works from a thread other than the notebook's, and
+    # one swap at a time, as the watcher may update the case while a cell writes to it
+    with _writable_lock:
+        db = con.con.cursor()
+        db.execute(f"DETACH DATABASE IF EXISTS {_quote(name)}")
+        try:
+            db.execute(f"ATTACH {_literal(case_path)} AS {_quote(name)}")
+            yield con
+        finally:
+            db.execute(f"DETACH DATABASE IF EXISTS {_quote(name)}")
+            db.execute(f"ATTACH {_literal(case_path)} AS {_quote(name)} (READ_ONLY)")
+            db.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.case", description="Build the DuckDB case database.")
+    parser.add_argument("-d", "--plugin-dir", default=PLUGIN_OUTPUT_DIR, help="directory with the Parquet files")
+    parser.add_argument("-o", "--output", default=CASE_DB, help="case database to write")
+    args = parser.parse_args(argv)
+
+    tables = ingest(args.plugin_dir, args.output)
+    print(f"{args.output}: {', '.join(tables) or 'no plugin output found'}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
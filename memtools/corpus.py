@@ -0,0 +1,240 @@
+"""
+Run YARA rules over a corpus of labelled samples.
+
+A corpus is a directory with a `manifest.json` that lists every sample file, relative to
+the directory, and the rules expected to match it:
+
+    {"samples": [
+        {"path": "keylogger/pid.6616.vad.0x2480000-0x24adfff.dmp", "expected": ["keylogger_specialkey_a"]},
+        {"path": "clean/kernel32.dll", "expected": []}
+    ]}
+
+`run_corpus` compiles the rules once and scans the samples across a process pool. The
+rules that matched each sample are remembered per rule text, so a rerun only scans the
+samples that were added or modified since. `corpus_report` turns the results into
+precision, recall and false positive rate per rule:
+
+    results = run_corpus(rule_text, "corpus")
+    corpus_report(results, rule_text)
+
+In a notebook or test module, `check_sample` is the assertion for one result:
+
+    @pytest.mark.parametrize("result", results, ids=[r["name"] for r in results])
+    def test_corpus(result):
+        check_sample(result)
+
+From the command line:
+
+    uv run python -m memtools.corpus corpus rules.yar
+"""
+
+import argparse
+import io
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from memtools import yara
+from memtools._util import atomic_output
+from memtools.cache import CACHE_DIR
+from memtools.profile import rule_spans
+
+MANIFEST = "manifest.json"
+RESULTS_CACHE_DIR = os.path.join(CACHE_DIR, "corpus")
+MAX_SAVED_RESULTS = 64
+
+
+def load_manifest(corpus_dir):
+    """The samples of the corpus in `corpus_dir`, with absolute paths and a name each."""
+    with open(os.path.join(corpus_dir, MANIFEST)) as fh:
+        manifest = json.load(fh)
+
+    return [
+        {
+            "name": sample.get("name", sample["path"]),
+            "path": os.path.abspath(os.path.join(corpus_dir, sample["path"])),
+            "expected": sorted(sample.get("expected", [])),
+        }
+        for sample in manifest["samples"]
+    ]
+
+
+def _stat(path):
+    """Size and modification time of `path`, None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _matching_rules(path):
+    """
+    Identifiers of the rules matching `path`, scanned with the rules loaded by
+    `yara._init_worker`, and the error if the scan failed.
+    """
+    import yara_x
+
+    try:
+        result = yara._worker_scanner.scan_file(path)
+    except (yara_x.ScanError, yara_x.TimeoutError) as e:
+        return [], f"{type(e).__name__}: {e}"
+    return sorted(rule.identifier for rule in result.matching_rules), None
+
+
+def _load_results(path):
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except ValueError:
+        return {}
+
+
+def _save_results(path, results):
+    with atomic_output(path) as tmp_path:
+        with open(tmp_path, "w") as fh:
+            json.dump(results, fh)
+
+    saved = sorted(
+        (entry.stat().st_mtime, entry.path)
+        for entry in os.scandir(os.path.dirname(path))
+        if entry.name.endswith(".json")
+    )
+    for _, old in saved[: max(len(saved) - MAX_SAVED_RESULTS, 0)]:
+        os.remove(old)
+
+
+def run_corpus(rule_text, corpus_dir, workers=None, cache_dir=RESULTS_CACHE_DIR):
+    """
+    Scan every sample of the corpus in `corpus_dir` with the rules in `rule_text`.
+
+    Returns the samples with a `matched` list of rule identifiers and an `error` added. A
+    sample that is missing or fails to scan has no matches and the reason as its `error`,
+    the other samples are still scanned. Samples whose size and modification time are the
+    same as in the last run with the same rules are not scanned again, unless they failed;
+    pass `cache_dir=None` to scan everything.
+    """
+    samples = load_manifest(corpus_dir)
+    cache_path = os.path.join(cache_dir, f"{yara.rules_key(rule_text)}.json") if cache_dir else None
+    previous = _load_results(cache_path) if cache_path else {}
+
+    results = {}
+    stale = []
+    for sample in samples:
+        stat = _stat(sample["path"])
+        earlier = previous.get(sample["path"])
+        if stat is None:
+            results[sample["path"]] = {"stat": None, "matched": [], "error": "sample file not found"}
+        elif earlier is not None and earlier["stat"] == stat and not earlier.get("error"):
+            results[sample["path"]] = earlier
+        else:
+            results[sample["path"]] = {"stat": stat}
+            stale.append(sample["path"])
+
+    if stale:
+        buffer = io.BytesIO()
+        yara.compile_rules(rule_text).serialize_into(buffer)
+
+        # Largest files first, like in `memtools.yara.match_batches`
+        stale.sort(key=os.path.getsize, reverse=True)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=yara._init_worker,
+            initargs=(buffer.getvalue(),),
+        ) as pool:
+            for path, (matched, error) in zip(stale, pool.map(_matching_rules, stale, chunksize=16)):
+                results[path].update(matched=matched, error=error)
+
+        if cache_path:
+            _save_results(cache_path, results)
+
+    return [
+        {**sample, "matched": results[sample["path"]]["matched"], "error": results[sample["path"]].get("error")}
+        for sample in samples
+    ]
+
+
+def _ratio(numerator, denominator):
+    return numerator / denominator if denominator else None
+
+
+def corpus_report(results, rule_text=None):
+    """
+    True/false positives and negatives, precision, recall and false positive rate per rule.
+
+    Rules come from the expectations and matches in `results`, plus every rule declared in
+    `rule_text` so rules that never fire are reported too. Samples that failed to scan
+    aren't counted.
+    """
+    results = [result for result in results if not result.get("error")]
+    rules = {rule for result in results for rule in (*result["expected"], *result["matched"])}
+    if rule_text is not None:
+        rules.update(name for name, _, _ in rule_spans(rule_text.encode()))
+
+    rows = []
+    for rule in sorted(rules):
+        counts = {"tp": 0, "fp": 0, "fn": 0, "tn": 0}
+        for result in results:
+            expected, matched = rule in result["expected"], rule in result["matched"]
+            counts[("t" if expected == matched else "f") + ("p" if matched else "n")] += 1
+
+        rows.append(
+            {
+                "rule": rule,
+                **counts,
+                "precision": _ratio(counts["tp"], counts["tp"] + counts["fp"]),
+                "recall": _ratio(counts["tp"], counts["tp"] + counts["fn"]),
+                "false_positive_rate": _ratio(counts["fp"], counts["fp"] + counts["tn"]),
+            }
+        )
+    return rows
+
+
+def check_sample(result):
+    """Assert that the sample of `result` was scanned and exactly the expected rules matched."""
+    assert not result.get("error"), f"Error: {result['error']}"
+    expected, matched = set(result["expected"]), set(result["matched"])
+    missing = expected - matched
+    unexpected = matched - expected
+    assert not missing and not unexpected, f"Missing: {sorted(missing)} | Unexpected: {sorted(unexpected)}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.corpus", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("corpus", help=f"directory with a {MANIFEST}")
+    parser.add_argument("rules", help="file with the YARA rules")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("--no-cache", action="store_true", help="scan every sample, even unchanged ones")
+    args = parser.parse_args(argv)
+
+    with open(args.rules) as fh:
+        rule_text = fh.read()
+
+    cache_dir = None if args.no_cache else RESULTS_CACHE_DIR
+    results = run_corpus(rule_text, args.corpus, workers=args.jobs, cache_dir=cache_dir)
+
+    def percent(value):
+        return "-" if value is None else f"{value:.1%}"
+
+    print(f"{'rule':<40} {'tp':>5} {'fp':>5} {'fn':>5} {'tn':>5} {'precision':>10} {'recall':>8} {'fpr':>8}")
+    for row in corpus_report(results, rule_text):
+        print(
+            f"{row['rule']:<40} {row['tp']:>5} {row['fp']:>5} {row['fn']:>5} {row['tn']:>5} "
+            f"{percent(row['precision']):>10} {percent(row['recall']):>8} {percent(row['false_positive_rate']):>8}"
+        )
+
+    failed = [
+        result for result in results if result["error"] or set(result["expected"]) != set(result["matched"])
+    ]
+    for result in failed:
+        print(f"FAIL {result['name']}" + (f" ({result['error']})" if result["error"] else ""), file=sys.stderr)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
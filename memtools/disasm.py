@@ -0,0 +1,283 @@
+"""
+Disassemble malfind hits with Capstone, a whole Arrow batch at a time.
+
+A `@ibis.udf.scalar.python` UDF is called once per row, with every `Hexdump` value copied
+from DuckDB into Python on its own. `disasm` is a `@ibis.udf.scalar.pyarrow` UDF instead:
+DuckDB hands it a chunk of rows as Arrow arrays and gets one array back. The Capstone
+engine for each mode is created once per process. Code of 32-bit processes running under
+WOW64 is disassembled as x86, everything else as x64:
+
+    malfind = with_wow64(malfind, pslist)
+    malfind.mutate(disasm=disasm(malfind.Hexdump, malfind["Start VPN"], malfind.Wow64))
+
+`instructions` returns the instructions as a list of (address, size, mnemonic, op_str)
+structs instead of text, and `instruction_table` has one row per instruction, so looking
+for syscalls or jumps into odd ranges across all hits is a plain DuckDB filter:
+
+    code = instruction_table(with_wow64(malfind, pslist))
+    code.filter(code.mnemonic == "syscall")
+
+For many hits, across several dumps, `disassemble_table` spreads the batches over a
+process pool and stores the result in DuckDB:
+
+    disassemble_table(con, with_wow64(malfind, pslist), workers=8)
+
+Malfind regions in different processes, and in different dumps, often hold the same
+shellcode stub. `cached_disasm` keeps every disassembly in a `disasm_cache` table of the
+case database, keyed by the SHA-256 of the code, the start address and the mode, and fills
+the column by joining that table. Only code it hasn't seen before goes through Capstone:
+
+    cached_disasm(con, with_wow64(malfind, pslist))
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import ibis
+import ibis.expr.datatypes as dt
+import pyarrow as pa
+
+from memtools.case import CASE_DB, _quote, writable_case
+from memtools.strings import load_batches
+
+INSTRUCTION_TYPE = pa.list_(
+    pa.struct(
+        [
+            ("address", pa.uint64()),
+            ("size", pa.uint8()),
+            ("mnemonic", pa.string()),
+            ("op_str", pa.string()),
+        ]
+    )
+)
+
+DISASM_CACHE_TABLE = "disasm_cache"
+MAX_CACHED_DISASSEMBLIES = 100_000
+
+
+@lru_cache(maxsize=None)
+def engine(wow64=False):
+    """The Capstone engine for 32-bit (WOW64) or 64-bit code, one per process and mode."""
+    from capstone import CS_ARCH_X86, CS_MODE_32, CS_MODE_64, Cs
+
+    return Cs(CS_ARCH_X86, CS_MODE_32 if wow64 else CS_MODE_64)
+
+
+def disassemble(code, address, wow64=False):
+    """Disassembly of `code` loaded at `address`, one `0x<address>:\\t<mnemonic>\\t<operands>` line per instruction."""
+    if code is None:
+        return None
+    # disasm_lite yields (address, size, mnemonic, operands)
+    return "\n".join(
+        f"0x{address:x}:\t{mnemonic}\t{op_str}"
+        for address, _, mnemonic, op_str in engine(bool(wow64)).disasm_lite(code, address or 0)
+    )
+
+
+def disassemble_arrays(code, address, wow64):
+    """`disassemble` over Arrow arrays of code, start address and WOW64 flag."""
+    return pa.array(
+        [disassemble(*row) for row in zip(code.to_pylist(), address.to_pylist(), wow64.to_pylist())],
+        type=pa.string(),
+    )
+
+
+@ibis.udf.scalar.pyarrow
+def disasm(code: dt.binary, address: dt.uint64, wow64: dt.boolean) -> dt.string:
+    """Disassemble `code` at `address`, as x86 for WOW64 processes and x64 otherwise."""
+    return disassemble_arrays(code, address, wow64)
+
+
+def instruction_arrays(code, address, wow64):
+    """The instructions in each row of Arrow arrays of code, start address and WOW64 flag, as a list array."""
+    offsets, addresses, sizes, mnemonics, operands = [0], [], [], [], []
+    valid = []
+    for row_code, row_address, row_wow64 in zip(code.to_pylist(), address.to_pylist(), wow64.to_pylist()):
+        valid.append(row_code is not None)
+        if row_code is not None:
+            for insn_address, size, mnemonic, op_str in engine(bool(row_wow64)).disasm_lite(row_code, row_address or 0):
+                addresses.append(insn_address)
+                sizes.append(size)
+                mnemonics.append(mnemonic)
+                operands.append(op_str)
+        offsets.append(len(addresses))
+
+    values = pa.StructArray.from_arrays(
+        [
+            pa.array(addresses, pa.uint64()),
+            pa.array(sizes, pa.uint8()),
+            pa.array(mnemonics, pa.string()),
+            pa.array(operands, pa.string()),
+        ],
+        fields=list(INSTRUCTION_TYPE.value_type),
+    )
+    return pa.ListArray.from_arrays(
+        pa.array(offsets, pa.int32()), values, type=INSTRUCTION_TYPE, mask=pa.array([not v for v in valid])
+    )
+
+
+@ibis.udf.scalar.pyarrow
+def instructions(
+    code: dt.binary, address: dt.uint64, wow64: dt.boolean
+) -> ibis.dtype("array<struct<address: uint64, size: uint8, mnemonic: string, op_str: string>>"):
+    """The instructions of `code` at `address` as (address, size, mnemonic, op_str) structs."""
+    return instruction_arrays(code, address, wow64)
+
+
+def instruction_table(table, code="Hexdump", address="Start VPN", wow64="Wow64"):
+    """
+    One row per instruction in `table`, with the columns of `table` except `code` plus the
+    instruction's address, size, mnemonic and op_str.
+    """
+    per_row = table.mutate(_instruction=instructions(table[code], table[address], table[wow64]).unnest())
+    return per_row.drop(code).unpack("_instruction")
+
+
+def with_wow64(table, pslist, pid="PID"):
+    """
+    Add the WOW64 flag of the owning process from `pslist` to `table`.
+
+    Works with the raw plugin output and the case database alike: the flag keeps the name
+    it has in `pslist`, `Wow64` or `wow64`.
+    """
+    columns = {column.lower(): column for column in pslist.columns}
+    processes = pslist.select(_wow64_pid=pslist[columns["pid"]], **{columns["wow64"]: pslist[columns["wow64"]]})
+    joined = table.left_join(processes, table[pid] == processes._wow64_pid)
+    return joined.drop("_wow64_pid")
+
+
+def _disassemble_batch(batch, code, address, wow64, name):
+    column = disassemble_arrays(batch[code], batch[address], batch[wow64])
+    return batch.append_column(name, column)
+
+
+def disassemble_table(
+    con,
+    table,
+    code="Hexdump",
+    address="Start VPN",
+    wow64="Wow64",
+    name="disassembly",
+    table_name="malfind_disassembly",
+    workers=None,
+):
+    """
+    Store `table` with its disassembly in column `name` as the DuckDB table `table_name`.
+
+    The rows are disassembled in batches across a pool of `workers` processes. `table`
+    needs a `wow64` column, see `with_wow64`. DuckDB column names ignore case, so `name`
+    can't be `disasm` next to malfind's own `Disasm`. Returns the new table.
+    """
+    reader = table.to_pyarrow_batches()
+    schema = reader.schema.append(pa.field(name, pa.string()))
+
+    # The DuckDB connection runs threads of its own, so the workers are spawned, not forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_disassemble_batch, batch, code, address, wow64, name) for batch in reader]
+        return load_batches(con, table_name, (future.result() for future in futures), schema=schema)
+
+
+@ibis.udf.scalar.builtin
+def sha256(value: dt.binary) -> dt.string:
+    """DuckDB's SHA-256 of a blob, as a hex string."""
+
+
+def _update_cache(db, cache, wanted, name, max_entries):
+    """Stamp the entries for the code in `wanted` as used, add those missing and evict old ones."""
+    db.execute(
+        f"CREATE TABLE IF NOT EXISTS {cache} "
+        f"(code_hash VARCHAR, address UBIGINT, wow64 BOOLEAN, {_quote(name)} VARCHAR, last_used TIMESTAMP)"
+    )
+    (stamp,) = db.execute("SELECT now()::TIMESTAMP").fetchone()
+    db.register("_disasm_wanted", wanted)
+    try:
+        keys = "c.code_hash = w._code_hash AND c.address = w._address AND c.wow64 = w._wow64"
+        db.execute(f"UPDATE {cache} AS c SET last_used = ? FROM _disasm_wanted AS w WHERE {keys}", [stamp])
+        misses = db.execute(
+            f"SELECT * FROM _disasm_wanted AS w WHERE NOT EXISTS (SELECT 1 FROM {cache} AS c WHERE {keys})"
+        ).fetch_arrow_table()
+    finally:
+        db.unregister("_disasm_wanted")
+
+    if misses.num_rows:
+        misses = misses.append_column(name, disassemble_arrays(misses["_code"], misses["_address"], misses["_wow64"]))
+        db.register("_disasm_misses", misses)
+        try:
+            db.execute(
+                f"INSERT INTO {cache} "
+                f"SELECT _code_hash, _address, _wow64, {_quote(name)}, ? FROM _disasm_misses",
+                [stamp],
+            )
+        finally:
+            db.unregister("_disasm_misses")
+
+    # Entries used right now are never evicted, even if there are more than `max_entries`
+    db.execute(
+        f"DELETE FROM {cache} WHERE last_used < ? AND rowid IN "
+        f"(SELECT rowid FROM {cache} ORDER BY last_used DESC OFFSET {int(max_entries)})",
+        [stamp],
+    )
+
+
+def cached_disasm(
+    con,
+    table,
+    code="hexdump",
+    address="start_vpn",
+    wow64="wow64",
+    name="disassembly",
+    case_path=CASE_DB,
+    case_name="case",
+    max_entries=MAX_CACHED_DISASSEMBLIES,
+):
+    """
+    `table` with the disassembly of each row in column `name`, from the cache in the case database.
+
+    Code missing from the cache is disassembled and added first. Entries are stamped when
+    they are used, and once there are more than `max_entries` the least recently used ones
+    not needed for `table` are dropped. The case is attached to `con` as `case_name` and
+    briefly reattached writable, see `memtools.case.writable_case`. While another process
+    has the case open that fails with DuckDB's lock error, and every row is disassembled
+    with `disasm` instead, without the cache. Rebuilding the case starts over with an
+    empty cache.
+    """
+    import duckdb
+
+    keyed = table.mutate(
+        _code_hash=sha256(table[code]),
+        _address=table[address].cast("uint64"),
+        _wow64=table[wow64].fill_null(False),
+    )
+    wanted = (
+        keyed.filter(keyed[code].notnull())
+        .select("_code_hash", "_address", "_wow64", _code=keyed[code])
+        .distinct(on=["_code_hash", "_address", "_wow64"])
+        .to_pyarrow()
+    )
+
+    cache = f"{_quote(case_name)}.{DISASM_CACHE_TABLE}"
+    try:
+        with writable_case(con, case_path, case_name):
+            _update_cache(con.con, cache, wanted, name, max_entries)
+    except duckdb.IOException:
+        # Nothing can be cached while another process has the case open
+        column = disasm(table[code], table[address].cast("uint64"), table[wow64].fill_null(False))
+        return table.mutate(**{name: column})
+
+    cached = con.table(DISASM_CACHE_TABLE, database=case_name)
+    cached = cached.select(
+        _cached_hash=cached.code_hash,
+        _cached_address=cached.address,
+        _cached_wow64=cached.wow64,
+        **{name: cached[name]},
+    )
+    joined = keyed.left_join(
+        cached,
+        [
+            keyed._code_hash == cached._cached_hash,
+            keyed._address == cached._cached_address,
+            keyed._wow64 == cached._cached_wow64,
+        ],
+    )
+    return joined.drop("_code_hash", "_address", "_wow64", "_cached_hash", "_cached_address", "_cached_wow64")
@@ -0,0 +1,142 @@
+"""
+Plugin output of many hosts in one place, queried as one table per plugin.
+
+During an incident the same plugins are run against the memory of dozens of hosts. Each
+host's output is added to a Hive-partitioned fleet directory, in the same shape as the
+case database (snake_case columns, unsigned addresses, sorted by pid and address):
+
+    fleet/host=CLIENT-02/plugin=dlllist/data.parquet
+    fleet/host=CLIENT-07/plugin=dlllist/data.parquet
+
+`attach_fleet` makes every plugin available as a view with a `host` column, attached to
+the connection as `fleet` next to `case`. A filter on `host` only opens that host's files,
+a filter on `pid` skips the row groups of other processes:
+
+    attach_fleet(con)
+    dlllist = con.table("dlllist", database="fleet")
+    dlllist.filter(_.host == "CLIENT-02", _.pid == 7000)
+
+So stacking across the fleet, such as the DLLs loaded on the fewest hosts, is one query:
+
+    dlllist.group_by("name").agg(hosts=_.host.nunique()).order_by("hosts")
+
+For large fleets, `memtools.stacking.rare_values` counts the same from the distinct values
+stored per host, without reading the plugin output again.
+
+Add a host's plugin output from the command line with:
+
+    uv run python -m memtools.plugins -f CLIENT-07.dmp -d plugin_output/CLIENT-07 -c plugin_output/CLIENT-07/config.json
+    uv run python -m memtools.fleet CLIENT-07 -d plugin_output/CLIENT-07
+"""
+
+import argparse
+import glob
+import os
+import re
+import sys
+
+from memtools._util import atomic_output
+from memtools.case import _literal, _quote, plugin_files, plugin_query, table_name
+from memtools.normalize import row_group_size
+from memtools.plugins import PLUGIN_OUTPUT_DIR
+
+FLEET_DIR = "fleet"
+FLEET_FILE = "data.parquet"
+
+# Host names end up in directory names and in `host=...` partition keys
+HOST_RE = re.compile(r"^[\w.-]+$")
+
+
+def fleet_path(host, plugin, fleet_dir=FLEET_DIR):
+    """Where the output of `plugin` (a case table name such as `dlllist`) for `host` is kept."""
+    return os.path.join(fleet_dir, f"host={host}", f"plugin={plugin}", FLEET_FILE)
+
+
+def add_plugin(con, host, path, fleet_dir=FLEET_DIR):
+    """Write the plugin output file `path` of `host` into the fleet. Returns the plugin's table name."""
+    plugin = table_name(path)
+    query = plugin_query(con, path)
+
+    size = None
+    if "pid" in (column for column, *_ in con.execute(f"DESCRIBE {query}").fetchall()):
+        rows, pids = con.execute(f"SELECT count(*), count(DISTINCT pid) FROM ({query})").fetchone()
+        size = row_group_size(rows, pids)
+
+    options = "FORMAT parquet" + (f", ROW_GROUP_SIZE {size}" if size else "")
+    with atomic_output(fleet_path(host, plugin, fleet_dir)) as tmp_path:
+        con.execute(f"COPY ({query}) TO {_literal(tmp_path)} ({options})")
+    return plugin
+
+
+def add_host(host, plugin_dir=PLUGIN_OUTPUT_DIR, fleet_dir=FLEET_DIR):
+    """
+    Add every plugin output in `plugin_dir` to the fleet as the output of `host`.
+
+    Output the host already has for the same plugin is replaced, and the host's stacked
+    values are stored again, see `memtools.stacking`. Returns the plugin table names that
+    were written.
+    """
+    import duckdb
+
+    from memtools.stacking import stack_host
+
+    if not HOST_RE.match(host):
+        raise ValueError(f"host names may only contain letters, digits, '.', '-' and '_': {host!r}")
+
+    con = duckdb.connect()
+    try:
+        plugins = [add_plugin(con, host, path, fleet_dir) for path in plugin_files(plugin_dir)]
+    finally:
+        con.close()
+    stack_host(host, fleet_dir)
+    return plugins
+
+
+def fleet_hosts(fleet_dir=FLEET_DIR):
+    return sorted(os.path.basename(path).removeprefix("host=") for path in glob.glob(os.path.join(fleet_dir, "host=*")))
+
+
+def fleet_plugins(fleet_dir=FLEET_DIR):
+    paths = glob.glob(os.path.join(fleet_dir, "host=*", "plugin=*"))
+    return sorted({os.path.basename(path).removeprefix("plugin=") for path in paths})
+
+
+def attach_fleet(con, fleet_dir=FLEET_DIR, name="fleet"):
+    """
+    Attach a database `name` to the Ibis DuckDB connection `con` with a view per plugin in the fleet.
+
+    The views read the Parquet files of all hosts with a `host` column taken from the
+    directory names. Hosts and plugins added later show up after calling this again.
+    """
+    attached = {row[0] for row in con.raw_sql("SELECT database_name FROM duckdb_databases()").fetchall()}
+    if name not in attached:
+        con.raw_sql(f"ATTACH ':memory:' AS {_quote(name)}")
+
+    for plugin in fleet_plugins(fleet_dir):
+        files = os.path.join(fleet_dir, "host=*", f"plugin={plugin}", "*.parquet")
+        # Keep host names such as 01 strings, the plugin is the same in every file of the view
+        source = (
+            f"read_parquet({_literal(files)}, hive_partitioning = true, "
+            f"hive_types = {{'host': VARCHAR}}, union_by_name = true)"
+        )
+        con.raw_sql(
+            f"CREATE OR REPLACE VIEW {_quote(name)}.{_quote(plugin)} AS "
+            f"SELECT host, * EXCLUDE (host, plugin) FROM {source}"
+        )
+    return con
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.fleet", description="Add a host's plugin output to the fleet.")
+    parser.add_argument("host", help="name of the host the memory dump was taken from")
+    parser.add_argument("-d", "--plugin-dir", default=PLUGIN_OUTPUT_DIR, help="directory with the Parquet files")
+    parser.add_argument("--fleet-dir", default=FLEET_DIR, help="fleet directory to add the host to")
+    args = parser.parse_args(argv)
+
+    plugins = add_host(args.host, args.plugin_dir, args.fleet_dir)
+    print(f"{args.fleet_dir}: {args.host} ({', '.join(plugins) or 'no plugin output found'})")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
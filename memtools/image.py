@@ -0,0 +1,295 @@
+"""
+Scan the raw memory image with YARA-X in fixed-size windows.
+
+Reading `CLIENT-02.dmp` into a single `bytes` object doesn't work for images larger than
+the RAM of the analysis machine. `scan_image` instead memory-maps the image one window at
+a time and scans the windows across a process pool. Each window is extended by `overlap`
+bytes into the next one, so a match that crosses a window boundary is still found whole,
+and a match is only kept by the window it starts in, so it is reported once:
+
+    matches = scan_image(con, "CLIENT-02.dmp", rule_text)
+
+The matches have offsets into the image file. `process_pages` walks the page tables of
+every process with Volatility and stores which file ranges back which virtual pages, and
+`with_owners` adds the pid, process name and virtual address of each match from it:
+
+    pages = process_pages(con, "CLIENT-02.dmp")
+    with_owners(matches, pages)
+
+Two caveats follow from scanning windows instead of the whole file: `overlap` has to be
+at least as long as the longest match, and rule conditions are evaluated per window, so
+conditions on `filesize` or on the match count see one window, not the image.
+
+From the command line:
+
+    uv run python -m memtools.image -f CLIENT-02.dmp rules.yar
+"""
+
+import argparse
+import io
+import json
+import mmap
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+
+from memtools import yara
+from memtools.plugins import CONFIG_FILE, check_config
+from memtools.strings import load_batches
+
+WINDOW_SIZE = 64 * 1024 * 1024
+OVERLAP = 1024 * 1024
+
+# Windows puts the kernel in the upper half of the address space, shared by every process
+USER_SPACE_END = {32: 0x80000000, 64: 0x800000000000}
+
+# One row per match of a scan over the raw image
+IMAGE_MATCHES_SCHEMA = pa.schema(
+    [
+        ("rule", pa.string()),
+        ("namespace", pa.string()),
+        ("pattern", pa.string()),
+        ("file_offset", pa.uint64()),
+        ("length", pa.uint64()),
+    ]
+)
+
+# One row per contiguous run of a process' virtual memory in the image file
+PAGES_SCHEMA = pa.schema(
+    [
+        ("pid", pa.int64()),
+        ("process", pa.string()),
+        ("virtual_start", pa.uint64()),
+        ("file_start", pa.uint64()),
+        ("file_end", pa.uint64()),
+    ]
+)
+
+
+def windows(size, window=WINDOW_SIZE, overlap=OVERLAP):
+    """(start, length) of the windows covering a file of `size` bytes, overlap included."""
+    if window <= 0 or overlap < 0:
+        raise ValueError("window must be positive and overlap can't be negative")
+    for start in range(0, size, window):
+        yield start, min(window + overlap, size - start)
+
+
+def _scan_window(path, start, length, window):
+    """Matches starting in `[start, start + window)` of `path` as a record batch."""
+    import yara_x
+
+    # mmap offsets have to be a multiple of the allocation granularity
+    aligned = start - start % mmap.ALLOCATIONGRANULARITY
+    with open(path, "rb") as fh, mmap.mmap(
+        fh.fileno(), length + start - aligned, offset=aligned, access=mmap.ACCESS_READ
+    ) as mm:
+        data = mm[start - aligned :]
+
+    rows = {name: [] for name in IMAGE_MATCHES_SCHEMA.names}
+    try:
+        result = yara._worker_scanner.scan(data)
+    except yara_x.ScanError:
+        result = None
+
+    for rule in result.matching_rules if result else ():
+        for pattern in rule.patterns:
+            for match in pattern.matches:
+                # Matches starting in the overlap belong to the next window, which finds them too
+                if match.offset >= window:
+                    continue
+                rows["rule"].append(rule.identifier)
+                rows["namespace"].append(rule.namespace)
+                rows["pattern"].append(pattern.identifier)
+                rows["file_offset"].append(start + match.offset)
+                rows["length"].append(match.length)
+
+    return pa.RecordBatch.from_pydict(rows, schema=IMAGE_MATCHES_SCHEMA)
+
+
+def image_match_batches(path, rule_text, window=WINDOW_SIZE, overlap=OVERLAP, workers=None):
+    """
+    Scan `path` window by window across a process pool.
+
+    Workers load the compiled rules once, like in `memtools.yara.match_batches`. Yields one
+    record batch of matches per window as the workers finish them.
+    """
+    buffer = io.BytesIO()
+    yara.compile_rules(rule_text).serialize_into(buffer)
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=yara._init_worker,
+        initargs=(buffer.getvalue(),),
+    ) as pool:
+        futures = [
+            pool.submit(_scan_window, path, start, length, window)
+            for start, length in windows(os.path.getsize(path), window, overlap)
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def scan_image(
+    con,
+    path,
+    rule_text,
+    table_name="image_matches",
+    window=WINDOW_SIZE,
+    overlap=OVERLAP,
+    progress=None,
+    workers=None,
+):
+    """
+    Scan the image at `path` with the rules in `rule_text` and store the matches in `table_name`.
+
+    Returns the table, with one row per match: rule, namespace, pattern, file_offset and
+    length. `progress` wraps the stream of batches like in `memtools.yara.sweep`.
+    """
+    batches = image_match_batches(path, rule_text, window=window, overlap=overlap, workers=workers)
+    if progress is not None:
+        batches = progress(batches, total=len(range(0, os.path.getsize(path), window)))
+    return load_batches(con, table_name, batches, schema=IMAGE_MATCHES_SCHEMA)
+
+
+def open_image(path, config=CONFIG_FILE):
+    """
+    A Volatility context for the image at `path` and the name of its kernel module.
+
+    This follows what `vol` does for `windows.pslist.PsList`, including reading `config`
+    when it exists so layer and symbol detection is skipped. A `config` written for a
+    different image raises ValueError.
+    """
+    import volatility3.plugins
+    from volatility3 import framework
+    from volatility3.framework import automagic, contexts, interfaces, plugins
+    from volatility3.framework.automagic import stacker
+    from volatility3.framework.configuration import requirements
+
+    framework.import_files(volatility3.plugins, True)
+    plugin = framework.list_plugins()["windows.pslist.PsList"]
+
+    context = contexts.Context()
+    context.config["automagic.LayerStacker.single_location"] = requirements.URIRequirement.location_from_file(path)
+    if config and os.path.exists(config):
+        check_config(path, config)
+        with open(config) as fh:
+            context.config.splice(
+                interfaces.configuration.path_join("plugins", plugin.__name__),
+                interfaces.configuration.HierarchicalDict(json.load(fh)),
+            )
+
+    automagics = automagic.choose_automagic(automagic.available(context), plugin)
+    if context.config.get("automagic.LayerStacker.stackers", None) is None:
+        context.config["automagic.LayerStacker.stackers"] = stacker.choose_os_stackers(plugin)
+
+    constructed = plugins.construct_plugin(context, automagics, plugin, "plugins", None, None)
+    return context, constructed.config["kernel"]
+
+
+def _file_ranges(context, layer_name, offset, length):
+    """(offset, length) of the ranges in the bottom file layer backing `layer_name`."""
+    from volatility3.framework import interfaces
+
+    layer = context.layers[layer_name]
+    if not isinstance(layer, interfaces.layers.TranslationLayerInterface):
+        yield offset, length
+        return
+    for _, _, mapped_offset, mapped_length, mapped_layer in layer.mapping(offset, length, ignore_errors=True):
+        yield from _file_ranges(context, mapped_layer, mapped_offset, mapped_length)
+
+
+def page_batches(path, config=CONFIG_FILE, pids=None):
+    """Yield the file ranges backing the user space of each process as one record batch per process."""
+    from volatility3.framework import exceptions
+
+    context, kernel = open_image(path, config)
+    from volatility3.plugins.windows import pslist
+
+    filter_func = pslist.PsList.create_pid_filter(pids) if pids else lambda _: False
+    for proc in pslist.PsList.list_processes(context, kernel, filter_func=filter_func):
+        try:
+            pid = int(proc.UniqueProcessId)
+            process = proc.ImageFileName.cast("string", max_length=proc.ImageFileName.vol.count, errors="replace")
+            layer_name = proc.add_process_layer()
+        except exceptions.InvalidAddressException:
+            continue
+
+        layer = context.layers[layer_name]
+        end = USER_SPACE_END[layer.bits_per_register]
+        rows = {name: [] for name in PAGES_SCHEMA.names}
+        for virtual, _, mapped_offset, mapped_length, mapped_layer in layer.mapping(0, end, ignore_errors=True):
+            for file_start, file_length in _file_ranges(context, mapped_layer, mapped_offset, mapped_length):
+                rows["virtual_start"].append(virtual)
+                rows["file_start"].append(file_start)
+                rows["file_end"].append(file_start + file_length)
+                virtual += file_length
+
+        count = len(rows["virtual_start"])
+        rows["pid"] = [pid] * count
+        rows["process"] = [process] * count
+        yield pa.RecordBatch.from_pydict(rows, schema=PAGES_SCHEMA)
+
+
+def process_pages(con, path, config=CONFIG_FILE, pids=None, table_name="process_pages"):
+    """
+    Store which ranges of the image file back the user-space memory of each process.
+
+    Needs the image to be a format Volatility can read, and is skipped for pages that are
+    paged out or otherwise not in the image. A physical page shared between processes, like
+    a mapped DLL, has one row per process.
+    """
+    return load_batches(con, table_name, page_batches(path, config, pids), schema=PAGES_SCHEMA)
+
+
+def with_owners(matches, pages):
+    """
+    Add the pid, process and virtual address of each match in `matches` from `pages`.
+
+    Matches in pages mapped by several processes get one row per process, matches outside
+    any user-space page keep null owner columns.
+    """
+    joined = matches.left_join(
+        pages,
+        [matches.file_offset >= pages.file_start, matches.file_offset < pages.file_end],
+    )
+    return joined.mutate(
+        address=(joined.virtual_start + (joined.file_offset - joined.file_start)).cast("uint64")
+    ).drop("virtual_start", "file_start", "file_end")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.image", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-f", "--file", required=True, help="memory image")
+    parser.add_argument("rules", help="file with the YARA rules")
+    parser.add_argument("-w", "--window", type=int, default=WINDOW_SIZE, help="window size in bytes")
+    parser.add_argument("--overlap", type=int, default=OVERLAP, help="bytes each window extends into the next")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="worker processes")
+    parser.add_argument("-c", "--config", default=CONFIG_FILE, help="volatility config")
+    parser.add_argument("--owners", action="store_true", help="resolve matches to processes with volatility")
+    args = parser.parse_args(argv)
+
+    import ibis
+
+    with open(args.rules) as fh:
+        rule_text = fh.read()
+
+    start = time.perf_counter()
+    con = ibis.duckdb.connect()
+    matches = scan_image(con, args.file, rule_text, window=args.window, overlap=args.overlap, workers=args.jobs)
+    if args.owners:
+        matches = with_owners(matches, process_pages(con, args.file, args.config))
+
+    for row in matches.order_by("file_offset").to_pyarrow().to_pylist():
+        owner = f"{row['pid']:>6}  {row['address']:#x}" if row.get("pid") is not None else ""
+        print(f"{row['file_offset']:#012x}  {row['rule']}  {row['pattern']}  {owner}")
+    print(f"{args.file}: scanned in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,194 @@
+"""
+Extract URLs, e-mail addresses, IPs, paths and file names from strings in one pass.
+
+Running one `regexp_extract_all` per pattern scans every string eight times. Here all
+patterns are compiled into a single YARA-X rule, whose automaton finds the matches of
+every pattern in one scan. The strings of a whole Arrow batch are joined into one text,
+scanned once, and the matches are mapped back to the string they came from. The result
+for each string is the same as `re.findall` for each pattern on its own:
+
+    matcher = IOCMatcher()
+    iocs = extract_iocs(strings, matcher=matcher)  # vad_file, pid, offset, encoding, pattern, match, match_offset
+
+The patterns have to be valid in both Python's `re` and YARA-X; the few matches YARA-X
+cuts short are completed with `re`.
+"""
+
+import bisect
+import re
+import threading
+from itertools import accumulate
+
+import ibis
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from memtools.yara import compile_rules
+
+# Pattern name -> regex, the same patterns as the strings notebook uses
+IOC_PATTERNS = {
+    "urls": r"\b(?i:https?|ftp)://\S+",
+    "emails": r"[A-Za-z0-9._%+\-]+@[A-Za-z0-9.\-]+\.[A-Za-z]{2,}",
+    "ipv4s": r"\b(?:\d{1,3}\.){3}\d{1,3}\b",
+    "win_paths": (
+        r"[A-Za-z]:(?:\\[^\s\\/:\*\?\"<>\|]+)+\\?"
+        r"|\\\\[^\s\\/:\*\?\"<>\|]+(?:\\[^\s\\/:\*\?\"<>\|]+)+"
+    ),
+    "file_exts": r"\.[A-Za-z0-9]{1,6}\b",
+    "exe_dlls": r"\b(?:[A-Za-z0-9_\-]+)\.(?:exe|dll|sys|ocx)\b",
+    "doc_scripts": r"\b(?:[A-Za-z0-9_\-]+)\.(?:docm?|xlsm?|pptm?|vbs|js|ps1|bat|cmd)\b",
+    "archives": r"\b(?:[A-Za-z0-9_\-]+)\.(?:zip|rar|7z|gz|bz2|xz|tar)\b",
+}
+
+IOC_TYPE = ibis.dtype("array<struct<pattern: string, match: string, offset: int64>>")
+
+# Every pattern needs at least one of these characters, so strings without any of them can
+# be dropped by DuckDB before they are handed to Python
+REQUIRED_CHARACTERS = [".", ":", "\\"]
+
+# None of the patterns match across a newline, so it safely separates the strings of a batch
+_SEPARATOR = "\n"
+
+# YARA-X stops a regex match after this many bytes
+YARA_MAX_MATCH_LENGTH = 4095
+
+
+def ioc_rule(patterns=IOC_PATTERNS):
+    """A YARA rule with one regex string per pattern, named after it."""
+    escaped = {name: pattern.replace("/", "\\/") for name, pattern in patterns.items()}
+    strings = "\n".join(f"        ${name} = /{pattern}/" for name, pattern in escaped.items())
+    return f"rule iocs {{\n    strings:\n{strings}\n    condition:\n        any of them\n}}\n"
+
+
+class IOCMatcher:
+    """
+    Find the matches of all `patterns` in a batch of strings with a single YARA-X scan.
+
+    `required_characters` are characters every match contains, strings without any of them
+    are skipped by `extract_iocs`. They default to `REQUIRED_CHARACTERS` for `IOC_PATTERNS`
+    and to none for other patterns.
+    """
+
+    def __init__(self, patterns=IOC_PATTERNS, required_characters=None):
+        if required_characters is None and patterns is IOC_PATTERNS:
+            required_characters = REQUIRED_CHARACTERS
+        self.required_characters = list(required_characters or ())
+        self.patterns = {name: re.compile(pattern, re.ASCII) for name, pattern in patterns.items()}
+        self.rules = compile_rules(ioc_rule(patterns))
+        # A scanner can't be shared between the threads DuckDB calls the UDF from
+        self._local = threading.local()
+
+        def match_iocs(strings):
+            """All pattern matches in each string, with their character offsets."""
+            return self.extract(strings)
+
+        self.udf = ibis.udf.scalar.pyarrow(match_iocs, signature=((str,), IOC_TYPE))
+
+    def _scanner(self):
+        import yara_x
+
+        if not hasattr(self._local, "scanner"):
+            self._local.scanner = yara_x.Scanner(self.rules)
+        return self._local.scanner
+
+    def _scan(self, text):
+        """(character offset, name, match) of every pattern in `text`, as `finditer` per pattern finds them."""
+        data = text.encode()
+        is_ascii = len(data) == len(text)
+        scanner = self._scanner()
+        # Every match is at least a byte long, so no pattern can run into the limit
+        scanner.max_matches_per_pattern(len(data) + 1)
+
+        found = []
+        for rule in scanner.scan(data).matching_rules:
+            for pattern in rule.patterns:
+                name = pattern.identifier[1:]
+                end = 0
+                # Byte offsets are turned into character offsets going forward from the last match
+                byte_offset = char_offset = 0
+                # YARA-X also reports matches starting inside earlier ones, `finditer` continues after them
+                for match in pattern.matches:
+                    if match.offset < end:
+                        continue
+                    if is_ascii:
+                        start = match.offset
+                    else:
+                        char_offset += len(data[byte_offset : match.offset].decode())
+                        start, byte_offset = char_offset, match.offset
+                    if match.length >= YARA_MAX_MATCH_LENGTH:
+                        value = self.patterns[name].match(text, start).group()
+                        end = match.offset + len(value.encode())
+                    else:
+                        end = match.offset + match.length
+                        value = data[match.offset : end].decode()
+                    found.append((start, name, value))
+        return found
+
+    def extract(self, strings):
+        """
+        Matches for every string in the Arrow string array `strings` as a list array of
+        `IOC_TYPE`, in order of position within each string. Null strings give an empty list.
+        """
+        if isinstance(strings, pa.ChunkedArray):
+            strings = strings.combine_chunks()
+        strings = pc.fill_null(strings, "")
+
+        # Join and measure the batch in Arrow, without a Python object per string
+        text = pc.binary_join(pa.ListArray.from_arrays(pa.array([0, len(strings)], pa.int32()), strings), _SEPARATOR)
+        text = text[0].as_py()
+        ends = pc.cumulative_sum(pc.add(pc.utf8_length(strings), len(_SEPARATOR))).to_pylist()
+        starts = [0, *ends[:-1]]
+
+        found = sorted(self._scan(text))
+
+        # Build the arrays column by column, which is much cheaper than converting dicts
+        counts = [0] * len(strings)
+        rows = [bisect.bisect_right(starts, start) - 1 for start, _, _ in found]
+        for row in rows:
+            counts[row] += 1
+
+        structs = pa.StructArray.from_arrays(
+            [
+                pa.array([name for _, name, _ in found], pa.string()),
+                pa.array([match for _, _, match in found], pa.string()),
+                pa.array([start - starts[row] for (start, _, _), row in zip(found, rows)], pa.int64()),
+            ],
+            names=["pattern", "match", "offset"],
+        )
+        return pa.ListArray.from_arrays(pa.array(list(accumulate(counts, initial=0)), pa.int32()), structs)
+
+
+_matcher = None
+
+
+def default_matcher():
+    """The matcher for `IOC_PATTERNS`, compiled on first use."""
+    global _matcher
+    if _matcher is None:
+        _matcher = IOCMatcher()
+    return _matcher
+
+
+def extract_iocs(strings, column="string", matcher=None):
+    """
+    One row per IOC `matcher` finds in the `column` of the table `strings`.
+
+    Adds `pattern` and `match`, and `match_offset`: the byte offset of the match in the VAD
+    file when `strings` is a table from `memtools.strings`, otherwise the character offset.
+    `matcher` defaults to an `IOCMatcher` for `IOC_PATTERNS`.
+    """
+    matcher = matcher or default_matcher()
+    candidates = strings
+    if matcher.required_characters:
+        candidates = strings.filter(ibis.or_(*(strings[column].contains(c) for c in matcher.required_characters)))
+
+    # unnest in the select list, DuckDB's lateral `CROSS JOIN UNNEST` is far slower
+    iocs = candidates.mutate(_ioc=matcher.udf(candidates[column]).unnest())
+    iocs = iocs.mutate(pattern=iocs._ioc.pattern, match=iocs._ioc.match, match_offset=iocs._ioc.offset)
+
+    if {"offset", "encoding"} <= set(strings.columns):
+        # UTF-16 strings take two bytes per character in the dump
+        width = ibis.ifelse(iocs.encoding == "utf-16le", 2, 1)
+        iocs = iocs.mutate(match_offset=iocs.offset + iocs.match_offset * width)
+
+    return iocs.drop("_ioc")
@@ -0,0 +1,103 @@
+"""
+Rewrite Volatility Parquet output sorted by pid and address.
+
+Volatility writes rows in the order the plugin walks memory, so every per-process filter
+(`filter_by_pid` in the incident response notebook) has to read the whole file. Once the
+rows are sorted by (pid, address) and split into row groups of roughly one process each,
+the min/max statistics in the Parquet footer let DuckDB skip every row group that can't
+contain the selected pid.
+
+    uv run python -m memtools.normalize
+    uv run python -m memtools.normalize volatility_plugin_output/windows.handles.Handles.parquet
+"""
+
+import argparse
+import sys
+
+from memtools._util import atomic_output
+from memtools.case import _literal, _quote, plugin_files, sort_columns
+from memtools.plugins import PLUGIN_OUTPUT_DIR
+
+# DuckDB reads Parquet a vector (2048 rows) at a time and writes 122880 rows per group by default
+MIN_ROW_GROUP_SIZE = 2048
+MAX_ROW_GROUP_SIZE = 122880
+
+# Footer metadata marking a file as already normalised
+SORTED_BY_KEY = "memtools.sorted_by"
+
+
+def row_group_size(rows, pids):
+    """About one process per row group, within the range DuckDB handles well."""
+    size = rows // max(pids, 1)
+    return max(MIN_ROW_GROUP_SIZE, min(size, MAX_ROW_GROUP_SIZE))
+
+
+def sorted_by(con, path):
+    """The sort columns recorded in a normalised file, or None."""
+    rows = con.execute(
+        f"SELECT decode(value) FROM parquet_kv_metadata({_literal(path)}) WHERE decode(key) = ?",
+        [SORTED_BY_KEY],
+    ).fetchall()
+    return rows[0][0] if rows else None
+
+
+def normalize_plugin(path, output=None, force=False):
+    """
+    Rewrite the plugin output `path` to `output` (in place by default), sorted by pid and address.
+
+    Returns a dict with the sort columns, row count and row group size used, or None when the
+    file has no pid column or was already normalised.
+    """
+    import duckdb
+
+    output = output or path
+    source = f"read_parquet({_literal(path)})"
+
+    con = duckdb.connect()
+    try:
+        columns = [column for column, *_ in con.execute(f"DESCRIBE SELECT * FROM {source}").fetchall()]
+        keys = sort_columns(columns)
+        if not keys:
+            return None
+
+        key_list = ",".join(keys)
+        if not force and output == path and sorted_by(con, path) == key_list:
+            return None
+
+        rows, pids = con.execute(f"SELECT count(*), count(DISTINCT {_quote(keys[0])}) FROM {source}").fetchone()
+        size = row_group_size(rows, pids)
+        order = ", ".join(_quote(key) for key in keys)
+
+        with atomic_output(output) as tmp_path:
+            con.execute(
+                f"COPY (SELECT * FROM {source} ORDER BY {order}) TO {_literal(tmp_path)} "
+                f"(FORMAT parquet, ROW_GROUP_SIZE {size}, "
+                f"KV_METADATA {{{_literal(SORTED_BY_KEY)}: {_literal(key_list)}}})"
+            )
+    finally:
+        con.close()
+
+    return {"path": output, "sorted_by": keys, "rows": rows, "row_group_size": size}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.normalize", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("files", nargs="*", help="Parquet files to rewrite (default: all plugin output)")
+    parser.add_argument("-d", "--plugin-dir", default=PLUGIN_OUTPUT_DIR, help="directory with the Parquet files")
+    parser.add_argument("--force", action="store_true", help="rewrite files that are already sorted")
+    args = parser.parse_args(argv)
+
+    for path in args.files or plugin_files(args.plugin_dir):
+        result = normalize_plugin(path, force=args.force)
+        if result is None:
+            print(f"skipped  {path}")
+        else:
+            print(
+                f"sorted   {path} by {', '.join(result['sorted_by'])} "
+                f"({result['rows']} rows, {result['row_group_size']} per row group)"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+"""
+Run a batch of Volatility plugins against one memory dump in parallel.
+
+Each plugin runs in its own `vol` process, so plugins execute side by side instead of one
+after another. All of them load the layer and symbol setup from the same `config.json`,
+which saves every worker from redoing the automagic scan of the dump. The config names the
+dump it was written for and makes `vol` ignore `-f`, so it is written again when it was
+made for a different dump, and never passed along with another one.
+
+    uv run python -m memtools.plugins -f CLIENT-02.dmp
+    uv run python -m memtools.plugins -f CLIENT-02.dmp windows.pslist.PsList windows.netscan.NetScan
+
+Results are cached per dump (see `memtools.cache`), so re-running against an unchanged dump
+only copies the earlier output back into place.
+"""
+
+import argparse
+import json
+import os
+import shlex
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from urllib.parse import urljoin
+from urllib.request import pathname2url
+
+from memtools._util import atomic_output
+from memtools.cache import CACHE_DIR, PluginCache, cache_key, config_digest, fingerprint
+
+PLUGIN_OUTPUT_DIR = "volatility_plugin_output"
+VAD_DUMP_DIR = "output"
+CONFIG_FILE = "config.json"
+
+# The plugins the notebooks read. Extra arguments go after the plugin name.
+DEFAULT_PLUGINS = [
+    "windows.info.Info",
+    "windows.pslist.PsList",
+    "windows.psscan.PsScan",
+    "windows.pstree.PsTree",
+    "windows.cmdline.CmdLine",
+    "windows.dlllist.DllList",
+    "windows.ldrmodules.LdrModules",
+    "windows.handles.Handles",
+    "windows.getsids.GetSIDs",
+    "windows.privileges.Privs",
+    "windows.netscan.NetScan",
+    "windows.malware.malfind.Malfind",
+    "windows.malware.suspicious_threads.SuspiciousThreads",
+    "windows.vadinfo.VadInfo --dump",
+]
+
+# Run volatility from the current interpreter so the runner works without `vol` on PATH
+VOL = [sys.executable, "-c", "from volatility3.cli import main; main()"]
+
+
+def parse_plugin(spec):
+    """Split a spec such as "windows.vadinfo.VadInfo --dump" into (plugin, args)."""
+    plugin, *args = shlex.split(spec)
+    return plugin, tuple(args)
+
+
+def output_path(plugin, output_dir=PLUGIN_OUTPUT_DIR):
+    """Where the notebooks expect the Parquet output of `plugin`."""
+    return os.path.join(output_dir, f"{plugin}.parquet")
+
+
+def writes_files(args):
+    """Plugins that dump files next to their output can't be served from the cache."""
+    return any(arg.startswith("--dump") for arg in args)
+
+
+def dump_location(dump):
+    """The location URL volatility stores for a local `dump`, as `vol -f` builds it."""
+    return urljoin("file:", pathname2url(os.path.abspath(dump)))
+
+
+def config_locations(config):
+    """The locations of the files the saved volatility `config` reads memory from."""
+    with open(config) as fh:
+        values = json.load(fh)
+    return {value for key, value in values.items() if key.rsplit(".", 1)[-1] == "location"}
+
+
+def check_config(dump, config=CONFIG_FILE):
+    """Raise ValueError if the existing `config` was written for another dump than `dump`."""
+    locations = config_locations(config)
+    if dump_location(dump) not in locations:
+        raise ValueError(f"{config} was written for {', '.join(sorted(locations)) or 'another dump'}, not {dump}")
+
+
+def vol_command(dump, plugin, args=(), config=CONFIG_FILE, dump_dir=VAD_DUMP_DIR):
+    command = [*VOL, "-q", "-f", dump, "-o", dump_dir, "-r", "parquet"]
+    if config and os.path.exists(config):
+        check_config(dump, config)
+        command += ["--config", config]
+    return command + [plugin, *args]
+
+
+def write_config(dump, config=CONFIG_FILE):
+    """
+    Create `config.json` so every worker can skip layer and symbol detection.
+
+    An existing config is kept if it was written for `dump`, and replaced otherwise.
+    """
+    if os.path.exists(config) and dump_location(dump) in config_locations(config):
+        return
+
+    with atomic_output(config) as tmp_path:
+        # vol refuses to overwrite a config
+        os.remove(tmp_path)
+        subprocess.run(
+            [*VOL, "-q", "-f", dump, "--save-config", tmp_path, "windows.info.Info"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            check=True,
+        )
+
+
+def run_plugin(
+    dump,
+    spec,
+    output_dir=PLUGIN_OUTPUT_DIR,
+    config=CONFIG_FILE,
+    dump_dir=VAD_DUMP_DIR,
+    cache=None,
+    dump_fingerprint=None,
+):
+    """
+    Run one plugin and write its Parquet output atomically.
+
+    With a `cache`, a result computed earlier for the same dump and config is copied into
+    place instead.
+    Returns a dict describing the run, including the wall time in seconds.
+    """
+    plugin, args = parse_plugin(spec)
+    path = output_path(plugin, output_dir)
+    start = time.perf_counter()
+
+    key = None
+    if cache is not None and not writes_files(args):
+        key = cache_key(dump_fingerprint or fingerprint(dump), plugin, args, config=config_digest(config))
+
+    try:
+        if key and cache.get(key, path):
+            status = "cached"
+        else:
+            with atomic_output(path) as tmp_path:
+                with open(tmp_path, "wb") as fh:
+                    proc = subprocess.run(
+                        vol_command(dump, plugin, args, config=config, dump_dir=dump_dir),
+                        stdout=fh,
+                        stderr=subprocess.PIPE,
+                    )
+                if proc.returncode != 0 or os.path.getsize(tmp_path) == 0:
+                    stderr = proc.stderr.decode(errors="replace").strip().splitlines()
+                    raise RuntimeError(stderr[-1] if stderr else f"vol exited with code {proc.returncode}")
+
+            if key:
+                cache.put(key, path)
+            status = "ok"
+        error = None
+    except Exception as e:
+        status, error = "failed", str(e)
+
+    return {
+        "plugin": plugin,
+        "args": " ".join(args),
+        "path": path,
+        "status": status,
+        "seconds": round(time.perf_counter() - start, 2),
+        "error": error,
+    }
+
+
+def run_plugins(
+    dump,
+    plugins=DEFAULT_PLUGINS,
+    output_dir=PLUGIN_OUTPUT_DIR,
+    config=CONFIG_FILE,
+    dump_dir=VAD_DUMP_DIR,
+    workers=None,
+    cache=None,
+):
+    """
+    Run `plugins` against `dump` with up to `workers` plugins at the same time.
+
+    Yields one result dict per plugin as soon as it finishes.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(dump_dir, exist_ok=True)
+    write_config(dump, config)
+
+    dump_fingerprint = fingerprint(dump) if cache is not None else None
+
+    # The threads only wait on the `vol` child processes, which do the actual work
+    workers = workers or os.cpu_count()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                run_plugin,
+                dump,
+                spec,
+                output_dir=output_dir,
+                config=config,
+                dump_dir=dump_dir,
+                cache=cache,
+                dump_fingerprint=dump_fingerprint,
+            )
+            for spec in plugins
+        ]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.plugins", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-f", "--file", required=True, help="memory dump to analyse")
+    parser.add_argument("plugins", nargs="*", default=DEFAULT_PLUGINS, help="plugins to run, with optional arguments")
+    parser.add_argument("-c", "--config", default=CONFIG_FILE, help="volatility config shared by all workers")
+    parser.add_argument("-d", "--output-dir", default=PLUGIN_OUTPUT_DIR, help="directory for the Parquet files")
+    parser.add_argument("-o", "--dump-dir", default=VAD_DUMP_DIR, help="directory for files dumped by plugins")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="plugins to run at the same time")
+    parser.add_argument("--cache-dir", default=CACHE_DIR, help="where cached plugin output is kept")
+    parser.add_argument("--no-cache", action="store_true", help="always rerun the plugins")
+    args = parser.parse_args(argv)
+
+    cache = None if args.no_cache else PluginCache(args.cache_dir)
+
+    total = time.perf_counter()
+    failed = 0
+
+    for result in run_plugins(
+        args.file,
+        args.plugins,
+        output_dir=args.output_dir,
+        config=args.config,
+        dump_dir=args.dump_dir,
+        workers=args.jobs,
+        cache=cache,
+    ):
+        line = f"{result['status']:>6}  {result['seconds']:8.2f}s  {result['plugin']}"
+        if result["error"]:
+            failed += 1
+            line += f"  ({result['error']})"
+        print(line, flush=True)
+
+    print(f"{len(args.plugins)} plugins in {time.perf_counter() - total:.2f}s, {failed} failed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Find out which rules and patterns make a YARA-X scan slow.
+
+The yara-x Python package is built without the scanner's profiling support, so the time
+spent on each rule and pattern is measured instead: every rule, and every pattern on its
+own in a probe rule, is compiled separately and scanned over the same files. Patterns
+whose atoms are too short to be selective show up with most of the scan time. Compiler
+warnings such as `slow_pattern` are attached to the rule and pattern they point at:
+
+    rows = profile_rules(rule_text, glob.glob("output/*.dmp"))
+    mo.ui.table(rows)
+
+Each row is a rule (with `pattern` None) or one of its patterns, with the scan time in
+milliseconds over all files, the number of matches, the number of files with a match and
+the compiler warnings. A pattern's matches are counted by its probe rule, so they include
+matches in files where the rule's condition doesn't hold, and a rule's are the sum of its
+patterns'. YARA-X doesn't report private rules, so their `files` is None.
+
+Rules and patterns are found with a light-weight scan of the source that skips comments
+and string and regex literals, not with a full YARA parser. Layout doesn't matter, a rule
+may sit on one line. A rule whose `strings:` section yields no pattern declarations, or a
+pattern that doesn't compile on its own, is reported in the warnings instead of being
+skipped silently.
+"""
+
+import re
+import time
+
+# Keywords are matched anywhere outside comments and literals, not only at the start of a line
+RULE_RE = re.compile(rb"(?<![\w$])(?:(?:private|global)\s+)*rule\s+(\w+)")
+STRINGS_RE = re.compile(rb"(?<![\w$])strings\s*:")
+CONDITION_RE = re.compile(rb"(?<![\w$])condition\s*:")
+# A pattern declaration runs up to the next one, hex patterns may continue over several lines
+PATTERN_RE = re.compile(rb"(\$\w*)\s*=(?!=)")
+
+# A `/` after one of these starts a regex literal, anywhere else it divides
+_REGEX_PRECEDER_RE = re.compile(rb"(?:[=(,]|\bmatches)\s*$")
+_LITERAL_START_RE = re.compile(rb'//|/\*|"|/')
+
+
+def mask_literals(source):
+    """
+    `source` with comments and the contents of text and regex literals blanked out.
+
+    The result has the same length, so offsets in it are offsets in `source`, and keywords
+    or `$x =` inside a literal or comment are not mistaken for the real thing.
+    """
+    masked = bytearray(source)
+    length = len(source)
+    i = 0
+    while (match := _LITERAL_START_RE.search(source, i)) is not None:
+        i, token = match.start(), match.group()
+        if token == b"//":
+            end = source.find(b"\n", i)
+            end = length if end == -1 else end
+        elif token == b"/*":
+            end = source.find(b"*/", i + 2)
+            end = length if end == -1 else end + 2
+        elif token == b'"' or _REGEX_PRECEDER_RE.search(source[max(i - 64, 0) : i]):
+            end = i + 1
+            while end < length and source[end] != token[0]:
+                end += 2 if source[end] == ord("\\") else 1
+            end = min(end + 1, length)
+        else:
+            i += 1
+            continue
+        masked[i:end] = b" " * (end - i)
+        i = end
+    return bytes(masked)
+
+
+def rule_spans(source):
+    """(name, start, end) byte ranges of the rules in the UTF-8 encoded `source`."""
+    masked = mask_literals(source)
+    starts = [(match.group(1).decode(), match.start()) for match in RULE_RE.finditer(masked)]
+    ends = [start for _, start in starts[1:]] + [len(source)]
+    return [(name, start, end) for (name, start), end in zip(starts, ends)]
+
+
+def pattern_spans(source, start, end, masked=None):
+    """
+    (identifier, start, end) byte ranges of the pattern declarations of the rule in `source[start:end]`.
+
+    `masked` is `mask_literals(source)`, computed if it isn't given.
+    """
+    masked = mask_literals(source) if masked is None else masked
+    strings = STRINGS_RE.search(masked, start, end)
+    condition = CONDITION_RE.search(masked, start, end)
+    if strings is None or condition is None:
+        return []
+
+    matches = list(PATTERN_RE.finditer(masked, strings.end(), condition.start()))
+    ends = [match.start() for match in matches[1:]] + [condition.start()]
+    return [(match.group(1).decode(), match.start(), end) for match, end in zip(matches, ends)]
+
+
+def _compile(source):
+    """Compiled rules for the UTF-8 encoded `source`, or None if it doesn't compile."""
+    import yara_x
+
+    try:
+        return yara_x.compile(source.decode())
+    except yara_x.CompileError:
+        return None
+
+
+def _scan(rules, files):
+    """Seconds to scan `files` with `rules`, and matches per (rule, pattern) and files with a match per rule."""
+    import yara_x
+
+    scanner = yara_x.Scanner(rules)
+    matches, matched_files = {}, {}
+    start = time.perf_counter()
+    for path in files:
+        try:
+            result = scanner.scan_file(path)
+        except yara_x.ScanError:
+            continue
+        for rule in result.matching_rules:
+            matched_files[rule.identifier] = matched_files.get(rule.identifier, 0) + 1
+            for pattern in rule.patterns:
+                key = (rule.identifier, pattern.identifier)
+                matches[key] = matches.get(key, 0) + len(pattern.matches)
+    return time.perf_counter() - start, matches, matched_files
+
+
+def profile_rules(rule_text, files):
+    """
+    Scan time, matches and compiler warnings for every rule in `rule_text` and each of its patterns.
+
+    Rules that only compile together with the rules before them, because their condition
+    refers to another rule, are timed with those rules included. Raises
+    `yara_x.CompileError` if `rule_text` itself doesn't compile.
+    """
+    import yara_x
+
+    source = rule_text.encode()
+    masked = mask_literals(source)
+    spans = rule_spans(source)
+    header = source[: spans[0][1]] if spans else source
+
+    compiler = yara_x.Compiler()
+    compiler.add_source(rule_text)
+    warnings = compiler.warnings()
+
+    # Opening and mapping the files costs the same for every rule, so it isn't counted
+    baseline, _, _ = _scan(yara_x.compile("rule _baseline { condition: false }"), files)
+    _, all_matches, all_files = _scan(compiler.build(), files)
+
+    rows = []
+    for name, start, end in spans:
+        rules = _compile(header + source[start:end])
+        if rules is None:
+            rules = _compile(source[:end])
+        seconds = _scan(rules, files)[0] if rules is not None else None
+
+        patterns = pattern_spans(source, start, end, masked)
+        rule_warnings = []
+        if not patterns and STRINGS_RE.search(masked, start, end):
+            rule_warnings.append("patterns could not be found for profiling")
+        pattern_warnings = {identifier: [] for identifier, _, _ in patterns}
+        for warning in warnings:
+            offset = warning["labels"][0]["span"]["start"] if warning["labels"] else None
+            if offset is None or not start <= offset < end:
+                continue
+            owner = next((identifier for identifier, s, e in patterns if s <= offset < e), None)
+            (pattern_warnings[owner] if owner else rule_warnings).append(warning["title"])
+
+        private = b"private" in RULE_RE.match(masked, start).group().split()
+        pattern_rows = []
+        for identifier, pattern_start, pattern_end in patterns:
+            declaration = source[pattern_start:pattern_end]
+            probe_rules = _compile(header + b"rule _probe { strings: " + declaration + b" condition: any of them }")
+            if probe_rules is not None:
+                probe_seconds, probe_matches, _ = _scan(probe_rules, files)
+                pattern_matches = probe_matches.get(("_probe", identifier), 0)
+            else:
+                pattern_warnings[identifier].append("doesn't compile on its own, not profiled")
+                probe_seconds = None
+                pattern_matches = None if private else all_matches.get((name, identifier), 0)
+            pattern_rows.append(
+                _row(name, identifier, probe_seconds, baseline, pattern_matches, None, pattern_warnings[identifier])
+            )
+
+        counts = [row["matches"] for row in pattern_rows]
+        rule_matches = None if None in counts else sum(counts)
+        rule_files = None if private else all_files.get(name, 0)
+        rows.append(_row(name, None, seconds, baseline, rule_matches, rule_files, rule_warnings))
+        rows.extend(pattern_rows)
+    return rows
+
+
+def _row(rule, pattern, seconds, baseline, matches, files, warnings):
+    return {
+        "rule": rule,
+        "pattern": pattern,
+        "scan_ms": None if seconds is None else round(max(seconds - baseline, 0) * 1000, 2),
+        "matches": matches,
+        "files": files,
+        "warnings": ", ".join(warnings),
+    }
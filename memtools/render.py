@@ -0,0 +1,77 @@
+"""
+Hex and ASCII views of match context, for all matches in a buffer at once.
+
+Building the views byte by byte in Python takes seconds once a rule matches thousands of
+times. `match_context` instead cuts the context of every match out of the buffer, joins
+them, and converts the joined bytes with a single `bytes.hex` and `bytes.translate` call.
+Each view is returned split into the bytes before, inside and after the match, so turning
+it into HTML can wait until a table actually shows the row:
+
+    rows = match_context(binary, spans, context=8)
+    rows[0]["ascii"]  # ('GET /', 'evil.example', ' HTTP')
+"""
+
+# Printable ASCII stays as is, every other byte becomes "."
+PRINTABLE = bytes(byte if 0x20 <= byte <= 0x7E else ord(".") for byte in range(256))
+
+
+def ascii_view(data):
+    return data.translate(PRINTABLE).decode("ascii")
+
+
+def hex_view(data):
+    return data.hex(" ")
+
+
+def match_spans(result):
+    """(rule, pattern, offset, length) of every match in a YARA-X scan result."""
+    return [
+        (rule.identifier, pattern.identifier, match.offset, match.length)
+        for rule in result.matching_rules
+        for pattern in rule.patterns
+        for match in pattern.matches
+    ]
+
+
+def match_context(binary, spans, context=8):
+    """
+    One row per (rule, pattern, offset, length) in `spans`, with the match and `context`
+    bytes around it as hex ("bytes") and printable ASCII ("ascii").
+
+    Both views are (before, match, after) tuples of strings.
+    """
+    n = len(binary)
+    # [context start, match start, match end, context end) of every span in the joined buffer
+    bounds = []
+    chunks = []
+    position = 0
+    for _, _, offset, length in spans:
+        pre = max(0, offset - context)
+        post = min(n, offset + length + context)
+        start, end = position + offset - pre, position + min(offset + length, n) - pre
+        bounds.append((position, start, end, position + post - pre))
+        chunks.append(binary[pre:post])
+        position += post - pre
+
+    joined = b"".join(chunks)
+    text = ascii_view(joined)
+    # every byte is two hex digits and a separator
+    hexed = hex_view(joined) + " "
+
+    rows = []
+    for (rule, pattern, offset, length), (start, hit_start, hit_end, end) in zip(spans, bounds):
+        rows.append(
+            {
+                "rule": rule,
+                "pattern": pattern,
+                "offset": offset,
+                "length": length,
+                "bytes": (
+                    hexed[3 * start : 3 * hit_start].rstrip(),
+                    hexed[3 * hit_start : 3 * hit_end].rstrip(),
+                    hexed[3 * hit_end : 3 * end].rstrip(),
+                ),
+                "ascii": (text[start:hit_start], text[hit_start:hit_end], text[hit_end:end]),
+            }
+        )
+    return rows
@@ -0,0 +1,226 @@
+"""
+A persistent trigram index over the strings of every VAD in a dump.
+
+Finding out whether a domain or path shows up anywhere else in memory otherwise means
+extracting the strings of every VAD again. `build_index` extracts them once into
+`strings.duckdb`, together with a table of the distinct lowercase trigrams of every
+string, stored sorted by trigram. A substring query looks up the trigrams of the search
+term, keeps the strings that contain all of them and only checks those candidates:
+
+    con = ibis.duckdb.connect()
+    attach_index(con)
+    search(con, "evil-domain.com")  # pid, vad_file, offset, encoding, string, hit_offset
+    search_regex(con, r"https?://[a-z0-9.-]+\\.ru/")
+
+Build or rebuild the index from the command line with:
+
+    uv run python -m memtools.search build
+    uv run python -m memtools.search query evil-domain.com
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+
+import pyarrow as pa
+
+from memtools._util import atomic_output
+from memtools.case import _literal, _quote
+from memtools.plugins import VAD_DUMP_DIR
+from memtools.strings import MIN_LENGTH, STRINGS_SCHEMA, string_batches
+
+try:
+    from re import _constants as sre_constants, _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_constants
+    import sre_parse
+
+STRINGS_DB = "strings.duckdb"
+
+TRIGRAM = 3
+
+
+def vad_files(vad_dir=VAD_DUMP_DIR):
+    return sorted(os.path.basename(path) for path in glob.glob(os.path.join(vad_dir, "*.dmp")))
+
+
+def build_index(vad_dir=VAD_DUMP_DIR, index_path=STRINGS_DB, min_length=MIN_LENGTH, workers=None):
+    """
+    Extract the strings of every VAD file in `vad_dir` and index them in `index_path`.
+
+    Like the case database, the index is written to a temporary file and moved into place
+    when it is complete. Returns the number of strings indexed.
+    """
+    import duckdb
+
+    files = vad_files(vad_dir)
+    batches = string_batches(files, vad_dir=vad_dir, min_length=min_length, workers=workers)
+    reader = pa.RecordBatchReader.from_batches(STRINGS_SCHEMA, (batch for batch in batches if batch.num_rows))
+
+    with atomic_output(index_path) as tmp_path:
+        # DuckDB refuses to open the empty placeholder file
+        os.remove(tmp_path)
+        con = duckdb.connect(tmp_path)
+        try:
+            con.from_arrow(reader).create("_extracted")
+            con.execute(
+                "CREATE TABLE strings AS "
+                'SELECT row_number() OVER (ORDER BY vad_file, "offset")::UBIGINT AS id, * FROM _extracted '
+                'ORDER BY vad_file, "offset"'
+            )
+            con.execute("DROP TABLE _extracted")
+
+            # Sorted by trigram, so a lookup only reads the row groups holding that trigram
+            con.execute(
+                f"""
+                CREATE TABLE string_trigrams AS
+                SELECT DISTINCT substr(lower(string), pos, {TRIGRAM}) AS trigram, id
+                FROM (SELECT id, string, unnest(range(1, length(string) - {TRIGRAM - 2})) AS pos FROM strings)
+                ORDER BY trigram, id
+                """
+            )
+            (count,) = con.execute("SELECT count(*) FROM strings").fetchone()
+        finally:
+            con.close()
+
+    return count
+
+
+def attach_index(con, index_path=STRINGS_DB, vad_dir=VAD_DUMP_DIR, name="strings_index"):
+    """
+    Attach the string index read-only to the Ibis DuckDB connection `con`.
+
+    The index is built from `vad_dir` first if it doesn't exist yet.
+    """
+    if not os.path.exists(index_path):
+        build_index(vad_dir, index_path)
+
+    attached = {row[0] for row in con.raw_sql("SELECT database_name FROM duckdb_databases()").fetchall()}
+    if name not in attached:
+        con.attach(index_path, name=name, read_only=True)
+    return con
+
+
+def trigrams(text):
+    text = text.lower()
+    return sorted({text[i : i + TRIGRAM] for i in range(len(text) - TRIGRAM + 1)})
+
+
+def _candidates(grams, name):
+    """SQL for the ids of strings that contain every trigram in `grams`."""
+    values = ", ".join(_literal(gram) for gram in grams)
+    return (
+        f"SELECT id FROM {_quote(name)}.string_trigrams WHERE trigram IN ({values}) "
+        f"GROUP BY id HAVING count(*) = {len(grams)}"
+    )
+
+
+def _query(con, condition, position, grams, name):
+    where = condition
+    if grams:
+        where = f"id IN ({_candidates(grams, name)}) AND {condition}"
+
+    return con.sql(
+        f"""
+        SELECT
+            pid,
+            vad_file,
+            "offset",
+            encoding,
+            string,
+            -- byte offset of the hit in the VAD file, UTF-16 strings use two bytes per character
+            ("offset" + ({position}) * CASE WHEN encoding = 'utf-16le' THEN 2 ELSE 1 END)::UBIGINT AS hit_offset
+        FROM {_quote(name)}.strings
+        WHERE {where}
+        """
+    )
+
+
+def search(con, term, name="strings_index"):
+    """
+    Strings in any VAD that contain `term`, ignoring case.
+
+    Terms shorter than three characters can't use the index and scan all strings.
+    """
+    needle = _literal(term.lower())
+    return _query(
+        con,
+        f"contains(lower(string), {needle})",
+        f"strpos(lower(string), {needle}) - 1",
+        trigrams(term),
+        name,
+    )
+
+
+def required_literals(pattern):
+    """
+    Literal runs that every match of the regex `pattern` must contain.
+
+    Only literals outside of branches, repeats and character classes are used, so the
+    result is a safe prefilter: it may keep strings that don't match, never drop one that does.
+    """
+    runs, current = [], []
+
+    def walk(parsed):
+        for op, arg in parsed:
+            if op is sre_constants.LITERAL:
+                current.append(chr(arg))
+            elif op is sre_constants.SUBPATTERN:
+                walk(arg[-1])
+            elif op is sre_constants.AT:
+                # anchors don't consume characters
+                continue
+            else:
+                runs.append("".join(current))
+                current.clear()
+
+    walk(sre_parse.parse(pattern))
+    runs.append("".join(current))
+    return [run for run in runs if len(run) >= TRIGRAM]
+
+
+def search_regex(con, pattern, name="strings_index"):
+    """Strings in any VAD that match the regular expression `pattern`."""
+    grams = sorted({gram for run in required_literals(pattern) for gram in trigrams(run)})
+    # DuckDB has no match position, so everything from the leftmost match on is cut off and
+    # what remains is measured. The matched text can also occur earlier in the string.
+    rest_of_string = _literal(f"(?:{pattern})(?s:.*)")
+    return _query(
+        con,
+        f"regexp_matches(string, {_literal(pattern)})",
+        f"length(regexp_replace(string, {rest_of_string}, ''))",
+        grams,
+        name,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.search", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-i", "--index", default=STRINGS_DB, help="index database")
+    parser.add_argument("-o", "--dump-dir", default=VAD_DUMP_DIR, help="directory with the VAD dumps")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("build", help="extract and index the strings of every VAD")
+    query = commands.add_parser("query", help="search the index")
+    query.add_argument("term")
+    query.add_argument("-r", "--regex", action="store_true", help="treat the term as a regular expression")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        start = time.perf_counter()
+        count = build_index(args.dump_dir, args.index)
+        print(f"{args.index}: {count} strings in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    import ibis
+
+    con = attach_index(ibis.duckdb.connect(), args.index, args.dump_dir)
+    hits = (search_regex if args.regex else search)(con, args.term)
+    for row in hits.order_by("vad_file", "offset").to_pyarrow().to_pylist():
+        print(f"{row['pid']:>6}  {row['vad_file']}  {row['hit_offset']:#x}  {row['string']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""
+Least-frequency stacking across the fleet: which values are seen on fewer than k hosts.
+
+Injected DLLs, odd services and one-off command lines stand out because few hosts have
+them. For every host and attribute (DLL path, command line pattern, handle name, ...) the
+host's distinct values are stored, sorted, next to its plugin output in the fleet
+directory:
+
+    fleet/host=CLIENT-02/stack=dll_path/values.parquet
+
+Each value is in a host's file once, so counting the rows of a value across all files
+counts the hosts it was seen on. The counts are exact: an approximate count, such as a
+count-min sketch, only ever overcounts, and least-frequency stacking would then drop the
+rare values it is meant to find. The files are much smaller than the plugin output, as
+most values repeat within a host, and adding a host only means writing that host's files.
+DuckDB's aggregation spills to disk when the values of the whole fleet don't fit in memory:
+
+    rare_values(con, "dll_path", k=3)                       # across the whole fleet
+    rare_values(con, "dll_path", k=3, host="CLIENT-07")     # one host against the fleet
+
+`memtools.fleet.add_host` stores the values of a host when it is added. From the command
+line:
+
+    uv run python -m memtools.stacking dll_path -k 3 --host CLIENT-07
+"""
+
+import argparse
+import glob
+import os
+import sys
+
+from memtools._util import atomic_output
+from memtools.case import _literal
+from memtools.fleet import FLEET_DIR, fleet_hosts, fleet_path
+
+VALUES_FILE = "values.parquet"
+
+# Attribute -> (plugin table, value of a row). Numbers such as PIDs, ports and temporary
+# file suffixes differ from host to host, so they are masked where the pattern matters.
+STACK_ATTRIBUTES = {
+    "process": ("pslist", "lower(image_file_name)"),
+    "dll_name": ("dlllist", "lower(name)"),
+    "dll_path": ("dlllist", "lower(path)"),
+    "cmdline": ("cmdline", r"regexp_replace(lower(args), '\d+', '#', 'g')"),
+    "handle_name": ("handles", r"regexp_replace(name, '\d+', '#', 'g')"),
+    "service": ("svcscan", "lower(name)"),
+}
+
+
+def values_path(host, attribute, fleet_dir=FLEET_DIR):
+    return os.path.join(fleet_dir, f"host={host}", f"stack={attribute}", VALUES_FILE)
+
+
+def _values(attribute, path):
+    expr = STACK_ATTRIBUTES[attribute][1]
+    return (
+        f"SELECT DISTINCT {expr} AS value FROM read_parquet({_literal(path)}) "
+        "WHERE value IS NOT NULL AND value <> ''"
+    )
+
+
+def stack_host(host, fleet_dir=FLEET_DIR, attributes=None):
+    """
+    Store the distinct values of `host` for `attributes` (all of `STACK_ATTRIBUTES` by default).
+
+    Attributes whose plugin wasn't run for the host are skipped. Returns the attributes
+    that were written.
+    """
+    import duckdb
+
+    con = duckdb.connect()
+    written = []
+    try:
+        for attribute in attributes or STACK_ATTRIBUTES:
+            path = fleet_path(host, STACK_ATTRIBUTES[attribute][0], fleet_dir)
+            if not os.path.exists(path):
+                continue
+            query = f"{_values(attribute, path)} ORDER BY value"
+            with atomic_output(values_path(host, attribute, fleet_dir)) as tmp_path:
+                con.execute(f"COPY ({query}) TO {_literal(tmp_path)} (FORMAT parquet)")
+            written.append(attribute)
+    finally:
+        con.close()
+    return written
+
+
+def stack_fleet(attribute, fleet_dir=FLEET_DIR):
+    """Store the values of `attribute` for every host that has none, or whose plugin output is newer."""
+    plugin = STACK_ATTRIBUTES[attribute][0]
+    for host in fleet_hosts(fleet_dir):
+        source, values = fleet_path(host, plugin, fleet_dir), values_path(host, attribute, fleet_dir)
+        if not os.path.exists(source):
+            continue
+        if not os.path.exists(values) or os.path.getmtime(values) < os.path.getmtime(source):
+            stack_host(host, fleet_dir, [attribute])
+
+
+def rare_values(con, attribute, k, host=None, fleet_dir=FLEET_DIR):
+    """
+    The values of `attribute` seen on fewer than `k` hosts, with the number of hosts.
+
+    Only the values of `host` are looked at if it is given, otherwise those of the whole
+    fleet. `con` is an Ibis DuckDB connection, the result an Ibis table ordered from the
+    rarest value up.
+    """
+    stack_fleet(attribute, fleet_dir)
+
+    files = values_path("*", attribute, fleet_dir)
+    host_files = values_path(host or "*", attribute, fleet_dir)
+    if not glob.glob(files) or not glob.glob(host_files):
+        return con.sql("SELECT NULL::VARCHAR AS value, NULL::BIGINT AS hosts WHERE false")
+
+    # Only values of `host` are counted, a value can't be rare if the host doesn't have it
+    candidates = f"WHERE value IN (SELECT value FROM read_parquet({_literal(host_files)}))" if host else ""
+    query = f"""
+        SELECT value, count(*)::BIGINT AS hosts
+        FROM read_parquet({_literal(files)})
+        {candidates}
+        GROUP BY value
+        HAVING count(*) < {int(k)}
+        ORDER BY hosts, value
+    """
+    return con.sql(query)
+
+
+def main(argv=None):
+    import ibis
+
+    parser = argparse.ArgumentParser(prog="memtools.stacking", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("attribute", choices=sorted(STACK_ATTRIBUTES), help="what to stack")
+    parser.add_argument("-k", type=int, default=2, help="report values seen on fewer than this many hosts")
+    parser.add_argument("--host", default=None, help="only report values of this host")
+    parser.add_argument("--fleet-dir", default=FLEET_DIR, help="fleet directory")
+    args = parser.parse_args(argv)
+
+    rows = rare_values(ibis.duckdb.connect(), args.attribute, args.k, args.host, args.fleet_dir)
+    rows = rows.to_pyarrow().to_pylist()
+    for row in rows:
+        print(f"{row['hosts']:>5}  {row['value']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
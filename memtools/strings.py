@@ -0,0 +1,127 @@
+"""
+Extract ASCII and UTF-16 strings from VAD dumps in parallel.
+
+Every VAD file is memory-mapped in a worker process, so a file is read once (and only the
+pages the regex engine touches are resident) instead of being loaded whole for the ASCII
+pass and again for the UTF-16 pass. The results stream back as Arrow record batches, one
+per file, and go straight into DuckDB:
+
+    strings = create_strings_table(con, files)
+
+The table has one row per string: the VAD file, pid, byte offset in the file, encoding,
+length and the string itself. The patterns are the ones FLOSS uses, so the output matches `floss.strings`.
+"""
+
+import mmap
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pyarrow as pa
+from floss.strings import ASCII_BYTE
+
+from memtools.plugins import VAD_DUMP_DIR
+from memtools.vad import parse_vad_file
+
+MIN_LENGTH = 3
+
+ENCODINGS = ["ascii", "utf-16le"]
+
+# One row per string. The file name and encoding repeat for every string of a file, so they
+# are dictionary encoded.
+STRINGS_SCHEMA = pa.schema(
+    [
+        ("vad_file", pa.dictionary(pa.int32(), pa.string())),
+        ("pid", pa.int64()),
+        ("offset", pa.uint64()),
+        ("encoding", pa.dictionary(pa.int8(), pa.string())),
+        ("length", pa.int32()),
+        ("string", pa.string()),
+    ]
+)
+
+
+def string_patterns(min_length=MIN_LENGTH):
+    ascii_re = re.compile(rb"[%s]{%d,}" % (ASCII_BYTE, min_length))
+    unicode_re = re.compile(rb"(?:[%s]\x00){%d,}" % (ASCII_BYTE, min_length))
+    return ascii_re, unicode_re
+
+
+def extract_strings(path, min_length=MIN_LENGTH):
+    """
+    ASCII and UTF-16LE strings in the file at `path`, as two lists of (offset, string).
+
+    Both patterns run over the same mapping. A single alternation can't replace them: it
+    would consume the last ASCII character of a run and miss a UTF-16 string starting there.
+    """
+    ascii_re, unicode_re = string_patterns(min_length)
+
+    with open(path, "rb") as fh:
+        if os.fstat(fh.fileno()).st_size == 0:
+            return [], []
+        with mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            ascii = [(m.start(), m.group().decode("ascii")) for m in ascii_re.finditer(buf)]
+            unicode = [(m.start(), m.group().decode("utf-16le")) for m in unicode_re.finditer(buf)]
+
+    return ascii, unicode
+
+
+def _file_batch(filename, vad_dir, min_length):
+    path = os.path.join(vad_dir, filename)
+    ascii, unicode = extract_strings(path, min_length) if os.path.exists(path) else ([], [])
+
+    found = ascii + unicode
+    rows = len(found)
+    strings = [string for _, string in found]
+
+    return pa.record_batch(
+        [
+            pa.DictionaryArray.from_arrays(pa.array([0] * rows, pa.int32()), [filename]),
+            pa.array([parse_vad_file(filename)[0]] * rows, pa.int64()),
+            pa.array([offset for offset, _ in found], pa.uint64()),
+            pa.DictionaryArray.from_arrays(
+                pa.array([0] * len(ascii) + [1] * len(unicode), pa.int8()),
+                ENCODINGS,
+            ),
+            pa.array([len(string) for string in strings], pa.int32()),
+            pa.array(strings, pa.string()),
+        ],
+        schema=STRINGS_SCHEMA,
+    )
+
+
+def string_batches(files, vad_dir=VAD_DUMP_DIR, min_length=MIN_LENGTH, workers=None):
+    """Yield one record batch per VAD file in `files`, in the order the workers finish them."""
+    # The notebook and its DuckDB connection run threads of their own, so the workers are spawned, not forked
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        futures = [pool.submit(_file_batch, filename, vad_dir, min_length) for filename in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def load_batches(con, table_name, batches, schema=STRINGS_SCHEMA):
+    """
+    Stream `batches` into a new DuckDB table `table_name` on the Ibis connection `con`.
+
+    Batches are consumed as they arrive, so the complete result is never held in Python.
+    """
+    # Empty batches that went through pickle have unaligned buffers that Arrow warns about
+    reader = pa.RecordBatchReader.from_batches(schema, (batch for batch in batches if batch.num_rows))
+    con.drop_table(table_name, force=True)
+    con.con.from_arrow(reader).create(table_name)
+    return con.table(table_name)
+
+
+def create_strings_table(con, files, table_name="strings", progress=None, **kwargs):
+    """
+    Extract the strings of every VAD file in `files` into the table `table_name`.
+
+    `progress` wraps the stream of batches, e.g. `mo.status.progress_bar`. It is called with
+    the iterator and `total=len(files)`.
+    """
+    files = list(files)
+    batches = string_batches(files, **kwargs)
+    if progress is not None:
+        batches = progress(batches, total=len(files))
+    return load_batches(con, table_name, batches)
@@ -0,0 +1,316 @@
+"""
+Tables that page through an Ibis expression instead of a materialised DataFrame.
+
+`mo.ui.table(expr.to_polars())` pulls every row into the kernel before the first page is
+shown. `paged_table` takes the Ibis expression itself and only ever asks DuckDB for the
+page on screen: every page request becomes a `LIMIT/OFFSET` query, sorting, searching and
+column filters are added to the expression, and the row count is a `count(*)`. The last
+few pages, and row counts, are kept so flipping back and forth doesn't run the query again.
+Pages are ordered by the table's sort columns and then by every column, so the pages of a
+join or aggregate neither repeat nor skip rows:
+
+    paged_table(con.table("handles", database="case"), page_size=25)
+
+`style_cell` callbacks are called with the values of the page on screen only. Highlighting
+can also be described as `StyleRule`s, which are added to the page query as boolean columns
+so DuckDB decides which cells match, and only the matching cells get a style:
+
+    paged_table(
+        malfind,
+        style_rules=[
+            StyleRule("tag", _.tag == "VadS", {"backgroundColor": "#ff9aa2"}),
+            StyleRule("start_vpn", None, {"fontFamily": "monospace"}),
+        ],
+    )
+
+The paging plugs into private parts of marimo's table plugin, which may change in any
+release. With a marimo version outside `SUPPORTED_MARIMO` it is left out and `paged_table`
+is a plain `mo.ui.table` of the materialised expression, style rules included.
+"""
+
+import functools
+import re
+from collections import OrderedDict
+
+import ibis.expr.operations as ops
+import marimo as mo
+
+PAGE_CACHE_SIZE = 16
+
+# marimo versions the paging was written against, the upper bound excluded
+SUPPORTED_MARIMO = ((0, 16), (0, 18))
+
+
+def _marimo_version():
+    return tuple(int(part) for part in re.findall(r"\d+", mo.__version__)[:2])
+
+
+PAGING = SUPPORTED_MARIMO[0] <= _marimo_version() < SUPPORTED_MARIMO[1] and all(
+    hasattr(mo.ui.table, method) for method in ("_apply_filters_query_sort", "_style_cells")
+)
+if PAGING:
+    try:
+        from marimo._plugins.ui._impl.tables import utils as _table_utils
+        from marimo._plugins.ui._impl.tables.ibis_table import IbisTableManagerFactory
+        from marimo._plugins.ui._impl.tables.polars_table import PolarsTableManagerFactory
+        from marimo._plugins.ui._impl.tables.table_manager import TableManagerFactory
+    except ImportError:
+        PAGING = False
+if not PAGING:
+    TableManagerFactory = object
+
+
+class PageCache:
+    """Pages and row counts of one table, least recently used evicted first."""
+
+    def __init__(self, maxsize=PAGE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+
+    def get(self, key, compute):
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+        value = self._entries[key] = compute()
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+        return value
+
+
+class StyleRule:
+    """
+    The CSS `style` for cells of `column` in the rows where `predicate` holds.
+
+    `predicate` is an Ibis deferred such as `_.tag == "VadS"` or a function of the table,
+    None styles every row. A null result counts as false.
+    """
+
+    def __init__(self, column, predicate, style):
+        self.column = column
+        self.predicate = predicate
+        self.style = style
+
+    def __repr__(self):
+        return f"StyleRule({self.column!r}, {self.predicate!r}, {self.style!r})"
+
+
+def _sort_keys(expr):
+    """
+    The sort keys of the sort nearest to `expr`, looking through filters and projections.
+
+    The keys are named after `expr`'s columns. Keys on a computed value, or on a column a
+    projection drops, end the list, as ordering by the keys after them alone would be wrong.
+    """
+    op = expr.op()
+    if isinstance(op, ops.Sort):
+        return list(op.keys)
+
+    # Column names at the current op -> names of the same columns in `expr`
+    columns = {column: column for column in expr.columns}
+    while isinstance(op, (ops.Filter, ops.Project)):
+        if isinstance(op, ops.Project):
+            columns = {
+                value.name: columns[name]
+                for name, value in op.values.items()
+                if name in columns and isinstance(value, ops.Field) and value.rel == op.parent
+            }
+        op = op.parent
+    if not isinstance(op, ops.Sort):
+        return []
+
+    keys = []
+    for key in op.keys:
+        if not (isinstance(key.expr, ops.Field) and key.expr.name in columns):
+            break
+        column = expr[columns[key.expr.name]]
+        order = column.asc if key.ascending else column.desc
+        keys.append(order(nulls_first=key.nulls_first).op())
+    return keys
+
+
+def stable_order(expr):
+    """
+    `expr` ordered by its sort keys, if it has any, and then by every other column.
+
+    The sort keys may be under a filter or projection, like marimo's column filters and
+    search add on top of a sorted expression. Without an ORDER BY, DuckDB may return the
+    rows of a join or aggregate in a different order for every `LIMIT/OFFSET` query. Rows
+    that are equal in every column can't be told apart, so their order doesn't matter.
+    """
+    op = expr.op()
+    keys = _sort_keys(expr)
+    table = op.parent.to_expr() if isinstance(op, ops.Sort) else expr
+    sorted_columns = {key.expr.name for key in keys if isinstance(key.expr, ops.Field)}
+    return table.order_by(
+        *(key.to_expr() for key in keys), *(column for column in table.columns if column not in sorted_columns)
+    )
+
+
+def style_masks(table, style_rules):
+    """A boolean column named `_style_<i>` for every style rule with a predicate on a column of `table`."""
+    return {
+        f"_style_{index}": rule.predicate
+        for index, rule in enumerate(style_rules)
+        if rule.predicate is not None and rule.column in table.columns
+    }
+
+
+class IbisPages:
+    """An Ibis expression to be shown by `paged_table`, with its style rules and page cache."""
+
+    def __init__(self, table, style_rules=(), page_cache_size=PAGE_CACHE_SIZE):
+        self.table = table
+        self.style_rules = list(style_rules)
+        self.cache = PageCache(page_cache_size)
+
+
+class IbisPagesManagerFactory(TableManagerFactory):
+    """Lets marimo pick `IbisPagesManager` for `IbisPages`, plain Ibis tables are left alone."""
+
+    @staticmethod
+    def package_name():
+        return "ibis"
+
+    @staticmethod
+    @functools.lru_cache(maxsize=1)
+    def create():
+        IbisTableManager = IbisTableManagerFactory.create()
+        PolarsTableManager = PolarsTableManagerFactory.create()
+
+        class IbisPagesManager(IbisTableManager):
+            type = "ibis"
+
+            def __init__(self, data, cache=None, style_rules=()):
+                if isinstance(data, IbisPages):
+                    data, cache, style_rules = data.table, data.cache, data.style_rules
+                super().__init__(data)
+                self.cache = cache if cache is not None else PageCache()
+                self.style_rules = style_rules
+
+            @staticmethod
+            def is_type(value):
+                return isinstance(value, IbisPages)
+
+            def with_new_data(self, data):
+                # Sorting, searching and filtering return new expressions that share the cache
+                return IbisPagesManager(data.to_native(), self.cache, self.style_rules)
+
+            def _masked_page(self, count, offset):
+                """The page with a `_style_<i>` column for every style rule with a predicate."""
+                expr = self._original_data
+                masks = style_masks(expr, self.style_rules)
+
+                def fetch():
+                    page = stable_order(expr).limit(count, offset=offset)
+                    return (page.mutate(**masks) if masks else page).to_polars()
+
+                return self.cache.get(("page", expr.op(), count, offset), fetch)
+
+            def page(self, count, offset):
+                """Rows `[offset, offset + count)` as a Polars DataFrame."""
+                page = self._masked_page(count, offset)
+                return page.select(self._original_data.columns)
+
+            def styles(self, count, offset):
+                """Styles of the cells matched by a style rule on the page, keyed by row id and column."""
+                page = self._masked_page(count, offset)
+                styles = {}
+                for index, rule in enumerate(self.style_rules):
+                    if rule.column not in self._original_data.columns:
+                        continue
+                    if rule.predicate is None:
+                        rows = range(page.height)
+                    else:
+                        rows = page[f"_style_{index}"].fill_null(False).arg_true()
+                    for row in rows:
+                        # The first rule that matches a cell wins
+                        styles.setdefault(str(offset + row), {}).setdefault(rule.column, rule.style)
+                return styles
+
+            def take(self, count, offset):
+                return PolarsTableManager(self.page(count, offset))
+
+            def get_num_rows(self, force=True):
+                expr = self._original_data
+                return self.cache.get(("count", expr.op()), lambda: int(expr.count().execute()))
+
+        return IbisPagesManager
+
+
+if PAGING:
+    # Checked before marimo's own Ibis support, which materialises the whole table to page it
+    _table_utils.MANAGERS.insert(0, IbisPagesManagerFactory())
+
+
+def _fallback_style_cell(frame, style_rules, style_cell):
+    """
+    A `style_cell` for the materialised `frame` and its `_style_<i>` columns, used when the
+    paging isn't available. Row ids are the rows' positions in `frame`.
+    """
+    matches = [
+        (rule, None if rule.predicate is None else set(frame[f"_style_{index}"].fill_null(False).arg_true()))
+        for index, rule in enumerate(style_rules)
+        if rule.predicate is None or f"_style_{index}" in frame.columns
+    ]
+
+    def style(row_id, column, value):
+        # The first rule that matches a cell wins, the other cells are left to `style_cell`
+        for rule, rows in matches:
+            if rule.column == column and (rows is None or int(row_id) in rows):
+                return rule.style
+        return style_cell(row_id, column, value) if style_cell is not None else {}
+
+    return style
+
+
+class paged_table(mo.ui.table):
+    """
+    `mo.ui.table` for an Ibis expression that queries one page at a time.
+
+    Takes the same arguments as `mo.ui.table`, plus a list of `StyleRule`s. Cells matched
+    by a rule get its style, the others are styled by `style_cell` if it is given. Column
+    summaries and row selection need the whole table, so they default to off.
+
+    Without `PAGING` the expression is materialised and shown by `mo.ui.table` itself.
+    """
+
+    def __init__(self, data, style_rules=(), page_cache_size=PAGE_CACHE_SIZE, **kwargs):
+        kwargs.setdefault("selection", None)
+        kwargs.setdefault("show_column_summaries", False)
+        if PAGING:
+            super().__init__(IbisPages(data, style_rules, page_cache_size), **kwargs)
+            return
+
+        masks = style_masks(data, style_rules)
+        frame = (data.mutate(**masks) if masks else data).to_polars()
+        if style_rules:
+            kwargs["style_cell"] = _fallback_style_cell(frame, style_rules, kwargs.get("style_cell"))
+        super().__init__(frame.select(data.columns), **kwargs)
+
+    def _apply_filters_query_sort(self, filters, query, sort):
+        result = super()._apply_filters_query_sort(filters, query, sort)
+        if not PAGING:
+            return result
+        # Column filters come back as a generic narwhals table, put them back on the paging manager
+        if not isinstance(result, type(self._manager)):
+            result = self._manager.with_new_data(result.data)
+        return result
+
+    def _style_cells(self, skip, take, total_rows):
+        if not PAGING:
+            return super()._style_cells(skip, take, total_rows)
+        manager = self._searched_manager
+        if self._style_cell is None and not manager.style_rules:
+            return None
+
+        styles = {}
+        if self._style_cell is not None:
+            page = manager.page(take, skip)
+            styles = {
+                str(skip + i): {column: self._style_cell(str(skip + i), column, value) for column, value in row.items()}
+                for i, row in enumerate(page.iter_rows(named=True))
+            }
+        for row_id, cells in manager.styles(take, skip).items():
+            styles.setdefault(row_id, {}).update(cells)
+        return styles
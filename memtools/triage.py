@@ -0,0 +1,160 @@
+"""
+A per-process triage summary, computed once when the case database is built.
+
+The triage dashboard shows how many processes malfind flagged, which ones have suspicious
+threads, which ones also have network connections, and so on. Instead of running each of
+those queries against the plugin tables on every re-run, `build_summary` stores a
+`triage_summary` table in the case database with one row per (pid, process) and a count
+per indicator:
+
+    triage = triage_summary(con)
+    triage.filter(_.malfind_hits > 0)
+
+Every plugin table is read once, all counts that come from it are computed in the same
+pass. Counts from a plugin that wasn't run are null, not 0.
+
+`correlate` answers the ad-hoc version of the same question for any number of tables,
+such as filtered plugin output: which of them have rows for each process, and how many.
+The process name column is found whether a plugin calls it `process`, `owner` (netscan)
+or `image_file_name` (pslist, psscan):
+
+    flagged = correlate({"malfind": malfind, "netscan": netscan, "threads": suspicious_threads})
+    flagged.filter(_.plugins >= 2)
+"""
+
+import ibis
+
+from memtools.case import CASE_DB, _quote, writable_case
+
+TRIAGE_TABLE = "triage_summary"
+
+# Tables listing processes, and the column with the process name in them
+PROCESS_TABLES = {"pslist": "image_file_name", "psscan": "image_file_name"}
+
+# Summary column -> (plugin table, process name column, rows counted, None for all rows)
+SUMMARY_COLUMNS = {
+    "malfind_hits": ("malfind", "process", None),
+    "malfind_notes": ("malfind", "process", "notes IS NOT NULL"),
+    "rwx_vads": (
+        "vadinfo",
+        "process",
+        "protection LIKE '%EXECUTE_READWRITE%' OR protection LIKE '%EXECUTE_WRITECOPY%'",
+    ),
+    "suspicious_threads": ("suspicious_threads", "process", None),
+    "net_connections": ("netscan", "owner", None),
+    "process_handles": ("handles", "process", "type = 'Process'"),
+    # The executable itself is never in the init order list
+    "unlinked_dlls": (
+        "ldrmodules",
+        "process",
+        "NOT in_load OR NOT in_mem OR (NOT in_init AND lower(mapped_path) NOT LIKE '%.exe')",
+    ),
+}
+
+# Names plugins give the process name column
+PROCESS_COLUMNS = ["process", "owner", "image_file_name"]
+
+
+def summary_query(tables, database=None):
+    """The query building the summary from the plugin tables in `tables` (a set of names) of `database`."""
+
+    def source(table):
+        return f"{_quote(database)}.{_quote(table)}" if database else _quote(table)
+
+    sources = {}
+    for column, (table, process, condition) in SUMMARY_COLUMNS.items():
+        if table in tables:
+            sources.setdefault((table, process), []).append((column, condition))
+
+    processes = [f"SELECT pid, {_quote(process)} AS process FROM {source(table)}" for table, process in sources]
+    processes += [
+        f"SELECT pid, {_quote(process)} AS process FROM {source(table)}"
+        for table, process in PROCESS_TABLES.items()
+        if table in tables
+    ]
+    # Without any plugin tables the summary is empty, but still has its columns
+    processes = processes or ["SELECT NULL::BIGINT AS pid, NULL::VARCHAR AS process"]
+
+    ctes = [f"processes AS ({' UNION '.join(processes)})"]
+    joins = []
+    counts = {}
+    for index, ((table, process), columns) in enumerate(sources.items()):
+        alias = f"s{index}"
+        aggregates = ", ".join(
+            f"count_if({condition})::BIGINT AS {_quote(column)}" if condition else f"count(*) AS {_quote(column)}"
+            for column, condition in columns
+        )
+        ctes.append(
+            f"{alias} AS (SELECT pid, {_quote(process)} AS process, {aggregates} FROM {source(table)} GROUP BY ALL)"
+        )
+        joins.append(f"LEFT JOIN {alias} ON {alias}.pid = p.pid AND {alias}.process IS NOT DISTINCT FROM p.process")
+        for column, _ in columns:
+            counts[column] = f"coalesce({alias}.{_quote(column)}, 0)"
+
+    select = ", ".join(f"{counts.get(column, 'NULL::BIGINT')} AS {_quote(column)}" for column in SUMMARY_COLUMNS)
+    return (
+        f"WITH {', '.join(ctes)} "
+        f"SELECT p.pid, p.process, {select} FROM processes AS p {' '.join(joins)} "
+        f"WHERE p.pid IS NOT NULL ORDER BY p.pid, p.process"
+    )
+
+
+def build_summary(con, name=TRIAGE_TABLE, database=None):
+    """
+    Create the summary table `name` from the plugin tables in the DuckDB connection `con`.
+
+    The plugin tables are read from, and the summary written to, the attached `database`
+    if one is given.
+    """
+    if database is None:
+        (database,) = con.execute("SELECT current_database()").fetchone()
+    query = "SELECT table_name FROM duckdb_tables() WHERE database_name = ?"
+    tables = {row[0] for row in con.execute(query, [database]).fetchall()}
+    con.execute(f"CREATE OR REPLACE TABLE {_quote(database)}.{_quote(name)} AS {summary_query(tables, database)}")
+    return name
+
+
+def triage_summary(con, case_path=CASE_DB, case_name="case"):
+    """
+    The summary table of the case attached to the Ibis connection `con` as `case_name`.
+
+    A case database built before the summary existed gets it added first.
+    """
+    # `database=case_name` alone would be a schema of the default catalog
+    if TRIAGE_TABLE not in con.list_tables(database=(case_name, "main")):
+        with writable_case(con, case_path, case_name):
+            build_summary(con.con, database=case_name)
+    return con.table(TRIAGE_TABLE, database=case_name)
+
+
+def key_column(table, key):
+    """The column of `table` holding `key`; `process` is also found under the other names in `PROCESS_COLUMNS`."""
+    candidates = PROCESS_COLUMNS if key == "process" else [key]
+    for column in candidates:
+        if column in table.columns:
+            return column
+    raise KeyError(f"no {key!r} column in table with columns {list(table.columns)}")
+
+
+def correlate(tables, keys=("pid", "process")):
+    """
+    Which of `tables` have rows for each process, as one row per key with a count per table.
+
+    `tables` maps names to Ibis tables. Each table is grouped by `keys` once, the groups are
+    combined with a single UNION ALL and pivoted into a column per name with that table's
+    number of rows for the key (0 if it has none), plus `plugins`, the number of tables
+    with any.
+    """
+    keys = list(keys)
+    groups = []
+    for name, table in tables.items():
+        columns = {key: table[key_column(table, key)] for key in keys}
+        grouped = table.group_by(**columns).agg(_rows=table.count())
+        groups.append(grouped.mutate(_plugin=ibis.literal(name)))
+
+    # UNION ALL needs the same key types in every table
+    schema = groups[0].schema()
+    combined = ibis.union(*(group.cast({key: schema[key] for key in keys}) for group in groups), distinct=False)
+
+    counts = {name: combined._rows.sum(where=combined._plugin == name).fill_null(0).cast("int64") for name in tables}
+    return combined.group_by(keys).agg(**counts, plugins=combined._plugin.nunique()).order_by(keys)
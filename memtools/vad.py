@@ -0,0 +1,72 @@
+"""
+Resolve addresses to the VAD that contains them.
+
+Malfind hits, YARA match offsets and thread start addresses all need the same lookup: for
+each (pid, address), the VAD of that process with `start_vpn <= address <= end_vpn`. A
+generic range join compares every address with every VAD of the process. VADs of one
+process never overlap, so the candidate is simply the VAD with the largest `start_vpn` at or
+below the address. DuckDB answers that with an ASOF join, which sorts both sides once per
+pid and merges them, and a final `address <= end_vpn` check drops addresses that fall in
+the gap after a VAD.
+
+    resolved = resolve_vads(suspicious_threads, vads)
+    resolved = resolve_vads(malfind, vads, address="start_vpn")
+"""
+
+import os
+import re
+
+import ibis
+
+# vadinfo column -> column added to the resolved table
+VAD_COLUMNS = {
+    "start_vpn": "vad_start",
+    "end_vpn": "vad_end",
+    "protection": "vad_protection",
+    "file_output": "vad_file_output",
+}
+
+# Name `windows.vadinfo.VadInfo --dump` gives each dumped VAD
+VAD_FILE_RE = re.compile(r"pid\.(\d+)\.vad\.(0x[0-9a-fA-F]+)-(0x[0-9a-fA-F]+)\.dmp$")
+
+
+def parse_vad_file(filename):
+    """
+    (pid, start, end) of a VAD dump such as `pid.6616.vad.0x3f000-0x6cfff.dmp`.
+
+    All three are None for files that don't follow the naming scheme.
+    """
+    match = VAD_FILE_RE.match(os.path.basename(filename))
+    if not match:
+        return None, None, None
+    return int(match.group(1)), int(match.group(2), 16), int(match.group(3), 16)
+
+
+def resolve_vads(table, vads, address="address", pid="pid", keep_unresolved=False):
+    """
+    Add the VAD containing `table[address]` in process `table[pid]` to every row of `table`.
+
+    `vads` is the vadinfo table. The result has the columns of `table` plus `vad_start`,
+    `vad_end`, `vad_protection` and `vad_file_output`. Rows whose address isn't inside any
+    VAD are dropped, or kept with null VAD columns when `keep_unresolved` is set.
+    """
+    candidates = vads.select(
+        _vad_pid=vads.pid,
+        **{name: vads[column] for column, name in VAD_COLUMNS.items()},
+    )
+
+    joined = table.asof_join(
+        candidates,
+        on=table[address] >= candidates.vad_start,
+        predicates=[table[pid] == candidates._vad_pid],
+    )
+
+    inside = joined[address] <= joined.vad_end
+    if keep_unresolved:
+        joined = joined.mutate(
+            **{name: ibis.cases((inside, joined[name])) for name in VAD_COLUMNS.values()}
+        )
+    else:
+        joined = joined.filter(inside)
+
+    return joined.drop("_vad_pid")
@@ -0,0 +1,176 @@
+"""
+Keep the case database up to date while Volatility plugins are (re-)run.
+
+`watch_case` watches `volatility_plugin_output/` and, once new or rewritten Parquet files
+have settled, loads only those into the case database with `memtools.case.ingest_changed`.
+Plugin tables that didn't change are not read again. `on_change` is then called with the
+names of the tables that were replaced, so a notebook can re-run the cells reading them:
+
+    case_updates, set_case_updates = mo.state({})
+
+    def record(tables):
+        set_case_updates(lambda updates: {**updates, **{t: updates.get(t, 0) + 1 for t in tables}})
+
+    mo.Thread(target=watch_case, args=(con, record), kwargs={"stop": lambda: mo.current_thread().should_exit}).start()
+
+State updates only reach the notebook from a `mo.Thread`, so run it in one. A notebook
+has the case attached read-only; it is reattached writable for each update, see
+`memtools.case.writable_case`. Without a connection, the case file is opened directly,
+which is what the command line does:
+
+    uv run python -m memtools.watch
+
+Only one process can write to the case, and only while no other process has it open. If
+another notebook kernel has `case.duckdb` attached, every update fails with DuckDB's lock
+error until that kernel lets go of it (shut it down, or have only one notebook watch and
+the others not attach the case until the plugins are done). Failures are passed to
+`on_error`, so the notebook can show them, and the update is retried every
+`RETRY_SECONDS` until it succeeds. Cells reading the case while it is being swapped fail
+too; they re-run once the update has been recorded.
+"""
+
+import argparse
+import os
+import queue
+import sys
+import time
+
+from memtools.case import CASE_DB, changed_plugin_files, ingest, ingest_changed, writable_case
+from memtools.plugins import PLUGIN_OUTPUT_DIR
+
+# Seconds without new file events before the case is updated
+DEBOUNCE_SECONDS = 1.0
+
+# Seconds before a failed update is tried again, even without new file events
+RETRY_SECONDS = 10.0
+
+
+def update_case(con=None, plugin_dir=PLUGIN_OUTPUT_DIR, case_path=CASE_DB, case_name="case"):
+    """
+    Load the new or changed plugin output in `plugin_dir` into the case, returns the updated tables.
+
+    `con` is an Ibis DuckDB connection with the case attached as `case_name`, or None to
+    open `case_path` directly. A case that doesn't exist yet is built from scratch.
+    """
+    if not os.path.exists(case_path):
+        return ingest(plugin_dir, case_path)
+
+    if con is None:
+        import duckdb
+
+        db = duckdb.connect(case_path)
+        try:
+            return ingest_changed(db, plugin_dir)
+        finally:
+            db.close()
+
+    # Cells may be reading the case at the same time, from the notebook's own cursor, so the
+    # case is only reattached when there is something to load
+    db = con.con.cursor()
+    try:
+        if not changed_plugin_files(db, plugin_dir, database=case_name):
+            return []
+        with writable_case(con, case_path, case_name):
+            return ingest_changed(db, plugin_dir, database=case_name)
+    finally:
+        db.close()
+
+
+def _parquet_events(events):
+    """A watchdog event handler putting the paths of created, modified or moved Parquet files on `events`."""
+    from watchdog.events import FileSystemEventHandler
+
+    class Handler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            path = getattr(event, "dest_path", "") or event.src_path
+            if not event.is_directory and os.fsdecode(path).endswith(".parquet"):
+                events.put(path)
+
+    return Handler()
+
+
+def watch_case(
+    con=None,
+    on_change=None,
+    plugin_dir=PLUGIN_OUTPUT_DIR,
+    case_path=CASE_DB,
+    case_name="case",
+    debounce=DEBOUNCE_SECONDS,
+    stop=None,
+    on_error=None,
+    retry=RETRY_SECONDS,
+):
+    """
+    Update the case whenever plugin output in `plugin_dir` is added or rewritten, until `stop()` is true.
+
+    Output that changed while nothing was watching is picked up right away. `on_change`
+    is called with the names of the updated tables after every update. An update that
+    fails, for example on a file Volatility is still writing or on a case another process
+    has open, is retried on the next change or after `retry` seconds. `on_error` is called
+    with the exception when an update fails, and with None once an update succeeds again;
+    without it, failures are printed to stderr.
+    """
+    from watchdog.observers import Observer
+
+    os.makedirs(plugin_dir, exist_ok=True)
+    events = queue.Queue()
+    observer = Observer()
+    observer.schedule(_parquet_events(events), plugin_dir)
+    observer.start()
+
+    # Catch up with anything that changed since the case was last updated
+    pending = True
+    last_event = 0.0
+    failing = False
+    try:
+        while not (stop and stop()):
+            try:
+                events.get(timeout=min(debounce, 0.5))
+                pending, last_event = True, time.monotonic()
+                continue
+            except queue.Empty:
+                pass
+
+            if not pending or time.monotonic() - last_event < debounce:
+                continue
+            pending = False
+
+            try:
+                tables = update_case(con, plugin_dir, case_path, case_name)
+            except Exception as error:
+                if on_error is not None:
+                    on_error(error)
+                else:
+                    print(f"memtools.watch: updating {case_path} failed: {error}", file=sys.stderr)
+                # Try again once the debounce has passed `retry` seconds from now
+                failing, pending, last_event = True, True, time.monotonic() + retry - debounce
+                continue
+            if failing and on_error is not None:
+                on_error(None)
+            failing = False
+            if tables and on_change is not None:
+                on_change(tables)
+    finally:
+        observer.stop()
+        observer.join()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="memtools.watch", description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-d", "--plugin-dir", default=PLUGIN_OUTPUT_DIR, help="directory with the Parquet files")
+    parser.add_argument("-o", "--output", default=CASE_DB, help="case database to update")
+    parser.add_argument("--debounce", type=float, default=DEBOUNCE_SECONDS, help="seconds to wait for writes to settle")
+    args = parser.parse_args(argv)
+
+    def report(tables):
+        print(f"{args.output}: updated {', '.join(tables)}", flush=True)
+
+    try:
+        watch_case(on_change=report, plugin_dir=args.plugin_dir, case_path=args.output, debounce=args.debounce)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
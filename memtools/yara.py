@@ -0,0 +1,235 @@
+"""
+Compile YARA-X rules once and reuse them.
+
+Compiling is by far the slowest step when the same rule is scanned over and over, as in
+the interactive editor and the rule tests. `compile_rules` keeps compiled rules in memory,
+keyed by a hash of the rule text, and also writes them to disk so a restarted notebook
+skips compilation too:
+
+    rules = compile_rules(rule_text)
+    rules.scan(data)
+
+`sweep` scans every dumped VAD with a set of rules across a process pool and stores the
+matches in DuckDB:
+
+    matches = sweep(con, rule_text)
+    with_vadinfo(matches, con.table("vadinfo", database="case"))
+"""
+
+import glob
+import hashlib
+import io
+import multiprocessing
+import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from importlib import metadata
+
+import pyarrow as pa
+
+from memtools._util import atomic_output
+from memtools.cache import CACHE_DIR
+from memtools.plugins import VAD_DUMP_DIR
+from memtools.strings import load_batches
+from memtools.vad import parse_vad_file
+
+RULES_CACHE_DIR = os.path.join(CACHE_DIR, "yara")
+MAX_CACHED_RULES = 32
+# The editor compiles a new rule text on most keystrokes, so the files on disk are capped too
+MAX_SAVED_RULES = 256
+
+
+def yara_x_version():
+    try:
+        return metadata.version("yara-x")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def rules_key(rule_text):
+    """Serialised rules only load in the yara-x version that wrote them, so it is part of the key."""
+    return hashlib.sha256(f"{yara_x_version()}\0{rule_text}".encode()).hexdigest()
+
+
+class RuleCache:
+    """
+    Compiled rules for the last `maxsize` rule texts, least recently used evicted first.
+
+    With a `cache_dir`, compiled rules are also serialised there and loaded on a miss. Only
+    the `max_saved` most recently used files are kept.
+    """
+
+    def __init__(self, maxsize=MAX_CACHED_RULES, cache_dir=None, max_saved=MAX_SAVED_RULES):
+        self.maxsize = maxsize
+        self.cache_dir = cache_dir
+        self.max_saved = max_saved
+        self._rules = OrderedDict()
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.yarc")
+
+    def compile(self, rule_text):
+        """The compiled rules for `rule_text`. Raises `yara_x.CompileError` for invalid rules."""
+        import yara_x
+
+        key = rules_key(rule_text)
+        if key in self._rules:
+            self._rules.move_to_end(key)
+            return self._rules[key]
+
+        rules = self._load(key)
+        if rules is None:
+            rules = yara_x.compile(rule_text)
+            self._save(key, rules)
+
+        self._rules[key] = rules
+        while len(self._rules) > self.maxsize:
+            self._rules.popitem(last=False)
+        return rules
+
+    def _load(self, key):
+        import yara_x
+
+        if self.cache_dir is None or not os.path.exists(self.path(key)):
+            return None
+        try:
+            os.utime(self.path(key))
+            with open(self.path(key), "rb") as fh:
+                return yara_x.Rules.deserialize_from(fh)
+        except Exception:
+            # A corrupt or incompatible file is just a miss, it is overwritten below
+            return None
+
+    def _save(self, key, rules):
+        if self.cache_dir is None:
+            return
+        with atomic_output(self.path(key)) as tmp_path:
+            with open(tmp_path, "wb") as fh:
+                rules.serialize_into(fh)
+
+        saved = sorted(
+            (entry.stat().st_mtime, entry.path) for entry in os.scandir(self.cache_dir) if entry.name.endswith(".yarc")
+        )
+        for _, path in saved[: max(len(saved) - self.max_saved, 0)]:
+            os.remove(path)
+
+    def clear(self):
+        self._rules.clear()
+
+
+_cache = RuleCache(cache_dir=RULES_CACHE_DIR)
+
+
+def compile_rules(rule_text):
+    """Compile `rule_text` with YARA-X, or return the rules compiled earlier for the same text."""
+    return _cache.compile(rule_text)
+
+
+# One row per match of a sweep over VAD dumps
+MATCHES_SCHEMA = pa.schema(
+    [
+        ("rule", pa.string()),
+        ("namespace", pa.string()),
+        ("pattern", pa.string()),
+        ("vad_file", pa.string()),
+        ("pid", pa.int64()),
+        ("vad_start", pa.uint64()),
+        ("offset", pa.uint64()),
+        ("length", pa.uint64()),
+        ("address", pa.uint64()),
+    ]
+)
+
+_worker_scanner = None
+
+
+def _init_worker(serialized):
+    global _worker_scanner
+    import yara_x
+
+    _worker_scanner = yara_x.Scanner(yara_x.Rules.deserialize_from(io.BytesIO(serialized)))
+
+
+def _scan_file(path):
+    """Matches in one VAD dump as a record batch. YARA-X memory-maps the file itself."""
+    import yara_x
+
+    pid, vad_start, _ = parse_vad_file(path)
+    rows = {name: [] for name in MATCHES_SCHEMA.names}
+
+    try:
+        result = _worker_scanner.scan_file(path)
+    except yara_x.ScanError:
+        result = None
+
+    for rule in result.matching_rules if result else ():
+        for pattern in rule.patterns:
+            for match in pattern.matches:
+                rows["rule"].append(rule.identifier)
+                rows["namespace"].append(rule.namespace)
+                rows["pattern"].append(pattern.identifier)
+                rows["offset"].append(match.offset)
+                rows["length"].append(match.length)
+
+    count = len(rows["rule"])
+    rows["vad_file"] = [os.path.basename(path)] * count
+    rows["pid"] = [pid] * count
+    rows["vad_start"] = [vad_start] * count
+    rows["address"] = [None if vad_start is None else vad_start + offset for offset in rows["offset"]]
+
+    return pa.RecordBatch.from_pydict(rows, schema=MATCHES_SCHEMA)
+
+
+def match_batches(rule_text, files, workers=None):
+    """
+    Scan every file in `files` with the rules in `rule_text` across a process pool.
+
+    The rules are compiled once, here, and handed to the workers in serialised form. Yields one
+    record batch of matches per file as the workers finish them.
+    """
+    buffer = io.BytesIO()
+    compile_rules(rule_text).serialize_into(buffer)
+
+    # Largest files first, so one big VAD doesn't end up alone at the end
+    files = sorted(files, key=os.path.getsize, reverse=True)
+
+    # Forked workers hang once YARA-X has started its threads in this process, so spawn them
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(buffer.getvalue(),),
+    ) as pool:
+        futures = [pool.submit(_scan_file, path) for path in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def sweep(con, rule_text, vad_dir=VAD_DUMP_DIR, table_name="yara_matches", progress=None, workers=None):
+    """
+    Scan every VAD dump in `vad_dir` and store the matches in the DuckDB table `table_name`.
+
+    Returns the table, with one row per match: rule, namespace, pattern, vad_file, pid,
+    vad_start, offset (in the file), length and the virtual address of the match. `progress`
+    wraps the stream of batches like in `memtools.strings.create_strings_table`.
+    """
+    files = glob.glob(os.path.join(vad_dir, "*.dmp"))
+    batches = match_batches(rule_text, files, workers=workers)
+    if progress is not None:
+        batches = progress(batches, total=len(files))
+    return load_batches(con, table_name, batches, schema=MATCHES_SCHEMA)
+
+
+def with_vadinfo(matches, vads):
+    """Add the process name and the vadinfo columns of the VAD each match was found in."""
+    vads = vads.select(
+        _pid=vads.pid,
+        _start_vpn=vads.start_vpn,
+        process=vads.process,
+        vad_end=vads.end_vpn,
+        tag=vads.tag,
+        protection=vads.protection,
+        private_memory=vads.private_memory,
+    )
+    joined = matches.left_join(vads, [matches.pid == vads._pid, matches.vad_start == vads._start_vpn])
+    return joined.drop("_pid", "_start_vpn")
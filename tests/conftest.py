@@ -0,0 +1,22 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+
+@pytest.fixture
+def plugin_dir(tmp_path):
+    path = tmp_path / "volatility_plugin_output"
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def write_plugin(plugin_dir):
+    """Write plugin output to `plugin_dir` the way `vol -r parquet` names it, with Volatility's column names."""
+
+    def write(plugin, columns):
+        path = plugin_dir / f"{plugin}.parquet"
+        pq.write_table(pa.table(columns), path)
+        return str(path)
+
+    return write
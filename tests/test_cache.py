@@ -0,0 +1,81 @@
+import os
+
+from memtools import cache
+from memtools.cache import PluginCache, cache_key, config_digest
+
+
+def test_cache_key_covers_every_input(tmp_path):
+    config = tmp_path / "config.json"
+    config.write_text('{"automagic.LayerStacker.single_location": "file:///a.dmp"}')
+    base = cache_key("dump", "windows.pslist.PsList", version="2.0")
+
+    assert cache_key("dump", "windows.pslist.PsList", version="2.0") == base
+    assert cache_key("other", "windows.pslist.PsList", version="2.0") != base
+    assert cache_key("dump", "windows.psscan.PsScan", version="2.0") != base
+    assert cache_key("dump", "windows.pslist.PsList", ["--pid", "4"], version="2.0") != base
+    assert cache_key("dump", "windows.pslist.PsList", version="2.1") != base
+    assert cache_key("dump", "windows.pslist.PsList", version="2.0", config=config_digest(config)) != base
+
+
+def test_config_digest_changes_with_the_config(tmp_path):
+    config = tmp_path / "config.json"
+    assert config_digest(config) == ""
+
+    config.write_text('{"location": "file:///a.dmp"}')
+    first = config_digest(config)
+    config.write_text('{"location": "file:///b.dmp"}')
+    assert config_digest(config) not in ("", first)
+
+
+def test_get_and_put(tmp_path):
+    plugin_cache = PluginCache(tmp_path / "cache")
+    source = tmp_path / "pslist.parquet"
+    source.write_bytes(b"plugin output")
+    destination = tmp_path / "out" / "pslist.parquet"
+
+    assert not plugin_cache.get("ab" * 20, destination)
+    assert not destination.exists()
+
+    plugin_cache.put("ab" * 20, source)
+    assert plugin_cache.get("ab" * 20, destination)
+    assert destination.read_bytes() == b"plugin output"
+
+
+def test_evicts_least_recently_used_first(tmp_path):
+    plugin_cache = PluginCache(tmp_path / "cache", max_bytes=250)
+    source = tmp_path / "output.parquet"
+    source.write_bytes(b"x" * 100)
+    keys = ["aa" * 20, "bb" * 20, "cc" * 20]
+
+    plugin_cache.put(keys[0], source)
+    plugin_cache.put(keys[1], source)
+    for age, key in zip((300, 200), keys):
+        os.utime(plugin_cache.path(key), (0, 1_000_000 - age))
+
+    # Using the oldest entry makes the other one the least recently used
+    assert plugin_cache.get(keys[0], tmp_path / "used.parquet")
+    plugin_cache.put(keys[2], source)
+
+    assert os.path.exists(plugin_cache.path(keys[0]))
+    assert not os.path.exists(plugin_cache.path(keys[1]))
+    assert os.path.exists(plugin_cache.path(keys[2]))
+    assert plugin_cache.size() == 200
+
+
+def test_entry_evicted_during_get_is_a_miss(tmp_path, monkeypatch):
+    plugin_cache = PluginCache(tmp_path / "cache")
+    source = tmp_path / "output.parquet"
+    source.write_bytes(b"plugin output")
+    plugin_cache.put("ab" * 20, source)
+
+    utime = os.utime
+
+    def evicted(path, *args, **kwargs):
+        # Another worker evicts the entry between the existence check and its use
+        os.remove(path)
+        return utime(path, *args, **kwargs)
+
+    monkeypatch.setattr(cache.os, "utime", evicted)
+    destination = tmp_path / "pslist.parquet"
+    assert not plugin_cache.get("ab" * 20, destination)
+    assert not destination.exists()
@@ -0,0 +1,71 @@
+import os
+
+import duckdb
+import pyarrow as pa
+
+from memtools.case import INGESTED_TABLE, ingest, ingest_changed, snake_case
+
+KERNEL_ADDRESS = 0xFFFF_F800_0000_1000
+
+
+def test_snake_case_matches_ibis():
+    assert snake_case("ImageFileName") == "image_file_name"
+    assert snake_case("Start VPN") == "start_vpn"
+    assert snake_case("Offset(V)") == "offset(v)"
+    assert snake_case("PPID") == "ppid"
+
+
+def test_ingest(tmp_path, plugin_dir, write_plugin):
+    write_plugin(
+        "windows.pslist.PsList",
+        {
+            "PID": [200, 4],
+            "ImageFileName": ["evil.exe", "System"],
+            # Volatility writes kernel addresses as signed 64-bit integers
+            "Offset(V)": pa.array([KERNEL_ADDRESS - 2**64, 0x1000], pa.int64()),
+        },
+    )
+    write_plugin(
+        "windows.malware.malfind.Malfind",
+        {"PID": [200, 200], "Process": ["evil.exe"] * 2, "Start VPN": [0x20000, 0x10000], "Notes": [None, "MZ"]},
+    )
+    case_path = str(tmp_path / "case.duckdb")
+
+    assert ingest(str(plugin_dir), case_path) == ["malfind", "pslist", "triage_summary"]
+
+    con = duckdb.connect(case_path, read_only=True)
+    pslist = con.execute("SELECT pid, image_file_name, \"offset(v)\" FROM pslist").fetchall()
+    assert pslist == [(4, "System", 0x1000), (200, "evil.exe", KERNEL_ADDRESS)]
+    assert con.execute("SELECT typeof(\"offset(v)\") FROM pslist LIMIT 1").fetchone() == ("UBIGINT",)
+    # Stored ordered by pid and address
+    assert con.execute("SELECT start_vpn FROM malfind").fetchall() == [(0x10000,), (0x20000,)]
+    assert {row[0] for row in con.execute(f"SELECT table_name FROM {INGESTED_TABLE}").fetchall()} == {
+        "malfind",
+        "pslist",
+    }
+
+
+def test_ingest_changed_loads_only_new_and_rewritten_output(tmp_path, plugin_dir, write_plugin):
+    pslist = write_plugin("windows.pslist.PsList", {"PID": [4], "ImageFileName": ["System"]})
+    write_plugin("windows.netscan.NetScan", {"PID": [4], "Owner": ["System"]})
+    case_path = str(tmp_path / "case.duckdb")
+    ingest(str(plugin_dir), case_path)
+
+    con = duckdb.connect(case_path)
+    assert ingest_changed(con, str(plugin_dir)) == []
+
+    write_plugin("windows.pslist.PsList", {"PID": [4, 200], "ImageFileName": ["System", "evil.exe"]})
+    # Make sure the rewrite is seen even within the file system's timestamp resolution
+    os.utime(pslist, ns=(0, os.stat(pslist).st_mtime_ns + 10**9))
+    write_plugin(
+        "windows.malware.malfind.Malfind",
+        {"PID": [200], "Process": ["evil.exe"], "Start VPN": [0x10000], "Notes": pa.array([None], pa.string())},
+    )
+
+    assert ingest_changed(con, str(plugin_dir)) == ["malfind", "pslist", "triage_summary"]
+    assert con.execute("SELECT count(*) FROM pslist").fetchone() == (2,)
+    assert con.execute("SELECT pid, malfind_hits, net_connections FROM triage_summary").fetchall() == [
+        (4, 0, 1),
+        (200, 1, 0),
+    ]
+    assert ingest_changed(con, str(plugin_dir)) == []
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from memtools.corpus import check_sample, corpus_report, run_corpus
+
+RULES = r"""
+rule evil {
+    strings:
+        $a = "EVIL"
+    condition:
+        $a
+}
+"""
+
+
+def write_corpus(corpus_dir, samples):
+    (corpus_dir / "manifest.json").write_text(json.dumps({"samples": samples}))
+
+
+def test_run_corpus_reports_failing_samples(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    (corpus_dir / "evil.bin").write_bytes(b"xx EVIL xx")
+    (corpus_dir / "clean.bin").write_bytes(b"xx clean xx")
+    # A directory can't be scanned
+    (corpus_dir / "folder").mkdir()
+    write_corpus(
+        corpus_dir,
+        [
+            {"path": "evil.bin", "expected": ["evil"]},
+            {"path": "clean.bin", "expected": []},
+            {"path": "folder", "expected": []},
+            {"path": "missing.bin", "expected": ["evil"]},
+        ],
+    )
+
+    results = run_corpus(RULES, str(corpus_dir), workers=1, cache_dir=str(tmp_path / "cache"))
+
+    assert [(result["name"], result["matched"]) for result in results] == [
+        ("evil.bin", ["evil"]),
+        ("clean.bin", []),
+        ("folder", []),
+        ("missing.bin", []),
+    ]
+    assert [result["error"] is not None for result in results] == [False, False, True, True]
+    check_sample(results[0])
+    check_sample(results[1])
+    for result in results[2:]:
+        with pytest.raises(AssertionError, match="Error"):
+            check_sample(result)
+
+    # Failed samples are left out of the report instead of counting as false negatives
+    [row] = corpus_report(results)
+    assert (row["rule"], row["tp"], row["fp"], row["fn"], row["tn"]) == ("evil", 1, 0, 0, 1)
+
+
+def test_run_corpus_rescans_failed_samples(tmp_path):
+    corpus_dir = tmp_path / "corpus"
+    corpus_dir.mkdir()
+    write_corpus(corpus_dir, [{"path": "late.bin", "expected": ["evil"]}])
+    cache_dir = str(tmp_path / "cache")
+
+    assert run_corpus(RULES, str(corpus_dir), workers=1, cache_dir=cache_dir)[0]["error"]
+
+    (corpus_dir / "late.bin").write_bytes(b"EVIL")
+    [result] = run_corpus(RULES, str(corpus_dir), workers=1, cache_dir=cache_dir)
+    assert (result["matched"], result["error"]) == (["evil"], None)
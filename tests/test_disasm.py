@@ -0,0 +1,76 @@
+import subprocess
+import sys
+import time
+
+import ibis
+import pytest
+
+from memtools import disasm as disasm_module
+from memtools.case import attach_case, ingest
+from memtools.disasm import cached_disasm, disassemble
+
+# push rbp; mov rbp, rsp; ret
+STUB = bytes.fromhex("554889e5c3")
+
+
+@pytest.fixture
+def case_path(tmp_path, plugin_dir, write_plugin):
+    write_plugin(
+        "windows.malware.malfind.Malfind",
+        {
+            "PID": [100, 200, 300],
+            "Process": ["a.exe", "b.exe", "c.exe"],
+            "Start VPN": [0x10000, 0x10000, 0x20000],
+            "Notes": [None, None, None],
+            "Hexdump": [STUB, STUB, None],
+        },
+    )
+    path = str(tmp_path / "case.duckdb")
+    ingest(str(plugin_dir), path)
+    return path
+
+
+def disassembly(con, case_path):
+    malfind = con.table("malfind", database="case").mutate(wow64=False)
+    result = cached_disasm(con, malfind, case_path=case_path).order_by("pid")
+    return result.select("pid", "disassembly").to_pyarrow().to_pylist()
+
+
+def expected():
+    return [
+        {"pid": 100, "disassembly": disassemble(STUB, 0x10000)},
+        {"pid": 200, "disassembly": disassemble(STUB, 0x10000)},
+        {"pid": 300, "disassembly": None},
+    ]
+
+
+def test_cached_disasm_disassembles_each_stub_once(case_path, monkeypatch):
+    con = attach_case(ibis.duckdb.connect(), case_path)
+    calls = []
+    disassemble_arrays = disasm_module.disassemble_arrays
+
+    def counted(code, address, wow64):
+        calls.append(len(code))
+        return disassemble_arrays(code, address, wow64)
+
+    monkeypatch.setattr(disasm_module, "disassemble_arrays", counted)
+
+    assert disassembly(con, case_path) == expected()
+    # The same stub in two processes goes through Capstone once, and the next run not at all
+    assert calls == [1]
+    assert disassembly(con, case_path) == expected()
+    assert calls == [1]
+
+
+def test_cached_disasm_without_a_writable_case(case_path):
+    con = attach_case(ibis.duckdb.connect(), case_path)
+    # Another process, such as a second notebook kernel, with the case open
+    holder = f"import duckdb, time; con = duckdb.connect({case_path!r}, read_only=True); time.sleep(30)"
+    other = subprocess.Popen([sys.executable, "-c", holder])
+    try:
+        time.sleep(2)
+        assert disassembly(con, case_path) == expected()
+        assert "disasm_cache" not in con.list_tables(database=("case", "main"))
+    finally:
+        other.kill()
+        other.wait()
@@ -0,0 +1,49 @@
+import ibis
+import pytest
+
+from memtools.image import scan_image, windows
+
+WINDOW = 64 * 1024
+OVERLAP = 4 * 1024
+
+RULE = r"""
+rule marker {
+    strings:
+        $marker = "EVILMARKER"
+    condition:
+        $marker
+}
+"""
+
+
+def test_windows_cover_the_file_with_overlap():
+    assert list(windows(10, window=4, overlap=2)) == [(0, 6), (4, 6), (8, 2)]
+    assert list(windows(8, window=4, overlap=0)) == [(0, 4), (4, 4)]
+    assert list(windows(0, window=4, overlap=2)) == []
+
+
+@pytest.mark.parametrize("window, overlap", [(0, 1), (4, -1)])
+def test_windows_rejects_bad_sizes(window, overlap):
+    with pytest.raises(ValueError):
+        list(windows(10, window=window, overlap=overlap))
+
+
+def test_scan_image_reports_each_match_once(tmp_path):
+    offsets = [
+        100,  # inside the first window
+        WINDOW - 4,  # crosses the boundary into the second window
+        WINDOW + 10,  # starts in the first window's overlap, belongs to the second
+        2 * WINDOW - 1,  # crosses the second boundary
+        3 * WINDOW + 5,  # in the last, short window
+    ]
+    data = bytearray(3 * WINDOW + 100)
+    for offset in offsets:
+        data[offset : offset + len(b"EVILMARKER")] = b"EVILMARKER"
+    image = tmp_path / "image.dmp"
+    image.write_bytes(bytes(data))
+
+    matches = scan_image(ibis.duckdb.connect(), str(image), RULE, window=WINDOW, overlap=OVERLAP, workers=2)
+    rows = matches.order_by("file_offset").to_pyarrow().to_pylist()
+
+    assert [row["file_offset"] for row in rows] == offsets
+    assert {(row["rule"], row["pattern"], row["length"]) for row in rows} == {("marker", "$marker", 10)}
@@ -0,0 +1,51 @@
+import re
+
+import ibis
+import pyarrow as pa
+
+from memtools.iocs import IOC_PATTERNS, IOCMatcher, extract_iocs
+
+STRINGS = [
+    "Download http://evil.example/stage2.exe and run it",
+    "C:\\Users\\victim\\AppData\\payload.dll mail admin@corp.example.com",
+    "connect 10.0.0.12 then 192.168.1.1",
+    None,
+    "no indicators here",
+    # Offsets are characters, not bytes, after a non-ASCII character
+    "überweisung.docm from ftp://files.example/report.zip",
+    # YARA-X stops regex matches after 4095 bytes
+    "see https://example.com/" + "a" * 5000 + " for more",
+]
+
+
+def findall(string):
+    """The matches of every pattern on its own, the way `IOCMatcher` should find them."""
+    found = []
+    for name, pattern in IOC_PATTERNS.items():
+        found += [(match.start(), name, match.group()) for match in re.finditer(pattern, string or "", re.ASCII)]
+    return [{"pattern": name, "match": value, "offset": start} for start, name, value in sorted(found)]
+
+
+def test_matcher_finds_what_re_finds():
+    matches = IOCMatcher().extract(pa.array(STRINGS, pa.string())).to_pylist()
+
+    assert matches == [findall(string) for string in STRINGS]
+    assert {"pattern": "ipv4s", "match": "192.168.1.1", "offset": 23} in matches[2]
+    assert max(len(match["match"]) for match in matches[-1]) > 5000
+
+
+def test_extract_iocs_offsets_in_the_dump():
+    strings = ibis.memtable(
+        {
+            "offset": [100, 200],
+            "encoding": ["ascii", "utf-16le"],
+            "string": ["at 10.0.0.1", "at 10.0.0.2"],
+        }
+    )
+
+    iocs = extract_iocs(strings)
+    rows = iocs.filter(iocs.pattern == "ipv4s").order_by("offset").to_pyarrow().to_pylist()
+    assert [(row["pattern"], row["match"], row["match_offset"]) for row in rows] == [
+        ("ipv4s", "10.0.0.1", 103),
+        ("ipv4s", "10.0.0.2", 206),
+    ]
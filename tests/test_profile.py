@@ -0,0 +1,54 @@
+from memtools.profile import mask_literals, pattern_spans, profile_rules, rule_spans
+
+RULES = r"""
+import "pe"
+
+// rule commented_out { condition: true }
+private rule marker { strings: $a = "EVIL" $b = { 45 56 } condition: any of them }
+rule uses_marker {
+    strings:
+        $c = /rule fake/ // a regex that looks like a rule
+        $d = "strings: $e = x"
+    condition:
+        marker or $c or $d
+}
+"""
+
+
+def test_mask_literals_blanks_comments_and_literals():
+    source = b'rule a { strings: $x = "rule b" $y = /c\\/d/ condition: 4 / 2 == 2 } /* rule e */'
+
+    masked = mask_literals(source)
+    assert len(masked) == len(source)
+    assert masked == b'rule a { strings: $x =          $y =        condition: 4 / 2 == 2 }' + b" " * 13
+
+
+def test_rule_and_pattern_spans():
+    source = RULES.encode()
+
+    spans = rule_spans(source)
+    assert [name for name, _, _ in spans] == ["marker", "uses_marker"]
+    assert source[spans[0][1] :].startswith(b"private rule marker")
+
+    patterns = [pattern_spans(source, start, end) for _, start, end in spans]
+    assert [[identifier for identifier, _, _ in rule] for rule in patterns] == [["$a", "$b"], ["$c", "$d"]]
+    _, start, end = patterns[0][1]
+    assert source[start:end].strip() == b"$b = { 45 56 }"
+
+
+def test_profile_rules_counts_the_matches_of_private_rules(tmp_path):
+    sample = tmp_path / "sample.bin"
+    sample.write_bytes(b"xx EVIL yy EVIL zz rule fake")
+
+    rows = profile_rules(RULES, [str(sample)])
+
+    counts = {(row["rule"], row["pattern"]): (row["matches"], row["files"]) for row in rows}
+    assert counts == {
+        ("marker", None): (4, None),
+        ("marker", "$a"): (2, None),
+        ("marker", "$b"): (2, None),
+        ("uses_marker", None): (1, 1),
+        ("uses_marker", "$c"): (1, None),
+        ("uses_marker", "$d"): (0, None),
+    }
+    assert all(row["scan_ms"] is not None for row in rows)
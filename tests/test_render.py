@@ -0,0 +1,32 @@
+import yara_x
+
+from memtools.render import match_context, match_spans
+
+DATA = b"\x01GET /evil.example HTTP\r\n\x00evil"
+
+
+def naive_context(binary, offset, length, context):
+    """The views built for one match on its own."""
+
+    def views(data):
+        return " ".join(f"{byte:02x}" for byte in data), "".join(chr(b) if 0x20 <= b <= 0x7E else "." for b in data)
+
+    before = binary[max(0, offset - context) : offset]
+    match = binary[offset : offset + length]
+    after = binary[offset + length : offset + length + context]
+    (hex_before, ascii_before), (hex_match, ascii_match), (hex_after, ascii_after) = map(views, (before, match, after))
+    return (hex_before, hex_match, hex_after), (ascii_before, ascii_match, ascii_after)
+
+
+def test_match_context_is_the_context_of_each_match():
+    result = yara_x.compile('rule evil { strings: $a = "evil" condition: $a }').scan(DATA)
+    # Matches at the very start, overlapping another one, and running past the end
+    spans = [*match_spans(result), ("r", "$b", 0, 4), ("r", "$c", 6, 12), ("r", "$d", len(DATA) - 2, 10)]
+    assert spans[:2] == [("evil", "$a", 6, 4), ("evil", "$a", len(DATA) - 4, 4)]
+
+    rows = match_context(DATA, spans, context=5)
+
+    for row, (rule, pattern, offset, length) in zip(rows, spans, strict=True):
+        assert (row["rule"], row["pattern"], row["offset"], row["length"]) == (rule, pattern, offset, length)
+        assert (row["bytes"], row["ascii"]) == naive_context(DATA, offset, length, 5)
+    assert rows[0]["ascii"] == ("GET /", "evil", ".exam")
@@ -0,0 +1,41 @@
+import ibis
+import pytest
+
+from memtools.search import attach_index, build_index, required_literals, search, search_regex
+
+
+@pytest.fixture
+def con(tmp_path):
+    vad_dir = tmp_path / "vads"
+    vad_dir.mkdir()
+    ascii_dump = b"\x00" * 16 + b"GET http://Evil-Domain.com/x?evil-domain.com" + b"\x00" * 16
+    utf16_dump = b"\x00" * 32 + "mail to evil-domain.com".encode("utf-16le") + b"\x00" * 8
+    (vad_dir / "pid.100.vad.0x10000-0x1ffff.dmp").write_bytes(ascii_dump)
+    (vad_dir / "pid.200.vad.0x20000-0x2ffff.dmp").write_bytes(utf16_dump)
+
+    index_path = str(tmp_path / "strings.duckdb")
+    assert build_index(str(vad_dir), index_path, workers=1) == 2
+    return attach_index(ibis.duckdb.connect(), index_path)
+
+
+def hits(expr):
+    rows = expr.to_pyarrow().to_pylist()
+    return sorted((row["pid"], row["encoding"], row["hit_offset"]) for row in rows)
+
+
+def test_search_hit_offset_is_the_first_match(con):
+    # The ASCII string starts at byte 16 with "GET http://", the UTF-16 one at byte 32 with "mail to "
+    assert hits(search(con, "evil-DOMAIN.com")) == [(100, "ascii", 16 + 11), (200, "utf-16le", 32 + 2 * 8)]
+    assert hits(search(con, "nowhere.example")) == []
+
+
+def test_search_regex_hit_offset_is_the_leftmost_match(con):
+    # "omain.com" in "Evil-Domain.com", the text of the leftmost match also occurs later in the string
+    assert hits(search_regex(con, r"[a-z-]+\.com")) == [(100, "ascii", 16 + 17), (200, "utf-16le", 32 + 2 * 8)]
+    assert hits(search_regex(con, r"http://[A-Za-z-]+\.com")) == [(100, "ascii", 16 + 4)]
+
+
+def test_required_literals():
+    assert required_literals(r"https?://[a-z0-9.-]+\.ru/") == ["http", "://", ".ru/"]
+    assert required_literals(r"^evil(?:domain)\.com$") == ["evildomain.com"]
+    assert required_literals(r"a|bcd") == []
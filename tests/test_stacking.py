@@ -0,0 +1,82 @@
+import os
+
+import ibis
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from memtools.fleet import fleet_path
+from memtools.stacking import rare_values, stack_fleet, stack_host, values_path
+
+HOSTS = [f"HOST-{chr(ord('A') + index)}" for index in range(20)]
+
+
+def letters(number):
+    """`number` spelled in letters, handle names have their digits masked."""
+    return "".join(chr(ord("a") + int(digit)) for digit in str(number))
+
+
+def write_handles(fleet_dir, host, names):
+    path = fleet_path(host, "handles", fleet_dir)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pq.write_table(pa.table({"pid": [4] * len(names), "name": names}), path)
+
+
+def synthetic_fleet(fleet_dir):
+    """
+    20 hosts sharing 2000 handle names, each with 50 names no other host has and 50 it
+    shares with one other host. Returns {host: {name: number of hosts}} of the rare names.
+    """
+    common = [f"\\BaseNamedObjects\\common_{letters(i)}" for i in range(2000)]
+    rare = {}
+    for index, host in enumerate(HOSTS):
+        unique = {f"\\Device\\only_{letters(index)}_{letters(i)}": 1 for i in range(50)}
+        # Hosts 0 and 1 share a set of names, so do 2 and 3, ...
+        pair = {f"\\Sessions\\pair_{letters(index // 2)}_{letters(i)}": 2 for i in range(50)}
+        rare[host] = unique | pair
+        # Repeated names are counted once per host
+        write_handles(fleet_dir, host, common + list(unique) + list(pair) + common[:100])
+        stack_host(host, fleet_dir, ["handle_name"])
+    return rare
+
+
+def test_rare_values_finds_every_rare_value(tmp_path):
+    rare = synthetic_fleet(str(tmp_path))
+    expected = {name: hosts for names in rare.values() for name, hosts in names.items()}
+    con = ibis.duckdb.connect()
+
+    found = rare_values(con, "handle_name", 3, fleet_dir=str(tmp_path)).to_pyarrow().to_pylist()
+    assert {row["value"]: row["hosts"] for row in found} == expected
+    assert len(found) == 20 * 50 + 10 * 50
+    assert [row["hosts"] for row in found] == sorted(row["hosts"] for row in found)
+
+    only_once = rare_values(con, "handle_name", 2, fleet_dir=str(tmp_path)).to_pyarrow().to_pylist()
+    assert {row["value"] for row in only_once} == {name for name, hosts in expected.items() if hosts == 1}
+
+
+def test_rare_values_of_one_host(tmp_path):
+    rare = synthetic_fleet(str(tmp_path))
+
+    found = rare_values(ibis.duckdb.connect(), "handle_name", 3, host="HOST-C", fleet_dir=str(tmp_path))
+    assert {row["value"]: row["hosts"] for row in found.to_pyarrow().to_pylist()} == rare["HOST-C"]
+
+
+def test_values_are_masked_and_distinct(tmp_path):
+    fleet_dir = str(tmp_path)
+    write_handles(fleet_dir, "HOST-A", ["\\Sessions\\1\\Windows", "\\Sessions\\2\\Windows", "", None])
+    assert stack_host("HOST-A", fleet_dir) == ["handle_name"]
+
+    values = pq.read_table(values_path("HOST-A", "handle_name", fleet_dir))
+    assert values.column("value").to_pylist() == ["\\Sessions\\#\\Windows"]
+
+
+def test_stack_fleet_picks_up_new_plugin_output(tmp_path):
+    fleet_dir = str(tmp_path)
+    write_handles(fleet_dir, "HOST-A", ["\\Device\\old"])
+    stack_fleet("handle_name", fleet_dir)
+
+    write_handles(fleet_dir, "HOST-A", ["\\Device\\new"])
+    path = values_path("HOST-A", "handle_name", fleet_dir)
+    os.utime(path, (0, os.path.getmtime(fleet_path("HOST-A", "handles", fleet_dir)) - 10))
+
+    found = rare_values(ibis.duckdb.connect(), "handle_name", 2, fleet_dir=fleet_dir).to_pyarrow().to_pylist()
+    assert found == [{"value": "\\Device\\new", "hosts": 1}]
@@ -0,0 +1,64 @@
+import duckdb
+import ibis
+import pytest
+
+from memtools import triage
+from memtools.case import attach_case, ingest
+from memtools.triage import TRIAGE_TABLE, build_summary, triage_summary
+
+
+@pytest.fixture
+def case_path(tmp_path, plugin_dir, write_plugin):
+    write_plugin("windows.pslist.PsList", {"PID": [4, 200, 300], "ImageFileName": ["System", "evil.exe", "idle.exe"]})
+    write_plugin(
+        "windows.malware.malfind.Malfind",
+        {"PID": [200, 200], "Process": ["evil.exe"] * 2, "Start VPN": [0x10000, 0x20000], "Notes": ["MZ header", None]},
+    )
+    write_plugin(
+        "windows.vadinfo.VadInfo",
+        {
+            "PID": [200, 200, 4],
+            "Process": ["evil.exe", "evil.exe", "System"],
+            "Start VPN": [0x10000, 0x30000, 0x1000],
+            "Protection": ["PAGE_EXECUTE_READWRITE", "PAGE_READONLY", "PAGE_EXECUTE_WRITECOPY"],
+        },
+    )
+    write_plugin("windows.netscan.NetScan", {"PID": [200, 200, 500], "Owner": ["evil.exe", "evil.exe", "gone.exe"]})
+    path = str(tmp_path / "case.duckdb")
+    ingest(str(plugin_dir), path)
+    return path
+
+
+def test_build_summary_counts_per_process(case_path):
+    con = duckdb.connect(case_path)
+    build_summary(con)
+    columns = "pid, process, malfind_hits, malfind_notes, rwx_vads, net_connections, suspicious_threads"
+    rows = con.execute(f"SELECT {columns} FROM {TRIAGE_TABLE}").fetchall()
+
+    # Plugins that weren't run count as null, processes only some plugin saw are included
+    assert rows == [
+        (4, "System", 0, 0, 1, 0, None),
+        (200, "evil.exe", 2, 1, 1, 2, None),
+        (300, "idle.exe", 0, 0, 0, 0, None),
+        (500, "gone.exe", 0, 0, 0, 1, None),
+    ]
+
+
+def test_triage_summary_reuses_the_stored_summary(case_path, monkeypatch):
+    def writable_case(*args, **kwargs):
+        raise AssertionError("the summary is already in the case")
+
+    monkeypatch.setattr(triage, "writable_case", writable_case)
+    con = attach_case(ibis.duckdb.connect(), case_path)
+
+    for _ in range(2):
+        assert triage_summary(con, case_path).count().execute() == 4
+
+
+def test_triage_summary_adds_a_missing_summary(case_path):
+    with duckdb.connect(case_path) as db:
+        db.execute(f"DROP TABLE {TRIAGE_TABLE}")
+    con = attach_case(ibis.duckdb.connect(), case_path)
+
+    assert triage_summary(con, case_path).count().execute() == 4
+    assert TRIAGE_TABLE in con.list_tables(database=("case", "main"))
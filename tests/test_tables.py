@@ -0,0 +1,39 @@
+import ibis
+
+from memtools.tables import stable_order
+
+ROWS = {"pid": [4, 100, 200, 300, 300], "name": ["System", "b.exe", "a.exe", "c.exe", "a.exe"]}
+
+
+def test_stable_order_keeps_the_sort_order():
+    table = ibis.memtable(ROWS)
+
+    rows = stable_order(table.order_by(ibis.desc("pid"))).to_pyarrow().to_pylist()
+    assert [(row["pid"], row["name"]) for row in rows] == [
+        (300, "a.exe"),
+        (300, "c.exe"),
+        (200, "a.exe"),
+        (100, "b.exe"),
+        (4, "System"),
+    ]
+
+
+def test_stable_order_finds_the_sort_under_filters_and_projections():
+    table = ibis.memtable(ROWS)
+    # A column filter and a search on top of the user's sort
+    expr = table.order_by(ibis.desc("pid")).filter(table.pid > 4).filter(table.name.contains(".exe"))
+    expected = [(300, "a.exe"), (300, "c.exe"), (200, "a.exe"), (100, "b.exe")]
+
+    rows = stable_order(expr).to_pyarrow().to_pylist()
+    assert [(row["pid"], row["name"]) for row in rows] == expected
+
+    renamed = expr.select(process="name", id="pid")
+    rows = stable_order(renamed).to_pyarrow().to_pylist()
+    assert [(row["id"], row["process"]) for row in rows] == expected
+
+
+def test_stable_order_without_a_sort_orders_by_every_column():
+    table = ibis.memtable(ROWS)
+
+    rows = stable_order(table.select("name", "pid")).to_pyarrow().to_pylist()
+    assert [(row["name"], row["pid"]) for row in rows] == sorted(zip(ROWS["name"], ROWS["pid"]))
@@ -0,0 +1,39 @@
+import ibis
+import pytest
+
+from memtools.triage import correlate, key_column
+
+
+def test_correlate_counts_rows_per_process_and_table():
+    malfind = ibis.memtable({"pid": [4, 4, 100], "process": ["System", "System", "evil.exe"]})
+    # netscan calls the process column `owner`, and its pids are a different integer type
+    netscan = ibis.memtable({"pid": [100, 200], "owner": ["evil.exe", "svchost.exe"]}).cast({"pid": "int32"})
+    pslist = ibis.memtable({"pid": [4, 100, 200], "image_file_name": ["System", "evil.exe", "svchost.exe"]})
+
+    result = correlate({"malfind": malfind, "netscan": netscan, "pslist": pslist}).to_pyarrow().to_pylist()
+
+    assert result == [
+        {"pid": 4, "process": "System", "malfind": 2, "netscan": 0, "pslist": 1, "plugins": 2},
+        {"pid": 100, "process": "evil.exe", "malfind": 1, "netscan": 1, "pslist": 1, "plugins": 3},
+        {"pid": 200, "process": "svchost.exe", "malfind": 0, "netscan": 1, "pslist": 1, "plugins": 2},
+    ]
+
+
+def test_correlate_keeps_hosts_apart():
+    malfind = ibis.memtable({"host": ["a", "b"], "pid": [100, 100], "process": ["evil.exe", "notepad.exe"]})
+    netscan = ibis.memtable({"host": ["a"], "pid": [100], "owner": ["evil.exe"]})
+
+    result = correlate({"malfind": malfind, "netscan": netscan}, keys=("host", "pid", "process"))
+
+    assert result.to_pyarrow().to_pylist() == [
+        {"host": "a", "pid": 100, "process": "evil.exe", "malfind": 1, "netscan": 1, "plugins": 2},
+        {"host": "b", "pid": 100, "process": "notepad.exe", "malfind": 1, "netscan": 0, "plugins": 1},
+    ]
+
+
+def test_key_column():
+    table = ibis.table({"pid": "int64", "owner": "string"})
+    assert key_column(table, "process") == "owner"
+    assert key_column(table, "pid") == "pid"
+    with pytest.raises(KeyError):
+        key_column(table, "host")
@@ -0,0 +1,52 @@
+import ibis
+
+from memtools.vad import parse_vad_file, resolve_vads
+
+VADS = {
+    "pid": [100, 100, 100, 200],
+    "start_vpn": [0x10000, 0x20000, 0x40000, 0x10000],
+    "end_vpn": [0x1FFFF, 0x2FFFF, 0x4FFFF, 0x3FFFF],
+    "protection": ["PAGE_READONLY", "PAGE_EXECUTE_READWRITE", "PAGE_READWRITE", "PAGE_EXECUTE_READ"],
+    "file_output": ["a.dmp", "b.dmp", "c.dmp", "d.dmp"],
+}
+
+
+def range_join(threads):
+    """The VAD of every thread the slow way, comparing each address with every VAD."""
+    found = {}
+    for tid, pid, address in threads:
+        for vad_pid, start, end, protection, _ in zip(*VADS.values()):
+            if vad_pid == pid and start <= address <= end:
+                found[tid] = (start, end, protection)
+    return found
+
+
+def test_resolve_vads_matches_a_range_join():
+    threads = [
+        (1, 100, 0x10000),  # first byte of a VAD
+        (2, 100, 0x2FFFF),  # last byte
+        (3, 100, 0x30000),  # in the gap between two VADs
+        (4, 100, 0x5),  # below every VAD
+        (5, 200, 0x20000),  # pid 100 has another VAD here
+        (6, 300, 0x10000),  # no VADs at all
+        (7, 100, 0x90000),  # past the last VAD
+    ]
+    table = ibis.memtable(threads, columns=["tid", "pid", "address"])
+    vads = ibis.memtable(VADS)
+
+    rows = resolve_vads(table, vads).to_pyarrow().to_pylist()
+    resolved = {row["tid"]: (row["vad_start"], row["vad_end"], row["vad_protection"]) for row in rows}
+    assert resolved == range_join(threads) == {
+        1: (0x10000, 0x1FFFF, "PAGE_READONLY"),
+        2: (0x20000, 0x2FFFF, "PAGE_EXECUTE_READWRITE"),
+        5: (0x10000, 0x3FFFF, "PAGE_EXECUTE_READ"),
+    }
+
+    rows = resolve_vads(table, vads, keep_unresolved=True).to_pyarrow().to_pylist()
+    assert sorted(row["tid"] for row in rows) == [tid for tid, _, _ in threads]
+    assert all(row["vad_file_output"] is None for row in rows if row["tid"] not in resolved)
+
+
+def test_parse_vad_file():
+    assert parse_vad_file("out/pid.6616.vad.0x3f000-0x6cfff.dmp") == (6616, 0x3F000, 0x6CFFF)
+    assert parse_vad_file("pid.6616.vad.0x3f000-0x6cfff.dmp.txt") == (None, None, None)